@@ -7,3 +7,21 @@ class Adapter(abc.ABC):
     @abc.abstractmethod
     def writeObjects(self, objects: list, output_path: str, type: SecurityContentType = None) -> None:
         pass
+
+    def close(self) -> None:
+        # Called once all of the objects have been written
+        pass
+
+    def discard(self) -> None:
+        # Called instead of close when writing the objects failed, the outputs that
+        # were not written completely are left as they were
+        pass
+
+    def __enter__(self) -> 'Adapter':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is not None:
+            self.discard()
+        else:
+            self.close()
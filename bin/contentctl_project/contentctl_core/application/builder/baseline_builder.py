@@ -1,6 +1,7 @@
 import abc
 
 from bin.contentctl_project.contentctl_core.domain.entities.enums.enums import SecurityContentType
+from bin.contentctl_project.contentctl_core.application.factory.utils.content_index import ContentIndex
 from bin.contentctl_project.contentctl_core.domain.entities.baseline import Baseline
 from bin.contentctl_project.contentctl_core.domain.entities.enums.enums import SecurityContentProduct
 from bin.contentctl_project.contentctl_core.domain.entities.security_content_object import SecurityContentObject
@@ -9,7 +10,7 @@ from bin.contentctl_project.contentctl_core.domain.entities.security_content_obj
 class BaselineBuilder(abc.ABC):
 
     @abc.abstractmethod
-    def addDeployment(self, deployments: list) -> None:
+    def addDeployment(self, content_index: ContentIndex) -> None:
         pass
 
     @abc.abstractmethod
@@ -1,5 +1,6 @@
 import abc
 
+from bin.contentctl_project.contentctl_core.application.factory.utils.content_index import ContentIndex
 from bin.contentctl_project.contentctl_core.domain.entities.enums.enums import SecurityContentProduct
 from bin.contentctl_project.contentctl_core.domain.entities.security_content_object import SecurityContentObject
 from bin.contentctl_project.contentctl_core.domain.entities.enums.enums import SecurityContentType
@@ -8,8 +9,18 @@ from bin.contentctl_project.contentctl_core.domain.entities.enums.enums import S
 
 class DetectionBuilder(abc.ABC):
 
+    def deferEnrichment(self) -> None:
+        # Called by the Factory before the detections are built.  Enrichment shared by
+        # many detections can then be left to enrichObjects
+        pass
+
+    def enrichObjects(self, objects: list) -> None:
+        # Called by the Factory with the detections it built, so that enrichment shared
+        # by many detections can be resolved once for all of them
+        pass
+
     @abc.abstractmethod
-    def addDeployment(self, deployments: list) -> None:
+    def addDeployment(self, content_index: ContentIndex) -> None:
         pass
 
     @abc.abstractmethod
@@ -29,15 +40,15 @@ class DetectionBuilder(abc.ABC):
         pass
 
     @abc.abstractmethod
-    def addPlaybook(self, playbooks: list) -> None:
+    def addPlaybook(self, content_index: ContentIndex) -> None:
         pass
 
     @abc.abstractmethod
-    def addBaseline(self, baselines: list) -> None:
+    def addBaseline(self, content_index: ContentIndex) -> None:
         pass
 
     @abc.abstractmethod
-    def addUnitTest(self, tests: list) -> None:
+    def addUnitTest(self, content_index: ContentIndex) -> None:
         pass
 
     @abc.abstractmethod
@@ -45,11 +56,11 @@ class DetectionBuilder(abc.ABC):
         pass
 
     @abc.abstractmethod
-    def addMacros(self, macros: list) -> None:
+    def addMacros(self, content_index: ContentIndex) -> None:
         pass
 
     @abc.abstractmethod
-    def addLookups(self, lookups: list) -> None:
+    def addLookups(self, content_index: ContentIndex) -> None:
         pass
 
     @abc.abstractmethod
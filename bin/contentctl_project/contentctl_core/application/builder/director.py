@@ -6,16 +6,17 @@ from bin.contentctl_project.contentctl_core.application.builder.baseline_builder
 from bin.contentctl_project.contentctl_core.application.builder.investigation_builder import InvestigationBuilder
 from bin.contentctl_project.contentctl_core.application.builder.story_builder import StoryBuilder
 from bin.contentctl_project.contentctl_core.application.builder.playbook_builder import PlaybookBuilder
+from bin.contentctl_project.contentctl_core.application.factory.utils.content_index import ContentIndex
 from bin.contentctl_project.contentctl_core.domain.entities.enums.enums import SecurityContentProduct
 
 class Director(abc.ABC):
 
     @abc.abstractmethod
-    def constructDetection(self, builder: DetectionBuilder, path: str, deployments: list, playbooks: list, baselines: list, tests: list, attack_enrichment: dict, macros: list) -> None:
+    def constructDetection(self, builder: DetectionBuilder, path: str, content_index: ContentIndex, attack_enrichment: dict) -> None:
         pass
 
     @abc.abstractmethod
-    def constructBaseline(self, builder: BaselineBuilder, path: str, deployments: list) -> None:
+    def constructBaseline(self, builder: BaselineBuilder, path: str, content_index: ContentIndex) -> None:
         pass
 
     @abc.abstractmethod
@@ -39,7 +40,7 @@ class Director(abc.ABC):
         pass
 
     @abc.abstractmethod
-    def constructStory(self, builder: StoryBuilder, path: str, detections: list, baselines: list, investigations: list) -> None:
+    def constructStory(self, builder: StoryBuilder, path: str, content_index: ContentIndex) -> None:
         pass
 
     @abc.abstractmethod
@@ -48,4 +49,8 @@ class Director(abc.ABC):
     
     @abc.abstractmethod
     def constructObjects(self, builder: BasicBuilder, path: str) -> None:
+        pass
+
+    @abc.abstractmethod
+    def getReferences(self, path: str) -> list:
         pass
\ No newline at end of file
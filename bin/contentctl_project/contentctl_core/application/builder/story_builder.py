@@ -1,5 +1,6 @@
 import abc
 
+from bin.contentctl_project.contentctl_core.application.factory.utils.content_index import ContentIndex
 from bin.contentctl_project.contentctl_core.domain.entities.security_content_object import SecurityContentObject
 from bin.contentctl_project.contentctl_core.domain.entities.enums.enums import SecurityContentType
 
@@ -7,11 +8,11 @@ from bin.contentctl_project.contentctl_core.domain.entities.enums.enums import S
 class StoryBuilder(abc.ABC):
 
     @abc.abstractmethod
-    def addDetections(self, detections: list) -> None:
+    def addDetections(self, content_index: ContentIndex) -> None:
         pass
 
     @abc.abstractmethod
-    def addInvestigations(self, investigations: list) -> None:
+    def addInvestigations(self, content_index: ContentIndex) -> None:
         pass
 
     @abc.abstractmethod
@@ -19,11 +20,11 @@ class StoryBuilder(abc.ABC):
         pass
 
     @abc.abstractmethod
-    def addBaselines(self, baselines: list) -> None:
+    def addBaselines(self, content_index: ContentIndex) -> None:
         pass
     
     @abc.abstractmethod
-    def addInvestigations(self, investigations: list) -> None:
+    def addInvestigations(self, content_index: ContentIndex) -> None:
         pass
 
     @abc.abstractmethod
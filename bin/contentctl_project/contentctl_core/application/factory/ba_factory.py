@@ -10,6 +10,7 @@ from bin.contentctl_project.contentctl_core.application.builder.detection_builde
 from bin.contentctl_project.contentctl_core.application.builder.story_builder import StoryBuilder
 from bin.contentctl_project.contentctl_core.application.builder.director import Director
 from bin.contentctl_project.contentctl_core.application.factory.utils.utils import Utils
+from bin.contentctl_project.contentctl_core.application.factory.utils.content_index import ContentIndex
 
 
 @dataclass(frozen=True)
@@ -48,6 +49,8 @@ class BAFactory():
             files = Utils.get_all_yml_files_from_directory(os.path.join(self.input_dto.input_path, str(type.name)))
 
         validation_error_found = False
+        # The SSA detections are only linked to their tests
+        content_index = ContentIndex.fromObjects({SecurityContentType.unit_tests: self.output_dto.tests})
 
         files_with_ssa = [f for f in files if 'ssa___' in f]
         for index,file in enumerate(files_with_ssa):
@@ -61,7 +64,7 @@ class BAFactory():
                 try:
                     if type == SecurityContentType.detections:
                         print(f"\r{'Detections Progress'.rjust(23)}: [{progress_percent:3.0f}%]...", end="", flush=True)
-                        self.input_dto.director.constructDetection(self.input_dto.detection_builder, file, [], [], [], self.output_dto.tests, {}, [], [])
+                        self.input_dto.director.constructDetection(self.input_dto.detection_builder, file, content_index, {})
                         detection = self.input_dto.detection_builder.getObject()
                         if not detection.deprecated and not detection.experimental:
                             self.output_dto.detections.append(detection)
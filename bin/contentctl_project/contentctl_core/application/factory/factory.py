@@ -1,8 +1,10 @@
+import multiprocessing
 import os
 import sys
 
+from concurrent.futures import ProcessPoolExecutor
 from pydantic import ValidationError
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from bin.contentctl_project.contentctl_core.domain.entities.enums.enums import SecurityContentProduct
 from bin.contentctl_project.contentctl_core.domain.entities.enums.enums import SecurityContentType
@@ -14,6 +16,10 @@ from bin.contentctl_project.contentctl_core.application.builder.investigation_bu
 from bin.contentctl_project.contentctl_core.application.builder.playbook_builder import PlaybookBuilder
 from bin.contentctl_project.contentctl_core.application.builder.director import Director
 from bin.contentctl_project.contentctl_core.application.factory.utils.utils import Utils
+from bin.contentctl_project.contentctl_core.application.factory.utils.build_state import BuildState
+from bin.contentctl_project.contentctl_core.application.factory.utils.content_index import ContentIndex
+from bin.contentctl_project.contentctl_core.application.factory.utils.content_view import ContentInterner
+from bin.contentctl_project.contentctl_core.domain.utils.profiler import Profiler
 from bin.contentctl_project.contentctl_core.domain.entities.link_validator import LinkValidator
 
 @dataclass(frozen=True)
@@ -28,7 +34,9 @@ class FactoryInputDto:
     director: Director
     attack_enrichment: dict
     force_cached_or_offline: bool = True
-    
+    jobs: int = 1
+    build_state_file: str = None
+
 
 @dataclass()
 class FactoryOutputDto:
@@ -41,20 +49,136 @@ class FactoryOutputDto:
      macros: list
      lookups: list
      tests: list
+     # Name based index over the objects above, filled while they are built
+     content_index: ContentIndex = field(default_factory=ContentIndex)
+
+
+PROGRESS_LABELS = {
+     SecurityContentType.lookups: 'Lookups Progress',
+     SecurityContentType.macros: 'Macros Progress',
+     SecurityContentType.deployments: 'Deployments Progress',
+     SecurityContentType.playbooks: 'Playbooks Progress',
+     SecurityContentType.baselines: 'Baselines Progress',
+     SecurityContentType.investigations: 'Investigations Progress',
+     SecurityContentType.stories: 'Stories Progress',
+     SecurityContentType.detections: 'Detections Progress',
+     SecurityContentType.unit_tests: 'Unit Tests Progress'
+}
+
+
+def construct_security_content_object(type: SecurityContentType, file: str, input_dto: FactoryInputDto, output_dto: FactoryOutputDto):
+     with Profiler.timer(os.path.relpath(file, input_dto.input_path), 'file'):
+          return build_security_content_object(type, file, input_dto, output_dto)
+
+
+def build_security_content_object(type: SecurityContentType, file: str, input_dto: FactoryInputDto, output_dto: FactoryOutputDto):
+     if type == SecurityContentType.lookups:
+          input_dto.director.constructLookup(input_dto.basic_builder, file)
+          return input_dto.basic_builder.getObject()
+
+     elif type == SecurityContentType.macros:
+          input_dto.director.constructMacro(input_dto.basic_builder, file)
+          return input_dto.basic_builder.getObject()
+
+     elif type == SecurityContentType.deployments:
+          input_dto.director.constructDeployment(input_dto.basic_builder, file)
+          return input_dto.basic_builder.getObject()
+
+     elif type == SecurityContentType.playbooks:
+          input_dto.director.constructPlaybook(input_dto.playbook_builder, file)
+          return input_dto.playbook_builder.getObject()
+
+     elif type == SecurityContentType.baselines:
+          input_dto.director.constructBaseline(input_dto.baseline_builder, file, output_dto.content_index)
+          return input_dto.baseline_builder.getObject()
+
+     elif type == SecurityContentType.investigations:
+          input_dto.director.constructInvestigation(input_dto.investigation_builder, file)
+          return input_dto.investigation_builder.getObject()
+
+     elif type == SecurityContentType.stories:
+          input_dto.director.constructStory(input_dto.story_builder, file, output_dto.content_index)
+          return input_dto.story_builder.getObject()
+
+     elif type == SecurityContentType.detections:
+          input_dto.director.constructDetection(input_dto.detection_builder, file,
+               output_dto.content_index, input_dto.attack_enrichment, input_dto.force_cached_or_offline)
+          return input_dto.detection_builder.getObject()
+
+     elif type == SecurityContentType.unit_tests:
+          input_dto.director.constructTest(input_dto.basic_builder, file)
+          return input_dto.basic_builder.getObject()
+
+
+def get_worker_context():
+     # The workers of the parallel build rely on inheriting the settings of the parent
+     # through fork: the YmlReader and ValidationCache file caches, CveEnrichment.store,
+     # the Profiler and the LinkValidator settings.  None where fork is not available
+     # (Windows), the content is then built by a single process
+     try:
+          return multiprocessing.get_context('fork')
+     except ValueError:
+          return None
+
+
+# State of a worker process in the parallel build. It is set up once per worker
+# by init_factory_worker so the (large) input and output dtos are only pickled
+# once per worker instead of once per file.
+worker_input_dto: FactoryInputDto = None
+worker_output_dto: FactoryOutputDto = None
+
+
+def init_factory_worker(input_dto: FactoryInputDto, output_dto: FactoryOutputDto, link_cache: dict) -> None:
+     global worker_input_dto, worker_output_dto
+     worker_input_dto = input_dto
+     worker_output_dto = output_dto
+     # The parent owns the on disk reference cache. Workers get a copy of its
+     # contents and hand back the stats of the references they resolved.
+     LinkValidator.use_file_cache = False
+     LinkValidator.file_cache = None
+     LinkValidator.cache = link_cache
+     # Enabled when the parent profiles (inherited through fork), but the events the
+     # parent recorded before the fork are not the worker's
+     Profiler.initialize_profiler(Profiler.enabled)
+
+
+def construct_security_content_object_worker(type: SecurityContentType, file: str) -> tuple:
+     try:
+          obj = construct_security_content_object(type, file, worker_input_dto, worker_output_dto)
+     except ValidationError as e:
+          # Return the rendered error, ValidationErrors do not survive pickling
+          return None, str(e), {}, Profiler.collect()
+
+     link_stats = {}
+     for reference in (getattr(obj, 'references', None) or []):
+          if reference in LinkValidator.cache:
+               link_stats[reference] = LinkValidator.cache[reference]
+     return obj, None, link_stats, Profiler.collect()
 
 
 class Factory():
      input_dto: FactoryInputDto
      output_dto: FactoryOutputDto
+     build_state: BuildState
+     interner: ContentInterner
 
 
      def __init__(self, output_dto: FactoryOutputDto) -> None:
         self.output_dto = output_dto
+        self.build_state = None
+        self.interner = ContentInterner()
 
 
      def execute(self, input_dto: FactoryInputDto) -> None:
           self.input_dto = input_dto
           print("Creating Security Content - ESCU. This may take some time...")
+          if input_dto.jobs > 1 and get_worker_context() is None:
+               print(f"--jobs {input_dto.jobs} needs the fork start method, which is not available on this platform. The content is built by a single process.")
+          if input_dto.build_state_file:
+               self.build_state = BuildState(input_dto.build_state_file, self.getBuildFingerprint())
+               self.build_state.load()
+          with Profiler.timer('Resolve references'):
+               self.resolveReferences()
           # order matters to load and enrich security content types
           self.createSecurityContent(SecurityContentType.unit_tests)
           self.createSecurityContent(SecurityContentType.lookups)
@@ -66,164 +190,167 @@ class Factory():
           self.createSecurityContent(SecurityContentType.detections)
           self.createSecurityContent(SecurityContentType.stories)
           LinkValidator.print_link_validation_errors()
-          
+          if self.build_state:
+               self.build_state.save()
+               print(f"Incremental build: rebuilt {self.build_state.rebuilt} objects, reused {self.build_state.reused} objects from {self.input_dto.build_state_file}")
 
-     def createSecurityContent(self, type: SecurityContentType) -> list:
-          
-          objects = []
+
+     def getBuildFingerprint(self) -> str:
+          # Any change to the enrichment data or to the settings of the builders
+          # (e.g. check_references, skip_enrichment) invalidates the whole build state
+          # The CVE and Splunk app enrichment is left out, see enrichDetections
+          builders = [self.input_dto.basic_builder, self.input_dto.detection_builder, self.input_dto.story_builder,
+               self.input_dto.baseline_builder, self.input_dto.investigation_builder, self.input_dto.playbook_builder]
+          builder_settings = [(type(builder).__name__, sorted((k, v) for k, v in vars(builder).items() if isinstance(v, (bool, int, str))))
+               for builder in builders]
+          return BuildState.get_fingerprint(os.path.abspath(self.input_dto.input_path), self.input_dto.attack_enrichment, builder_settings)
+
+
+     def resolveReferences(self) -> None:
+          # Collect the references of all the content whose references are checked and
+          # resolve them concurrently before any object is built, instead of one blocking
+          # request at a time from the validators of the objects
+          builders = {
+               SecurityContentType.detections: self.input_dto.detection_builder,
+               SecurityContentType.stories: self.input_dto.story_builder,
+               SecurityContentType.baselines: self.input_dto.baseline_builder,
+               SecurityContentType.investigations: self.input_dto.investigation_builder,
+               SecurityContentType.playbooks: self.input_dto.playbook_builder
+          }
+          references = set()
+          for type, builder in builders.items():
+               if getattr(builder, 'check_references', False) is not True:
+                    continue
+               for file in self.getSecurityContentFiles(type):
+                    references.update(self.input_dto.director.getReferences(file))
+
+          if len(references) > 0:
+               print(f"Resolving {len(references)} references...")
+               LinkValidator.resolve_references(references)
+
+
+     def getSecurityContentFiles(self, type: SecurityContentType) -> list:
           if type == SecurityContentType.deployments:
                files = Utils.get_all_yml_files_from_directory(os.path.join(self.input_dto.input_path, str(type.name), 'ESCU'))
           elif type == SecurityContentType.unit_tests:
                files = Utils.get_all_yml_files_from_directory(os.path.join(self.input_dto.input_path, 'tests'))
           else:
                files = Utils.get_all_yml_files_from_directory(os.path.join(self.input_dto.input_path, str(type.name)))
-          
+          return [f for f in files if 'ssa___' not in f]
+
+
+     def createSecurityContent(self, type: SecurityContentType) -> list:
+
           validation_error_found = False
-          
-          #Code below us commented out, but allows threaded construction of detections
-          #No issues have been observed running construction in parallel
-          '''
-          import copy
-          import threading
-          NUM_THREADS = 1
-          
-          def make_detections_thread(index:int):
-               my_dto = copy.deepcopy(self.input_dto)
-               for i in range(index, len(files), NUM_THREADS):
-                    file = files[i]
-                    if 'ssa__' in file:
-                         continue
-                    try:
-                         if type == SecurityContentType.lookups:
-                              my_dto.director.constructLookup(my_dto.basic_builder, file)
-                              self.output_dto.lookups.append(my_dto.basic_builder.getObject())
-                         
-                         elif type == SecurityContentType.macros:
-                              my_dto.director.constructMacro(my_dto.basic_builder, file)
-                              self.output_dto.macros.append(my_dto.basic_builder.getObject())
-                         
-                         elif type == SecurityContentType.deployments:
-                              my_dto.director.constructDeployment(my_dto.basic_builder, file)
-                              self.output_dto.deployments.append(my_dto.basic_builder.getObject())
-                         
-                         elif type == SecurityContentType.playbooks:
-                              my_dto.director.constructPlaybook(my_dto.playbook_builder, file)
-                              self.output_dto.playbooks.append(my_dto.playbook_builder.getObject())                    
-                         
-                         elif type == SecurityContentType.baselines:
-                              my_dto.director.constructBaseline(my_dto.baseline_builder, file, self.output_dto.deployments)
-                              baseline = my_dto.baseline_builder.getObject()
-                              self.output_dto.baselines.append(baseline)
-                         
-                         elif type == SecurityContentType.investigations:
-                              my_dto.director.constructInvestigation(my_dto.investigation_builder, file)
-                              investigation = my_dto.investigation_builder.getObject()
-                              self.output_dto.investigations.append(investigation)
-
-                         elif type == SecurityContentType.stories:
-                              my_dto.director.constructStory(my_dto.story_builder, file, 
-                                   self.output_dto.detections, self.output_dto.baselines, self.output_dto.investigations)
-                              story = my_dto.story_builder.getObject()
-                              self.output_dto.stories.append(story)
-                    
-                         elif type == SecurityContentType.detections:
-                              my_dto.director.constructDetection(my_dto.detection_builder, file, 
-                                   self.output_dto.deployments, self.output_dto.playbooks, self.output_dto.baselines,
-                                   self.output_dto.tests, my_dto.attack_enrichment, self.output_dto.macros,
-                                   self.output_dto.lookups, my_dto.force_cached_or_offline)
-                              detection = my_dto.detection_builder.getObject()
-                              self.output_dto.detections.append(detection)
-                    
-                         elif type == SecurityContentType.unit_tests:
-                              my_dto.director.constructTest(my_dto.basic_builder, file)
-                              test = my_dto.basic_builder.getObject()
-                              self.output_dto.tests.append(test)
-                    
-                    except ValidationError as e:
+
+          files_without_ssa = self.getSecurityContentFiles(type)
+          with Profiler.timer(PROGRESS_LABELS[type].replace(' Progress', ''), files=len(files_without_ssa)):
+               if type == SecurityContentType.detections:
+                    self.input_dto.detection_builder.deferEnrichment()
+               if self.build_state:
+                    results = self.createSecurityContentIncremental(type, files_without_ssa)
+               else:
+                    results = self.createSecurityContentFiles(type, files_without_ssa)
+               if type == SecurityContentType.detections:
+                    results = self.enrichDetections(results)
+
+               for index, (file, obj, error) in enumerate(results):
+
+                    #Index + 1 because we are zero indexed, not 1 indexed.  This ensures
+                    # that printouts end at 100%, not some other number
+                    progress_percent = ((index+1)/len(files_without_ssa)) * 100
+                    print(f"\r{PROGRESS_LABELS[type].rjust(23)}: [{progress_percent:3.0f}%]...", end="", flush=True)
+
+                    if error is not None:
                          print('\nValidation Error for file ' + file)
-                         print(e)
+                         print(error)
                          validation_error_found = True
-                    
-               
-
-          builder_threads = []
-          
-          for t in range(NUM_THREADS):
-               thread = threading.Thread(target=make_detections_thread,args=(t,))
-               thread.start()
-               builder_threads.append(thread)
-          
-          for thread in builder_threads:
-               thread.join()
-          '''
-          
-          #Non threaded, production version of the construction code
-          files_without_ssa = [f for f in files if 'ssa___' not in f]
-          for index,file in enumerate(files_without_ssa):
-          
-               #Index + 1 because we are zero indexed, not 1 indexed.  This ensures
-               # that printouts end at 100%, not some other number 
-               progress_percent = ((index+1)/len(files_without_ssa)) * 100
-               try:
-                    if type == SecurityContentType.lookups:
-                         print(f"\r{'Lookups Progress'.rjust(23)}: [{progress_percent:3.0f}%]...", end="", flush=True)
-                         self.input_dto.director.constructLookup(self.input_dto.basic_builder, file)
-                         self.output_dto.lookups.append(self.input_dto.basic_builder.getObject())
-                    
-                    elif type == SecurityContentType.macros:
-                         print(f"\r{'Playbooks Progress'.rjust(23)}: [{progress_percent:3.0f}%]...", end="", flush=True)
-                         self.input_dto.director.constructMacro(self.input_dto.basic_builder, file)
-                         self.output_dto.macros.append(self.input_dto.basic_builder.getObject())
-                    
-                    elif type == SecurityContentType.deployments:
-                         print(f"\r{'Deployments Progress'.rjust(23)}: [{progress_percent:3.0f}%]...", end="", flush=True)
-                         self.input_dto.director.constructDeployment(self.input_dto.basic_builder, file)
-                         self.output_dto.deployments.append(self.input_dto.basic_builder.getObject())
-                    
-                    elif type == SecurityContentType.playbooks:
-                         print(f"\r{'Playbooks Progress'.rjust(23)}: [{progress_percent:3.0f}%]...", end="", flush=True)
-                         self.input_dto.director.constructPlaybook(self.input_dto.playbook_builder, file)
-                         self.output_dto.playbooks.append(self.input_dto.playbook_builder.getObject())                    
-                    
-                    elif type == SecurityContentType.baselines:
-                         print(f"\r{'Baselines Progress'.rjust(23)}: [{progress_percent:3.0f}%]...", end="", flush=True)
-                         self.input_dto.director.constructBaseline(self.input_dto.baseline_builder, file, self.output_dto.deployments)
-                         baseline = self.input_dto.baseline_builder.getObject()
-                         self.output_dto.baselines.append(baseline)
-                    
-                    elif type == SecurityContentType.investigations:
-                         print(f"\r{'Investigations Progress'.rjust(23)}: [{progress_percent:3.0f}%]...", end="", flush=True)
-                         self.input_dto.director.constructInvestigation(self.input_dto.investigation_builder, file)
-                         investigation = self.input_dto.investigation_builder.getObject()
-                         self.output_dto.investigations.append(investigation)
-
-                    elif type == SecurityContentType.stories:
-                         print(f"\r{'Stories Progress'.rjust(23)}: [{progress_percent:3.0f}%]...", end="", flush=True)
-                         self.input_dto.director.constructStory(self.input_dto.story_builder, file, 
-                              self.output_dto.detections, self.output_dto.baselines, self.output_dto.investigations)
-                         story = self.input_dto.story_builder.getObject()
-                         self.output_dto.stories.append(story)
-               
-                    elif type == SecurityContentType.detections:
-                         print(f"\r{'Detections Progress'.rjust(23)}: [{progress_percent:3.0f}%]...", end="", flush=True)
-                         self.input_dto.director.constructDetection(self.input_dto.detection_builder, file, 
-                              self.output_dto.deployments, self.output_dto.playbooks, self.output_dto.baselines,
-                              self.output_dto.tests, self.input_dto.attack_enrichment, self.output_dto.macros,
-                              self.output_dto.lookups, self.input_dto.force_cached_or_offline)
-                         detection = self.input_dto.detection_builder.getObject()
-                         self.output_dto.detections.append(detection)
-               
-                    elif type == SecurityContentType.unit_tests:
-                         print(f"\r{'Unit Tests Progress'.rjust(23)}: [{progress_percent:3.0f}%]...", end="", flush=True)
-                         self.input_dto.director.constructTest(self.input_dto.basic_builder, file)
-                         test = self.input_dto.basic_builder.getObject()
-                         self.output_dto.tests.append(test)
-               
-               except ValidationError as e:
-                    print('\nValidation Error for file ' + file)
-                    print(e)
-                    validation_error_found = True
+                    else:
+                         # Objects built by workers or reused from the build state have their
+                         # own copies of the objects they reference
+                         obj = self.interner.intern(obj)
+                         self.getOutputList(type).append(obj)
+                         self.output_dto.content_index.addObject(type, obj)
           print("Done!")
 
           if validation_error_found:
-               sys.exit(1)
\ No newline at end of file
+               sys.exit(1)
+
+
+     def createSecurityContentFiles(self, type: SecurityContentType, files: list):
+          if self.input_dto.jobs > 1 and len(files) > 1 and get_worker_context() is not None:
+               return self.createSecurityContentParallel(type, files)
+          else:
+               return self.createSecurityContentSerial(type, files)
+
+
+     def enrichDetections(self, results):
+          # The detections are yielded as they are built, and enriched together once the
+          # last one was built.  They are the objects already yielded, enriched in place.
+          # Detections reused from the build state are enriched again, as the CVE and
+          # Splunk app data may have changed since they were recorded
+          detections = []
+          for file, obj, error in results:
+               if obj is not None:
+                    detections.append(obj)
+               yield file, obj, error
+          with Profiler.timer('enrichObjects'):
+               self.input_dto.detection_builder.enrichObjects(detections)
+
+
+     def createSecurityContentIncremental(self, type: SecurityContentType, files: list):
+          # Reuse the objects of unchanged files whose dependencies did not change and
+          # only build the others. Results are yielded in the order of the files, like
+          # for a full build.
+          self.build_state.invalidate_removed_files(type, files)
+          reusable_objects = dict()
+          for file in files:
+               obj = self.build_state.get_reusable_object(type, file)
+               if obj is not None:
+                    reusable_objects[file] = obj
+
+          build_results = iter(self.createSecurityContentFiles(type, [f for f in files if f not in reusable_objects]))
+          for file in files:
+               if file in reusable_objects:
+                    yield file, reusable_objects[file], None
+               else:
+                    file, obj, error = next(build_results)
+                    if error is None:
+                         self.build_state.record_object(type, file, obj)
+                    else:
+                         self.build_state.invalidate_file(file)
+                    yield file, obj, error
+
+
+     def createSecurityContentSerial(self, type: SecurityContentType, files: list):
+          # Objects are yielded one at a time so that each one is appended to the output
+          # before the next one is constructed
+          for file in files:
+               try:
+                    obj = construct_security_content_object(type, file, self.input_dto, self.output_dto)
+               except ValidationError as e:
+                    yield file, None, e
+                    continue
+               yield file, obj, None
+
+
+     def createSecurityContentParallel(self, type: SecurityContentType, files: list):
+          # Every worker gets its own copy of the builders, so no state is shared between
+          # files. executor.map returns the results in the order of the files, which keeps
+          # the output deterministic and the same as the serial build.
+          link_cache = {reference: LinkValidator.cache[reference] for reference in LinkValidator.cache}
+          chunksize = max(1, len(files) // (self.input_dto.jobs * 4))
+          with ProcessPoolExecutor(max_workers=self.input_dto.jobs, mp_context=get_worker_context(), initializer=init_factory_worker,
+                                   initargs=(self.input_dto, self.output_dto, link_cache)) as executor:
+               results = executor.map(construct_security_content_object_worker,
+                    [type] * len(files), files, chunksize=chunksize)
+               for file, (obj, error, link_stats, profile) in zip(files, results):
+                    LinkValidator.merge_link_stats(link_stats)
+                    Profiler.merge(*profile)
+                    yield file, obj, error
+
+
+     def getOutputList(self, type: SecurityContentType) -> list:
+          if type == SecurityContentType.unit_tests:
+               return self.output_dto.tests
+          return getattr(self.output_dto, type.name)
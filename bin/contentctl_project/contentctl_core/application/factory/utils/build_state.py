@@ -0,0 +1,173 @@
+import hashlib
+import os
+import pickle
+
+from bin.contentctl_project.contentctl_core.domain.entities.enums.enums import SecurityContentType
+from bin.contentctl_project.contentctl_core.domain.entities.spl_search import SplSearch
+
+# Bump this whenever the structure of the state or of the built objects changes
+BUILD_STATE_VERSION = 1
+
+# Key invalidated by any change to a deployment. Every detection and baseline
+# is matched against all deployments, so they all depend on it.
+DEPLOYMENTS_KEY = 'deployments'
+
+
+class BuildState():
+    '''
+    Persists the objects built by the Factory together with the hash of the file
+    they were built from and a dependency graph between them, so that a later run
+    only has to rebuild the files that changed and the objects depending on them.
+
+    Dependencies are expressed as keys. Every object provides a set of keys
+    (e.g. a baseline provides "detection:<name>" for every detection it lists)
+    and consumes a set of keys (e.g. a detection consumes "detection:<own name>").
+    When an object is rebuilt or removed, the keys it provided before and after
+    are invalidated and every object consuming one of them is rebuilt as well.
+    Content types are built in dependency order by the Factory, so keys are
+    always invalidated before their consumers are visited.
+    '''
+    state_file: str
+    fingerprint: str
+    previous_files: dict
+    files: dict
+    invalidated_keys: set
+    file_hashes: dict
+    reused: int
+    rebuilt: int
+
+    def __init__(self, state_file: str, fingerprint: str) -> None:
+        self.state_file = state_file
+        self.fingerprint = fingerprint
+        self.previous_files = dict()
+        self.files = dict()
+        self.invalidated_keys = set()
+        self.file_hashes = dict()
+        self.reused = 0
+        self.rebuilt = 0
+
+
+    @staticmethod
+    def get_fingerprint(*settings) -> str:
+        return hashlib.sha256(pickle.dumps(settings, protocol=pickle.HIGHEST_PROTOCOL)).hexdigest()
+
+
+    def load(self) -> None:
+        try:
+            with open(self.state_file, 'rb') as f:
+                state = pickle.load(f)
+        except Exception:
+            print(f"No previous build state found at {self.state_file} - Running a full build.")
+            return
+
+        if state.get('version') != BUILD_STATE_VERSION or state.get('fingerprint') != self.fingerprint:
+            print(f"Build settings changed since the build state at {self.state_file} was written - Running a full build.")
+            return
+
+        self.previous_files = state['files']
+
+
+    def save(self) -> None:
+        directory = os.path.dirname(self.state_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_file = f"{self.state_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'wb') as f:
+            pickle.dump({
+                'version': BUILD_STATE_VERSION,
+                'fingerprint': self.fingerprint,
+                'files': self.files
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, self.state_file)
+
+
+    def get_file_hash(self, file: str) -> str:
+        if file not in self.file_hashes:
+            with open(file, 'rb') as f:
+                self.file_hashes[file] = hashlib.sha256(f.read()).hexdigest()
+        return self.file_hashes[file]
+
+
+    def get_reusable_object(self, type: SecurityContentType, file: str):
+        previous = self.previous_files.get(file)
+        if previous is None or previous['type'] != type.name:
+            return None
+        if previous['hash'] != self.get_file_hash(file):
+            return None
+        if not previous['consumes'].isdisjoint(self.invalidated_keys):
+            return None
+
+        self.files[file] = previous
+        self.reused += 1
+        return previous['object']
+
+
+    def record_object(self, type: SecurityContentType, file: str, obj) -> None:
+        provides, consumes = BuildState.get_dependencies(type, obj)
+        self.invalidate_file(file)
+        self.invalidated_keys.update(provides)
+        self.files[file] = {
+            'type': type.name,
+            'hash': self.get_file_hash(file),
+            'object': obj,
+            'provides': provides,
+            'consumes': consumes
+        }
+        self.rebuilt += 1
+
+
+    def invalidate_file(self, file: str) -> None:
+        previous = self.previous_files.get(file)
+        if previous is not None:
+            self.invalidated_keys.update(previous['provides'])
+
+
+    def invalidate_removed_files(self, type: SecurityContentType, files: list) -> None:
+        current_files = set(files)
+        for file, previous in self.previous_files.items():
+            if previous['type'] == type.name and file not in current_files:
+                self.invalidated_keys.update(previous['provides'])
+
+
+    @staticmethod
+    def get_dependencies(type: SecurityContentType, obj) -> tuple:
+        provides = set()
+        consumes = set()
+
+        if type == SecurityContentType.deployments:
+            provides.add(DEPLOYMENTS_KEY)
+
+        elif type == SecurityContentType.macros:
+            provides.add('macro:' + obj.name)
+
+        elif type == SecurityContentType.lookups:
+            provides.add('lookup:' + obj.name)
+
+        elif type == SecurityContentType.unit_tests:
+            provides.add('detection:' + obj.tests[0].name)
+
+        elif type == SecurityContentType.playbooks:
+            provides.update('detection:' + name for name in (obj.tags.detections or []))
+
+        elif type == SecurityContentType.baselines:
+            provides.update('detection:' + name for name in obj.tags.detections)
+            provides.update('story:' + name for name in obj.tags.analytic_story)
+            consumes.add(DEPLOYMENTS_KEY)
+
+        elif type == SecurityContentType.investigations:
+            provides.update('story:' + name for name in obj.tags.analytic_story)
+
+        elif type == SecurityContentType.detections:
+            provides.update('story:' + name for name in obj.tags.analytic_story)
+            consumes.add(DEPLOYMENTS_KEY)
+            consumes.add('detection:' + obj.name)
+            # Referenced names are used rather than the resolved macros and lookups,
+            # so that adding a missing macro or lookup also rebuilds the detection
+            spl = SplSearch.parse(obj.search)
+            consumes.update('macro:' + name for name in spl.getMacroNames())
+            consumes.update('lookup:' + name for name in spl.lookups)
+
+        elif type == SecurityContentType.stories:
+            consumes.add('story:' + obj.name)
+
+        return provides, consumes
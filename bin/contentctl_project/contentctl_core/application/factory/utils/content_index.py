@@ -0,0 +1,115 @@
+from bin.contentctl_project.contentctl_core.domain.entities.enums.enums import SecurityContentType
+from bin.contentctl_project.contentctl_core.application.factory.utils.deployment_matcher import DeploymentMatcher
+
+
+class ContentIndex():
+    '''
+    Name based lookup tables over the security content built by the Factory.
+
+    The Factory fills the index as it builds the content, so builders can resolve
+    relationships (e.g. the baselines of a detection or the detections of a story)
+    with a dict lookup instead of scanning every object. Objects are indexed in
+    the order they are added, so the results are in the same order as a scan of
+    the corresponding output list would return them.
+    '''
+    macros: dict
+    lookups: dict
+    tests: dict
+    baselines_by_detection: dict
+    playbooks_by_detection: dict
+    detections_by_story: dict
+    baselines_by_story: dict
+    investigations_by_story: dict
+    deployments: list
+    deployment_matcher: DeploymentMatcher
+
+    def __init__(self) -> None:
+        self.macros = dict()
+        self.lookups = dict()
+        self.tests = dict()
+        self.baselines_by_detection = dict()
+        self.playbooks_by_detection = dict()
+        self.detections_by_story = dict()
+        self.baselines_by_story = dict()
+        self.investigations_by_story = dict()
+        self.deployments = list()
+        self.deployment_matcher = None
+
+
+    @staticmethod
+    def fromObjects(objects: dict) -> 'ContentIndex':
+        # Index of lists of objects by type, e.g. {SecurityContentType.deployments: [deployment]},
+        # for building content outside of the Factory
+        index = ContentIndex()
+        for type, objects_of_type in objects.items():
+            for obj in objects_of_type:
+                index.addObject(type, obj)
+        return index
+
+
+    def addObject(self, type: SecurityContentType, obj) -> None:
+        if obj is None:
+            return
+
+        if type == SecurityContentType.macros:
+            self.macros.setdefault(obj.name, []).append(obj)
+
+        elif type == SecurityContentType.lookups:
+            self.lookups.setdefault(obj.name, []).append(obj)
+
+        elif type == SecurityContentType.deployments:
+            self.deployments.append(obj)
+            self.deployment_matcher = None
+
+        elif type == SecurityContentType.unit_tests:
+            # The first test of a detection wins
+            self.tests.setdefault(obj.tests[0].name, obj)
+
+        elif type == SecurityContentType.baselines:
+            for detection in obj.tags.detections:
+                self.baselines_by_detection.setdefault(detection, []).append(obj)
+            for story in obj.tags.analytic_story:
+                self.baselines_by_story.setdefault(story, []).append(obj)
+
+        elif type == SecurityContentType.playbooks:
+            for detection in (obj.tags.detections or []):
+                self.playbooks_by_detection.setdefault(detection, []).append(obj)
+
+        elif type == SecurityContentType.investigations:
+            for story in obj.tags.analytic_story:
+                self.investigations_by_story.setdefault(story, []).append(obj)
+
+        elif type == SecurityContentType.detections:
+            for story in obj.tags.analytic_story:
+                self.detections_by_story.setdefault(story, []).append(obj)
+
+
+    def getDeploymentMatcher(self) -> DeploymentMatcher:
+        # Compiled on first use, after all deployments have been added
+        if self.deployment_matcher is None:
+            self.deployment_matcher = DeploymentMatcher(self.deployments)
+        return self.deployment_matcher
+
+    def getMacros(self, name: str) -> list:
+        return self.macros.get(name, [])
+
+    def getLookups(self, name: str) -> list:
+        return self.lookups.get(name, [])
+
+    def getTest(self, detection_name: str):
+        return self.tests.get(detection_name)
+
+    def getBaselinesForDetection(self, detection_name: str) -> list:
+        return self.baselines_by_detection.get(detection_name, [])
+
+    def getPlaybooksForDetection(self, detection_name: str) -> list:
+        return self.playbooks_by_detection.get(detection_name, [])
+
+    def getDetectionsForStory(self, story_name: str) -> list:
+        return self.detections_by_story.get(story_name, [])
+
+    def getBaselinesForStory(self, story_name: str) -> list:
+        return self.baselines_by_story.get(story_name, [])
+
+    def getInvestigationsForStory(self, story_name: str) -> list:
+        return self.investigations_by_story.get(story_name, [])
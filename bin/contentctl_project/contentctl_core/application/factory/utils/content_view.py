@@ -0,0 +1,153 @@
+import sys
+
+from pydantic import BaseModel
+
+from bin.contentctl_project.contentctl_core.domain.entities.deployment import Deployment
+from bin.contentctl_project.contentctl_core.domain.entities.macro import Macro
+from bin.contentctl_project.contentctl_core.domain.entities.lookup import Lookup
+from bin.contentctl_project.contentctl_core.domain.entities.baseline import Baseline
+from bin.contentctl_project.contentctl_core.domain.entities.playbook import Playbook
+from bin.contentctl_project.contentctl_core.domain.entities.unit_test import UnitTest
+from bin.contentctl_project.contentctl_core.domain.entities.mitre_attack_enrichment import MitreAttackEnrichment
+
+# Objects referenced by many other objects, and the field identifying each of them
+SHARED_TYPES = {
+    Deployment: 'name',
+    Macro: 'name',
+    Lookup: 'name',
+    Baseline: 'name',
+    Playbook: 'name',
+    UnitTest: 'name',
+    MitreAttackEnrichment: 'mitre_attack_id',
+}
+
+# Only short strings (names, tactics, products, ...) repeat across objects
+MAX_INTERNED_STRING_LENGTH = 128
+
+
+class ContentInterner():
+    '''
+    Keeps a single instance of every object shared between built content.
+
+    Objects built in worker processes (see Factory --jobs) or reused from the build
+    state come with their own copies of the deployments, macros, lookups, baselines,
+    playbooks, tests and MITRE ATT&CK enrichments they reference, and every detection
+    creates its own enrichment objects.  intern replaces each of these copies with the
+    first equal object of the same name, so a full build holds one of each.
+    '''
+    objects: dict
+
+    def __init__(self) -> None:
+        self.objects = dict()
+
+
+    def intern(self, obj):
+        # Returns the canonical instance of obj, after interning the objects it references
+        if isinstance(obj, list):
+            for index, item in enumerate(obj):
+                obj[index] = self.intern(item)
+            return obj
+        if not isinstance(obj, BaseModel):
+            return obj
+
+        for name, value in obj.__dict__.items():
+            if isinstance(value, (BaseModel, list)):
+                interned = self.intern(value)
+                if interned is not value:
+                    object.__setattr__(obj, name, interned)
+
+        key_field = SHARED_TYPES.get(type(obj))
+        if key_field is None:
+            return obj
+        key = (type(obj), getattr(obj, key_field))
+        canonical = self.objects.setdefault(key, obj)
+        if canonical is obj or canonical == obj:
+            return canonical
+        # Same name but different content, keep it
+        return obj
+
+
+class ContentViewList(tuple):
+    '''Immutable list of a ContentView, rendered like the list it replaces'''
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+    def __str__(self) -> str:
+        return str(list(self))
+
+
+class ContentView():
+    '''
+    Compact, read only view of built security content for the adapters.
+
+    A view has a __slots__ attribute for every field of the pydantic object it was
+    created from instead of a __dict__ and the pydantic bookkeeping, lists become
+    ContentViewList tuples and short strings are interned.  Views are created once
+    per object, so an object referenced by many others (e.g. a deployment or a
+    macro, see ContentInterner) is a single view referenced from all of them.
+    '''
+    __slots__ = ()
+    # Slotted view class of every pydantic class and set of fields
+    view_classes: dict = {}
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read only")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is read only")
+
+    def __reduce__(self):
+        # View classes are created at runtime, so they are pickled by model and fields
+        # (e.g. to render docgen pages in worker processes)
+        return (ContentView.restore, (self.model_class, self.__slots__, tuple(getattr(self, name) for name in self.__slots__)))
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__)})"
+
+
+    @staticmethod
+    def get_view_class(model_class: type, fields: tuple) -> type:
+        key = (model_class, fields)
+        if key not in ContentView.view_classes:
+            ContentView.view_classes[key] = type(model_class.__name__ + 'View', (ContentView,),
+                {'__slots__': fields, 'model_class': model_class})
+        return ContentView.view_classes[key]
+
+
+    @staticmethod
+    def restore(model_class: type, fields: tuple, values: tuple) -> 'ContentView':
+        view = object.__new__(ContentView.get_view_class(model_class, fields))
+        for name, value in zip(fields, values):
+            object.__setattr__(view, name, value)
+        return view
+
+
+    @staticmethod
+    def fromObjects(objects: list, views: dict = None) -> ContentViewList:
+        # views maps id(obj) to obj and its view, pass the same dict to share views
+        # between several calls
+        if views is None:
+            views = dict()
+        return ContentView.fromValue(objects, views)
+
+
+    @staticmethod
+    def fromValue(value, views: dict):
+        if isinstance(value, BaseModel):
+            if id(value) not in views:
+                fields = tuple(value.__dict__.keys())
+                view = ContentView.restore(type(value), fields,
+                    tuple(ContentView.fromValue(item, views) for item in value.__dict__.values()))
+                # The object is kept with its view so that its id is not reused while
+                # views is in use
+                views[id(value)] = (value, view)
+            return views[id(value)][1]
+        if isinstance(value, (list, tuple)):
+            return ContentViewList(ContentView.fromValue(item, views) for item in value)
+        if isinstance(value, dict):
+            return {key: ContentView.fromValue(item, views) for key, item in value.items()}
+        if type(value) is str and len(value) <= MAX_INTERNED_STRING_LENGTH:
+            return sys.intern(value)
+        return value
@@ -0,0 +1,72 @@
+from dataclasses import dataclass, field
+from enum import Enum
+
+
+@dataclass
+class DeploymentMatch:
+    deployment: object = None
+    # (field, value) pairs of the deployment tags the object matched
+    matched_tags: list = field(default_factory=list)
+
+    def explain(self) -> str:
+        if self.deployment is None:
+            return 'no deployment matched'
+        return self.deployment.name + ' matched on ' + ', '.join(f"{tag}={value}" for tag, value in self.matched_tags)
+
+
+class DeploymentMatcher():
+    '''
+    Matches security content against the tags of the deployments.
+
+    A deployment matches an object when one of its tags names an attribute of
+    the object whose value (or one of whose values, for lists) is equal to the
+    value of the tag. When several deployments match, the last one wins.
+
+    The tags are compiled once into field -> value -> deployment tables, so
+    matching an object only takes a dict probe per tagged field.
+    '''
+    deployments: list
+    tables: dict
+
+    def __init__(self, deployments: list) -> None:
+        self.deployments = list(deployments)
+        self.tables = dict()
+        for position, deployment in enumerate(self.deployments):
+            for tag, value in dict(deployment.tags).items():
+                if tag.startswith('_'):
+                    continue
+                try:
+                    self.tables.setdefault(tag, dict()).setdefault(value, []).append(position)
+                except TypeError:
+                    # Unhashable tag values can never be equal to an attribute value
+                    continue
+
+
+    def match(self, obj) -> DeploymentMatch:
+        best_position = -1
+        matched_tags = dict()
+        for tag, values in self.tables.items():
+            attr = getattr(obj, tag, None)
+            if attr is None or callable(attr):
+                continue
+            if isinstance(attr, (list, tuple, set)):
+                attr_values = attr
+            else:
+                attr_values = [attr]
+
+            for attr_value in attr_values:
+                if isinstance(attr_value, Enum):
+                    # Enums hash by name, the tags hold their values
+                    attr_value = attr_value.value
+                try:
+                    positions = values.get(attr_value)
+                except TypeError:
+                    continue
+                if positions:
+                    for position in positions:
+                        matched_tags.setdefault(position, []).append((tag, attr_value))
+                    best_position = max(best_position, positions[-1])
+
+        if best_position == -1:
+            return DeploymentMatch()
+        return DeploymentMatch(self.deployments[best_position], matched_tags[best_position])
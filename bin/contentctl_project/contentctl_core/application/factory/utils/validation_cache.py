@@ -0,0 +1,120 @@
+import glob
+import hashlib
+import os
+import pickle
+
+from pydantic import BaseModel
+
+from bin.contentctl_project.contentctl_core.domain.utils.profiler import Profiler
+
+# Bump this whenever the structure of the entries changes so that entries written by
+# an older version are ignored
+VALIDATION_CACHE_VERSION = 1
+
+# The validators live in these modules, any change to them invalidates every entry
+VALIDATOR_SOURCES = [
+    os.path.join(os.path.dirname(__file__), '../../../domain/entities/*.py'),
+    os.path.join(os.path.dirname(__file__), '../../../domain/entities/enums/*.py'),
+    os.path.join(os.path.dirname(__file__), '../../../domain/constants/*.py'),
+]
+
+
+class ValidationCache():
+    '''
+    Objects validated by previous runs, used by the builders in place of parse_obj.
+
+    The first time a file is validated the resulting object is stored, together with
+    a hash of the values it was validated from.  When a later run validates the very
+    same values (same file content, same builder settings and unchanged validators),
+    the stored object is loaded instead.  Like construct(), this skips the validators,
+    but it also restores the nested models and the values converted by the validators
+    exactly as validation produced them.  Objects whose references are checked are
+    always validated, since the result depends on the network.
+    '''
+    use_file_cache: bool = False
+    cache_directory: str = ".contentctl_cache/validated"
+    validators_fingerprint: str = None
+
+    @staticmethod
+    def initialize_cache(use_file_cache: bool = False, cache_directory: str = None) -> None:
+        ValidationCache.use_file_cache = use_file_cache
+        if cache_directory is not None:
+            ValidationCache.cache_directory = cache_directory
+        if use_file_cache is False:
+            return
+        try:
+            os.makedirs(ValidationCache.cache_directory, exist_ok=True)
+        except OSError:
+            print(f"Failed to create the cache directory {ValidationCache.cache_directory}.  Validated objects will not be cached.")
+            ValidationCache.use_file_cache = False
+
+
+    @staticmethod
+    def parse_obj(model_class: type, values: dict) -> BaseModel:
+        with Profiler.timer('validate', 'step'):
+            return ValidationCache.parse_values(model_class, values)
+
+
+    @staticmethod
+    def parse_values(model_class: type, values: dict) -> BaseModel:
+        if ValidationCache.use_file_cache is False or values.get('check_references') or 'file_path' not in values:
+            return model_class.parse_obj(values)
+
+        try:
+            values_hash = hashlib.sha256(pickle.dumps((VALIDATION_CACHE_VERSION, ValidationCache.get_validators_fingerprint(),
+                model_class.__module__, model_class.__qualname__, values))).hexdigest()
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return model_class.parse_obj(values)
+
+        cache_file = ValidationCache.get_cache_file(model_class, values['file_path'])
+        cached = ValidationCache.read_cache_entry(cache_file)
+        if cached is not None and cached['hash'] == values_hash:
+            Profiler.count('Validation cache', True)
+            return cached['object']
+        Profiler.count('Validation cache', False)
+
+        # Objects failing validation raise here and are never stored
+        obj = model_class.parse_obj(values)
+        ValidationCache.write_cache_entry(cache_file, {'hash': values_hash, 'object': obj})
+        return obj
+
+
+    @staticmethod
+    def get_validators_fingerprint() -> str:
+        if ValidationCache.validators_fingerprint is None:
+            sources = []
+            for pattern in VALIDATOR_SOURCES:
+                for source in sorted(glob.glob(pattern)):
+                    stat = os.stat(source)
+                    sources.append((os.path.basename(source), stat.st_size, stat.st_mtime_ns))
+            ValidationCache.validators_fingerprint = hashlib.sha256(repr(sources).encode("utf-8")).hexdigest()
+        return ValidationCache.validators_fingerprint
+
+
+    @staticmethod
+    def get_cache_file(model_class: type, file_path: str) -> str:
+        path_hash = hashlib.sha256((model_class.__qualname__ + os.path.abspath(file_path)).encode("utf-8")).hexdigest()
+        return os.path.join(ValidationCache.cache_directory, path_hash + '.pickle')
+
+
+    @staticmethod
+    def read_cache_entry(cache_file: str) -> dict:
+        try:
+            with open(cache_file, 'rb') as f:
+                return pickle.load(f)
+        except Exception:
+            # A missing or unreadable entry is simply a cache miss
+            return None
+
+
+    @staticmethod
+    def write_cache_entry(cache_file: str, entry: dict) -> None:
+        # Write to a temporary file and rename it so that concurrent readers
+        # (e.g. the workers of a --jobs build) never see a partial entry
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_file, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, cache_file)
+        except (OSError, pickle.PicklingError) as exc:
+            print(f"Failed to write the cache entry {cache_file}: {exc}")
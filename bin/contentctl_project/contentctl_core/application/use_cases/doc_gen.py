@@ -4,6 +4,7 @@ from dataclasses import dataclass
 
 from bin.contentctl_project.contentctl_core.application.factory.factory import FactoryInputDto, Factory, FactoryOutputDto
 from bin.contentctl_project.contentctl_core.application.adapter.adapter import Adapter
+from bin.contentctl_project.contentctl_core.application.factory.utils.content_view import ContentView
 
 
 @dataclass(frozen=True)
@@ -20,6 +21,12 @@ class DocGen:
         factory = Factory(factory_output_dto)
         factory.execute(input_dto.factory_input_dto)
 
-        input_dto.adapter.writeObjects([factory_output_dto.stories, factory_output_dto.detections, factory_output_dto.playbooks], input_dto.output_path)
+        # The documentation is rendered from compact read only views of the content,
+        # the pydantic objects are released once the views are built
+        content = ContentView.fromObjects([factory_output_dto.stories, factory_output_dto.detections, factory_output_dto.playbooks])
+        del factory, factory_output_dto
+
+        with input_dto.adapter:
+            input_dto.adapter.writeObjects(content, input_dto.output_path)
 
         print('Documentation generation of security content successful.')
\ No newline at end of file
@@ -1,3 +1,8 @@
+import re
+import string
+
+from bin.contentctl_project.contentctl_core.domain.entities.enums.enums import AnalyticsType, DataModel
+
 
 
 SES_CONTEXT_MAPPING = {
@@ -95,4 +100,20 @@ SES_OBSERVABLE_TYPE_MAPPING = {
     "Process": 15,
     "Process Name": 16,
     "Location": 17
-}
\ No newline at end of file
+}
+
+
+# Precomputed once for the validators of the security content objects
+VALID_PRODUCTS = [
+    "Splunk Enterprise", "Splunk Enterprise Security", "Splunk Cloud",
+    "Splunk Security Analytics for AWS", "Splunk Behavioral Analytics"
+]
+VALID_PRODUCTS_SET = frozenset(VALID_PRODUCTS)
+
+INVALID_NAME_CHARACTERS = frozenset(string.punctuation.replace("-", ""))
+
+VALID_ANALYTICS_TYPES = frozenset(el.name.lower() for el in AnalyticsType)
+VALID_DATA_MODELS = frozenset(el.name for el in DataModel)
+
+CIS20_REGEX = re.compile('CIS [0-9]{1,2}')
+MITRE_ATTACK_ID_REGEX = re.compile('T[0-9]{4}')
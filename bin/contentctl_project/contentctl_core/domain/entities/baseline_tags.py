@@ -1,6 +1,8 @@
 
 from pydantic import BaseModel, validator, ValidationError
 
+from bin.contentctl_project.contentctl_core.domain.constants.constants import VALID_PRODUCTS, VALID_PRODUCTS_SET
+
 
 
 class BaselineTags(BaseModel):
@@ -14,12 +16,7 @@ class BaselineTags(BaseModel):
 
     @validator('product')
     def tags_product(cls, v, values):
-        valid_products = [
-            "Splunk Enterprise", "Splunk Enterprise Security", "Splunk Cloud",
-            "Splunk Security Analytics for AWS", "Splunk Behavioral Analytics"
-        ]
-
         for value in v:
-            if value not in valid_products:
-                raise ValueError('product is not valid for ' + values['name'] + '. valid products are ' + str(valid_products))
+            if value not in VALID_PRODUCTS_SET:
+                raise ValueError('product is not valid for ' + values['name'] + '. valid products are ' + str(VALID_PRODUCTS))
         return v
\ No newline at end of file
@@ -12,6 +12,7 @@ from bin.contentctl_project.contentctl_core.domain.entities.deployment_notable i
 from bin.contentctl_project.contentctl_core.domain.entities.deployment_rba import DeploymentRBA
 from bin.contentctl_project.contentctl_core.domain.entities.deployment_slack import DeploymentSlack
 from bin.contentctl_project.contentctl_core.domain.entities.deployment_phantom import DeploymentPhantom
+from bin.contentctl_project.contentctl_core.domain.constants.constants import INVALID_NAME_CHARACTERS
 
 class Deployment(BaseModel, SecurityContentObject):
     name: str
@@ -30,8 +31,7 @@ class Deployment(BaseModel, SecurityContentObject):
 
     @validator('name')
     def name_invalid_chars(cls, v):
-        invalidChars = set(string.punctuation.replace("-", ""))
-        if any(char in invalidChars for char in v):
+        if not INVALID_NAME_CHARACTERS.isdisjoint(v):
             raise ValueError('invalid chars used in name: ' + v)
         return v
 
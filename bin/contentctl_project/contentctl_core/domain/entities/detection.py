@@ -20,6 +20,8 @@ from bin.contentctl_project.contentctl_core.domain.entities.lookup import Lookup
 from bin.contentctl_project.contentctl_core.domain.entities.baseline import Baseline
 from bin.contentctl_project.contentctl_core.domain.entities.playbook import Playbook
 from bin.contentctl_project.contentctl_core.domain.entities.link_validator import LinkValidator
+from bin.contentctl_project.contentctl_core.domain.entities.spl_search import SplSearch
+from bin.contentctl_project.contentctl_core.domain.constants.constants import INVALID_NAME_CHARACTERS, VALID_ANALYTICS_TYPES, VALID_DATA_MODELS
 import sys
 
 
@@ -70,8 +72,7 @@ class Detection(BaseModel, SecurityContentObject):
 
     @validator('name')
     def name_invalid_chars(cls, v):
-        invalidChars = set(string.punctuation.replace("-", ""))
-        if any(char in invalidChars for char in v):
+        if not INVALID_NAME_CHARACTERS.isdisjoint(v):
             raise ValueError('invalid chars used in name: ' + v)
         return v
 
@@ -93,14 +94,14 @@ class Detection(BaseModel, SecurityContentObject):
 
     @validator('type')
     def type_valid(cls, v, values):
-        if v.lower() not in [el.name.lower() for el in AnalyticsType]:
+        if v.lower() not in VALID_ANALYTICS_TYPES:
             raise ValueError('not valid analytics type: ' + values["name"])
         return v
 
     @validator('datamodel')
     def datamodel_valid(cls, v, values):
         for datamodel in v:
-            if datamodel not in [el.name for el in DataModel]:
+            if datamodel not in VALID_DATA_MODELS:
                 raise ValueError('not valid data model: ' + values["name"])
         return v
 
@@ -115,10 +116,11 @@ class Detection(BaseModel, SecurityContentObject):
     @root_validator
     def search_validation(cls, values):
         if 'ssa_' not in values['file_path']:
-            if not '_filter' in values['search']:
+            spl = SplSearch.parse(values['search'])
+            if not any('_filter' in macro for macro in spl.macros):
                 raise ValueError('filter macro missing in: ' + values["name"])
-            if any(x in values['search'] for x in ['eventtype=', 'sourcetype=', ' source=', 'index=']):
-                if not 'index=_internal' in values['search']:
+            if spl.usesFilter():
+                if not ('index', '_internal') in spl.filters:
                     raise ValueError('Use source macro instead of eventtype, sourcetype, source or index in detection: ' + values["name"])
         return values
 
@@ -41,9 +41,8 @@ class DetectionTags(BaseModel):
 
     @validator('cis20')
     def tags_cis20(cls, v, values):
-        pattern = 'CIS [0-9]{1,2}'
         for value in v:
-            if not re.match(pattern, value):
+            if not CIS20_REGEX.match(value):
                 raise ValueError('CIS controls are not following the pattern CIS xx: ' + values["name"])
         return v
 
@@ -80,9 +79,8 @@ class DetectionTags(BaseModel):
 
     @validator('mitre_attack_id')
     def tags_mitre_attack_id(cls, v, values):
-        pattern = 'T[0-9]{4}'
         for value in v:
-            if not re.match(pattern, value):
+            if not MITRE_ATTACK_ID_REGEX.match(value):
                 raise ValueError('Mitre Attack ID are not following the pattern Txxxx: ' + values["name"])
         return v
 
@@ -102,14 +100,9 @@ class DetectionTags(BaseModel):
 
     @validator('product')
     def tags_product(cls, v, values):
-        valid_products = [
-            "Splunk Enterprise", "Splunk Enterprise Security", "Splunk Cloud",
-            "Splunk Security Analytics for AWS", "Splunk Behavioral Analytics"
-        ]
-
         for value in v:
-            if value not in valid_products:
-                raise ValueError('product is not valid for ' + values['name'] + '. valid products are ' + str(valid_products))
+            if value not in VALID_PRODUCTS_SET:
+                raise ValueError('product is not valid for ' + values['name'] + '. valid products are ' + str(VALID_PRODUCTS))
         return v
 
     @validator('risk_score')
@@ -13,6 +13,7 @@ from bin.contentctl_project.contentctl_core.domain.entities.enums.enums import A
 from bin.contentctl_project.contentctl_core.domain.entities.enums.enums import DataModel
 from bin.contentctl_project.contentctl_core.domain.entities.investigation_tags import InvestigationTags
 from bin.contentctl_project.contentctl_core.domain.entities.link_validator import LinkValidator
+from bin.contentctl_project.contentctl_core.domain.constants.constants import INVALID_NAME_CHARACTERS, VALID_DATA_MODELS
 
 
 class Investigation(BaseModel, SecurityContentObject):
@@ -45,8 +46,7 @@ class Investigation(BaseModel, SecurityContentObject):
 
     @validator('name')
     def name_invalid_chars(cls, v):
-        invalidChars = set(string.punctuation.replace("-", ""))
-        if any(char in invalidChars for char in v):
+        if not INVALID_NAME_CHARACTERS.isdisjoint(v):
             raise ValueError('invalid chars used in name: ' + v)
         return v
 
@@ -69,7 +69,7 @@ class Investigation(BaseModel, SecurityContentObject):
     @validator('datamodel')
     def datamodel_valid(cls, v, values):
         for datamodel in v:
-            if datamodel not in [el.name for el in DataModel]:
+            if datamodel not in VALID_DATA_MODELS:
                 raise ValueError('not valid data model: ' + values["name"])
         return v
 
@@ -8,9 +8,15 @@ import requests
 import urllib3, urllib3.exceptions
 import time
 import abc
+import itertools
+import threading
 
 import os
-import shelve
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from bin.contentctl_project.contentctl_core.domain.entities.reference_cache import ReferenceCache
+from bin.contentctl_project.contentctl_core.domain.utils.profiler import Profiler
 
 DEFAULT_USER_AGENT_STRING = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/101.0.4951.41 Safari/537.36"
 ALLOWED_HTTP_CODES = [200]
@@ -36,6 +42,12 @@ class LinkStats(BaseModel):
     status_code: int = 0
     valid: bool = False
     resolution_time: float = 0 
+    #Validators used to revalidate the reference with a conditional request
+    etag: Union[str,None] = None
+    last_modified: Union[str,None] = None
+    #When the reference was last resolved and how many times in a row it failed
+    fetched_at: float = 0
+    failure_count: int = 0
     
     
     def is_link_valid(self, referencing_file:str)->bool:
@@ -46,6 +58,7 @@ class LinkStats(BaseModel):
     @root_validator
     def check_reference(cls, values):
         start_time = time.time()
+        values['fetched_at'] = start_time
         #Get out all the fields names to make them easier to reference
         method = values['method']
         reference = values['reference']
@@ -68,6 +81,8 @@ class LinkStats(BaseModel):
                 values['redirect'] = get.url
             else:
                 values['redirect'] = None #None is also already the default
+            values['etag'] = get.headers.get('ETag')
+            values['last_modified'] = get.headers.get('Last-Modified')
 
             #Returns the updated values and sets them for the object
             if get.status_code in allowed_http_codes:
@@ -88,13 +103,30 @@ class LinkStats(BaseModel):
 
 
 class LinkValidator(abc.ABC):
-    cache: Union[dict[str,LinkStats], shelve.Shelf] = {}
+    cache: dict[str,LinkStats] = {}
     uncached_checks: int = 0
     total_checks: int = 0
-    #cache: dict[str,LinkStats] = {}
 
     use_file_cache: bool = False
-    reference_cache_file: str ="lookups/REFERENCE_CACHE.db"
+    reference_cache_file: str ="lookups/REFERENCE_CACHE.sqlite"
+    file_cache: Union[ReferenceCache,None] = None
+    #References resolved during this run which still have to be written to the file cache
+    updated_references: set[str] = set()
+    #Cached references which are old enough to be resolved again, see is_stale
+    stale_references: set[str] = set()
+
+    #Valid references are resolved again after reference_ttl_seconds.  Failed references
+    #are retried after failure_backoff_seconds, doubling with every consecutive failure
+    #up to max_failure_backoff_seconds.  References no content used for
+    #unused_reference_max_age_seconds are removed from the file cache.
+    reference_ttl_seconds: int = 7 * 24 * 60 * 60
+    failure_backoff_seconds: int = 10 * 60
+    max_failure_backoff_seconds: int = 24 * 60 * 60
+    unused_reference_max_age_seconds: int = 90 * 24 * 60 * 60
+
+    #Limits used when resolving references in a batch, see resolve_references
+    max_concurrent_checks: int = 32
+    max_concurrent_checks_per_host: int = 4
 
     @staticmethod
     def initialize_cache(use_file_cache: bool = False):
@@ -103,42 +135,90 @@ class LinkValidator(abc.ABC):
             return
         if not os.path.exists(LinkValidator.reference_cache_file):
             print(f"Cache at {LinkValidator.reference_cache_file} not found - Creating it.")
-        
+
         try:
-            LinkValidator.cache = shelve.open(LinkValidator.reference_cache_file, flag='c', writeback=True)
-        except:
+            LinkValidator.file_cache = ReferenceCache(LinkValidator.reference_cache_file)
+            rows = LinkValidator.file_cache.load()
+        except Exception:
             print(f"Failed to create the cache file {LinkValidator.reference_cache_file}.  Reference info will not be cached.")
-            LinkValidator.cache = {}
-
-        #Remove all of the failures to force those resources to be resolved again
-        failed_refs = []
-        for ref in LinkValidator.cache.keys():
-            if LinkValidator.cache[ref].status_code not in ALLOWED_HTTP_CODES:
-                failed_refs.append(ref)
-                #can't remove it here because this will throw an error:
-                #cannot change size of dictionary while iterating over it
-            else:
-                #Set the reference count to 0 and referencing files to empty set
-                LinkValidator.cache[ref].access_count = 0
-                LinkValidator.cache[ref].referencing_files = set()
-        
-        for ref in failed_refs:
-            del(LinkValidator.cache[ref])
+            LinkValidator.file_cache = None
+            LinkValidator.use_file_cache = False
+            return
 
+        #Stale entries are still used when the references are not resolved in a batch
+        #(e.g. offline runs), but resolve_references will check them again
+        now = time.time()
+        for row in rows:
+            del(row['last_used'])
+            stats = LinkStats.construct(referencing_files=set(), access_count=0, **row)
+            LinkValidator.cache[stats.reference] = stats
+            if LinkValidator.is_stale(stats, now):
+                LinkValidator.stale_references.add(stats.reference)
+
+    @staticmethod
+    def is_stale(stats: LinkStats, now: float = None) -> bool:
+        if now is None:
+            now = time.time()
+        if stats.valid:
+            max_age = LinkValidator.reference_ttl_seconds
+        else:
+            max_age = min(LinkValidator.failure_backoff_seconds * 2 ** max(stats.failure_count - 1, 0),
+                          LinkValidator.max_failure_backoff_seconds)
+        return now - stats.fetched_at >= max_age
+
+    @staticmethod
+    def record_link_stats(reference: str, stats: LinkStats) -> None:
+        previous = LinkValidator.cache.get(reference)
+        if stats.valid:
+            stats.failure_count = 0
+        elif previous is not stats:
+            stats.failure_count = (previous.failure_count if previous is not None and not previous.valid else 0) + 1
+        LinkValidator.cache[reference] = stats
+        LinkValidator.updated_references.add(reference)
+        LinkValidator.stale_references.discard(reference)
+
+    @staticmethod
+    def flush_cache():
+        #Write the references resolved since the last flush to the file cache
+        if LinkValidator.file_cache is None or len(LinkValidator.updated_references) == 0:
+            return
+        now = time.time()
+        rows = []
+        for reference in LinkValidator.updated_references:
+            stats = LinkValidator.cache[reference]
+            rows.append({
+                'reference': reference,
+                'status_code': stats.status_code,
+                'valid': stats.valid,
+                'redirect': stats.redirect,
+                'resolution_time': stats.resolution_time,
+                'etag': stats.etag,
+                'last_modified': stats.last_modified,
+                'fetched_at': stats.fetched_at,
+                'failure_count': stats.failure_count,
+                'last_used': now
+            })
+        LinkValidator.file_cache.store(rows)
+        LinkValidator.updated_references = set()
 
-        
-             
     @staticmethod
     def close_cache():
-        if LinkValidator.use_file_cache:
-            LinkValidator.cache.close()
+        if LinkValidator.file_cache is None:
+            return
+        LinkValidator.flush_cache()
+        now = time.time()
+        LinkValidator.file_cache.touch([reference for reference, stats in LinkValidator.cache.items() if stats.access_count > 0], now)
+        LinkValidator.file_cache.prune(now - LinkValidator.unused_reference_max_age_seconds)
+        LinkValidator.file_cache.close()
+        LinkValidator.file_cache = None
 
     @staticmethod
     def validate_reference(reference: str, referencing_file:str, raise_exception_if_failure: bool = False) -> bool:
         LinkValidator.total_checks += 1
+        Profiler.count('LinkValidator', reference in LinkValidator.cache)
         if reference not in LinkValidator.cache:
             LinkValidator.uncached_checks += 1
-            LinkValidator.cache[reference] = LinkStats(reference=reference, referencing_files = set([referencing_file]))
+            LinkValidator.record_link_stats(reference, LinkStats(reference=reference, referencing_files = set([referencing_file])))
         result = LinkValidator.cache[reference].is_link_valid(referencing_file)
 
         #print(f"Total Checks: {LinkValidator.total_checks}, Percent Cached: {100*(1 - LinkValidator.uncached_checks / LinkValidator.total_checks):.2f}")
@@ -150,8 +230,127 @@ class LinkValidator(abc.ABC):
         else:
             return False
     @staticmethod
+    def resolve_references(references: set[str], revalidate: bool = False) -> None:
+        #Resolve all of the given references up front, concurrently, and store the
+        #results in the cache.  validate_reference then finds every reference in the
+        #cache and never blocks on the network while the content is being parsed.
+        #References already in the cache are only checked again if they are stale or
+        #revalidate is True, using a conditional request when the cache holds an ETag
+        #or Last-Modified.
+        pending = []
+        for reference in sorted(references):
+            if not (reference.startswith("http://") or reference.startswith("https://")):
+                #Reported by validate_reference while the content is parsed
+                continue
+            if reference not in LinkValidator.cache or revalidate or reference in LinkValidator.stale_references:
+                pending.append(reference)
+        if len(pending) == 0:
+            return
+
+        pending = LinkValidator.interleave_hosts(pending)
+
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=LinkValidator.max_concurrent_checks,
+                                                pool_maxsize=LinkValidator.max_concurrent_checks_per_host)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        host_semaphores = {}
+        for reference in pending:
+            host = urlparse(reference).netloc.lower()
+            if host not in host_semaphores:
+                host_semaphores[host] = threading.Semaphore(LinkValidator.max_concurrent_checks_per_host)
+
+        def resolve(reference: str) -> tuple[str, LinkStats]:
+            cached_stats = LinkValidator.cache[reference] if reference in LinkValidator.cache else None
+            with host_semaphores[urlparse(reference).netloc.lower()]:
+                return reference, LinkValidator.check_reference(session, reference, cached_stats)
+
+        try:
+            with ThreadPoolExecutor(max_workers=LinkValidator.max_concurrent_checks) as executor:
+                for index, (reference, stats) in enumerate(executor.map(resolve, pending)):
+                    progress_percent = ((index+1)/len(pending)) * 100
+                    print(f"\r{'References Progress'.rjust(23)}: [{progress_percent:3.0f}%]...", end="", flush=True)
+                    LinkValidator.record_link_stats(reference, stats)
+            print("Done!")
+        finally:
+            session.close()
+            LinkValidator.flush_cache()
+
+    @staticmethod
+    def interleave_hosts(references: list[str]) -> list[str]:
+        #Take the references round-robin by host.  Sorted, the references of a host are
+        #next to each other and the workers would all wait on the limit of that host
+        references_by_host = {}
+        for reference in references:
+            references_by_host.setdefault(urlparse(reference).netloc.lower(), []).append(reference)
+        return [reference for host_references in itertools.zip_longest(*references_by_host.values())
+                for reference in host_references if reference is not None]
+
+    @staticmethod
+    def check_reference(session: requests.Session, reference: str, cached_stats: Union[LinkStats,None] = None) -> LinkStats:
+        #Resolve a single reference with the pooled session.  A HEAD request is tried first
+        #since it does not download the page; servers that refuse HEAD get a GET instead.
+        defaults = LinkStats.__fields__
+        request_args = {
+            "timeout": defaults['timeout_seconds'].default,
+            "allow_redirects": defaults['allow_redirects'].default,
+            "verify": defaults['verify_ssl'].default
+        }
+        headers = dict(defaults['headers'].default)
+        etag = getattr(cached_stats, 'etag', None)
+        last_modified = getattr(cached_stats, 'last_modified', None)
+        if cached_stats is not None and cached_stats.valid:
+            if etag is not None:
+                headers["If-None-Match"] = etag
+            if last_modified is not None:
+                headers["If-Modified-Since"] = last_modified
+
+        start_time = time.time()
+        try:
+            response = session.head(reference, headers=headers, **request_args)
+            if response.status_code == 304 and cached_stats is not None:
+                #Not modified since the cached check, the cached result still holds
+                cached_stats.fetched_at = start_time
+                return cached_stats
+            if response.status_code not in ALLOWED_HTTP_CODES:
+                response.close()
+                response = session.get(reference, headers=headers, stream=True, **request_args)
+                #Only the status is needed, do not download the body
+                response.close()
+                if response.status_code == 304 and cached_stats is not None:
+                    cached_stats.fetched_at = start_time
+                    return cached_stats
+        except Exception:
+            #Unreachable, same result as the check done when LinkStats is constructed
+            return LinkStats.construct(reference=reference, referencing_files=set(), access_count=0,
+                                       status_code=0, valid=False, redirect=None,
+                                       resolution_time=time.time() - start_time, fetched_at=start_time)
+
+        return LinkStats.construct(reference=reference, referencing_files=set(), access_count=0,
+                                   status_code=response.status_code,
+                                   valid=response.status_code in ALLOWED_HTTP_CODES,
+                                   redirect=response.url if response.url != reference else None,
+                                   resolution_time=time.time() - start_time,
+                                   etag=response.headers.get('ETag'),
+                                   last_modified=response.headers.get('Last-Modified'),
+                                   fetched_at=start_time)
+
+    @staticmethod
+    def merge_link_stats(link_stats: dict[str,LinkStats]) -> None:
+        #Merge the results of references resolved in another process (see Factory --jobs)
+        for reference, stats in link_stats.items():
+            if reference in LinkValidator.cache and LinkValidator.cache[reference].fetched_at >= stats.fetched_at:
+                cached_stats = LinkValidator.cache[reference]
+                cached_stats.referencing_files.update(stats.referencing_files)
+                cached_stats.access_count = max(cached_stats.access_count, stats.access_count)
+            else:
+                LinkValidator.record_link_stats(reference, stats)
+
+    @staticmethod
     def print_link_validation_errors():
-        failures = [LinkValidator.cache[k] for k in LinkValidator.cache if LinkValidator.cache[k].valid is False]
+        #Failures loaded from the file cache are only reported if some content still uses them
+        failures = [LinkValidator.cache[k] for k in LinkValidator.cache if LinkValidator.cache[k].valid is False and len(LinkValidator.cache[k].referencing_files) > 0]
         failures.sort(key=lambda d: d.status_code)
         for failure in failures:
             print(f"Link {failure.reference} invalid with HTTP Status Code [{failure.status_code}] and referenced by the following files:")
@@ -0,0 +1,78 @@
+import os
+import sqlite3
+import time
+
+# Bump this whenever the columns of the references table change
+REFERENCE_CACHE_VERSION = 1
+
+REFERENCE_COLUMNS = ["reference", "status_code", "valid", "redirect", "resolution_time",
+                     "etag", "last_modified", "fetched_at", "failure_count", "last_used"]
+
+
+class ReferenceCache():
+    '''
+    On disk store of the results of reference checks, used by LinkValidator.
+
+    Every reference is one row of an SQLite database in WAL mode, so a run only
+    writes the rows it changed instead of rewriting the whole cache, and opening
+    the cache does not have to sync a large file.
+    '''
+    path: str
+    connection: sqlite3.Connection
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != REFERENCE_CACHE_VERSION:
+            self.connection.execute("DROP TABLE IF EXISTS reference_cache")
+            self.connection.execute(f"PRAGMA user_version={REFERENCE_CACHE_VERSION}")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS reference_cache ("
+                                "reference TEXT PRIMARY KEY, status_code INTEGER, valid INTEGER, redirect TEXT, "
+                                "resolution_time REAL, etag TEXT, last_modified TEXT, fetched_at REAL, "
+                                "failure_count INTEGER, last_used REAL)")
+        self.connection.commit()
+
+
+    def load(self) -> list[dict]:
+        cursor = self.connection.execute(f"SELECT {', '.join(REFERENCE_COLUMNS)} FROM reference_cache")
+        rows = []
+        for row in cursor:
+            row = dict(zip(REFERENCE_COLUMNS, row))
+            row['valid'] = bool(row['valid'])
+            rows.append(row)
+        return rows
+
+
+    def store(self, rows: list[dict]) -> None:
+        #Insert or replace the given rows in a single transaction
+        placeholders = ", ".join("?" for _ in REFERENCE_COLUMNS)
+        with self.connection:
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO reference_cache ({', '.join(REFERENCE_COLUMNS)}) VALUES ({placeholders})",
+                [tuple(row[column] for column in REFERENCE_COLUMNS) for row in rows])
+
+
+    def touch(self, references: list[str], last_used: float = None) -> None:
+        if last_used is None:
+            last_used = time.time()
+        with self.connection:
+            self.connection.executemany("UPDATE reference_cache SET last_used = ? WHERE reference = ?",
+                                        [(last_used, reference) for reference in references])
+
+
+    def prune(self, unused_since: float) -> int:
+        #Remove the references no content has used since the given time
+        with self.connection:
+            cursor = self.connection.execute("DELETE FROM reference_cache WHERE last_used < ?", (unused_since,))
+        return cursor.rowcount
+
+
+    def close(self) -> None:
+        self.connection.close()
@@ -0,0 +1,168 @@
+import functools
+import re
+
+# One pass over the search.  Quoted strings come first, so pipes, brackets and
+# commands inside them are text.  Splunk still expands the macros of quoted strings
+# (e.g. relative_time(now(), "`window`") or map search="..."), which are found with
+# STRING_MACRO_REGEX.  Unterminated strings and macros run to the end.
+SPL_TOKEN_REGEX = re.compile(r'''
+    (?P<string>"(?:[^"\\]|\\.)*"?)
+  | (?P<macro>`[^`]*`?)
+  | (?P<pipe>\|)
+  | (?P<open>\[)
+  | (?P<close>\])
+  | (?P<word>[^\s"`|\[\]]+)
+''', re.VERBOSE | re.DOTALL)
+
+STRING_MACRO_REGEX = re.compile(r'`([^`]*)`')
+
+LOOKUP_COMMANDS = frozenset(['lookup', 'inputlookup', 'outputlookup'])
+FILTER_FIELDS = ('index', 'sourcetype', 'source', 'eventtype')
+CASE_INSENSITIVE_FILTER_FIELDS = ('index', 'sourcetype', 'source')
+# field=value comparisons of a word, also inside functions or qualified by a dataset,
+# e.g. type=if(sourcetype=..., All_Traffic.sourcetype=... or count(index=main)
+FILTER_TERM_REGEX = re.compile(r'(?<!\w)(\w+)=+([^,()=]*)')
+DATAMODEL_PREFIXES = ('datamodel=', 'datamodel:')
+
+
+class SplSearch():
+    '''
+    What a search references, from a single tokenization of the SPL.
+
+    Use SplSearch.parse, which parses every distinct search once and returns the
+    same (read only) result to the builders, validators and adapters asking for it.
+
+    macros: calls of the macros, e.g. security_content_ctime(firstTime), including the
+        ones in quoted strings
+    lookups: lookups used by lookup, inputlookup and outputlookup
+    commands: names of the commands following a pipe, in lower case
+    datamodels: data models used through datamodel=, datamodel: or the datamodel and
+        from commands
+    filters: (field, value) of the index, sourcetype, source and eventtype terms, also
+        when qualified (e.g. if(sourcetype=... or X.sourcetype=...).  index, sourcetype
+        and source are matched in any case and reported in lower case, eventtype
+        only in lower case (eventType is a CloudTrail field)
+    words: every token outside of quoted strings and macros
+    '''
+    macros: tuple
+    lookups: tuple
+    commands: tuple
+    datamodels: tuple
+    filters: tuple
+    words: tuple
+
+    def __init__(self, macros: list, lookups: list, commands: list, datamodels: list, filters: list, words: list) -> None:
+        self.macros = tuple(macros)
+        self.lookups = tuple(lookups)
+        self.commands = tuple(commands)
+        self.datamodels = tuple(datamodels)
+        self.filters = tuple(filters)
+        self.words = tuple(words)
+
+
+    def getMacroNames(self) -> list:
+        return [macro.split('(')[0] for macro in self.macros]
+
+
+    def usesFilter(self, fields: tuple = FILTER_FIELDS) -> bool:
+        return any(field in fields for field, _ in self.filters)
+
+
+    @staticmethod
+    @functools.lru_cache(maxsize=8192)
+    def parse(search: str) -> 'SplSearch':
+        macros = []
+        lookups = []
+        commands = []
+        datamodels = []
+        filters = []
+        words = []
+
+        # Name of the current command, set after a pipe, and the number of its
+        # arguments seen so far
+        command = None
+        arguments = 0
+        expect_command = False
+        pending_filter = None
+        previous_word = None
+
+        for token in SPL_TOKEN_REGEX.finditer(search):
+            kind = token.lastgroup
+            text = token.group()
+
+            if pending_filter is not None:
+                # The value of e.g. sourcetype="x" is the string following the word
+                if kind == 'string':
+                    filters.append((pending_filter, text.strip('"')))
+                    pending_filter = None
+                    continue
+                filters.append((pending_filter, ''))
+                pending_filter = None
+
+            if kind == 'pipe':
+                expect_command = True
+                continue
+            if kind == 'open':
+                # Subsearches start with a search or a pipe
+                expect_command = True
+                command = None
+                continue
+            if kind == 'close':
+                expect_command = False
+                command = None
+                continue
+            if kind == 'macro':
+                macros.append(text.strip('`'))
+                expect_command = False
+                continue
+            if kind == 'string':
+                macros.extend(STRING_MACRO_REGEX.findall(text))
+                if command in LOOKUP_COMMANDS and arguments == 0:
+                    lookups.append(text.strip('"'))
+                arguments += 1
+                continue
+
+            words.append(text)
+            if expect_command:
+                command = text.lower()
+                commands.append(command)
+                arguments = 0
+                expect_command = False
+                previous_word = command
+                continue
+
+            term = text.lstrip('(')
+            if term.upper() == 'NOT':
+                continue
+            equals = '=' in term
+            for match in FILTER_TERM_REGEX.finditer(text):
+                field, value = match.groups()
+                if field.lower() in CASE_INSENSITIVE_FILTER_FIELDS:
+                    field = field.lower()
+                if field not in FILTER_FIELDS:
+                    continue
+                if value or match.end() < len(text):
+                    filters.append((field, value.strip('"')))
+                else:
+                    pending_filter = field
+
+            # tstats ... from datamodel=X.Y, from datamodel:X.Y, from datamodel X.Y
+            # and datamodel X Y
+            if text.lower().startswith(DATAMODEL_PREFIXES):
+                datamodels.append(text[len('datamodel='):].strip('"').split('.')[0])
+            elif previous_word == 'datamodel':
+                datamodels.append(text.split('.')[0])
+            previous_word = text.lower()
+
+            if command in LOOKUP_COMMANDS and arguments == 0:
+                if equals:
+                    # Options, e.g. append=t or update=true
+                    continue
+                lookups.append(text)
+            if command is not None:
+                arguments += 1
+
+        if pending_filter is not None:
+            filters.append((pending_filter, ''))
+
+        return SplSearch(macros, lookups, commands, datamodels, filters, words)
@@ -8,6 +8,7 @@ from datetime import datetime
 from bin.contentctl_project.contentctl_core.domain.entities.security_content_object import SecurityContentObject
 from bin.contentctl_project.contentctl_core.domain.entities.story_tags import StoryTags
 from bin.contentctl_project.contentctl_core.domain.entities.link_validator import LinkValidator
+from bin.contentctl_project.contentctl_core.domain.constants.constants import INVALID_NAME_CHARACTERS
 
 class Story(BaseModel, SecurityContentObject):
     # story spec
@@ -34,8 +35,7 @@ class Story(BaseModel, SecurityContentObject):
     
     @validator('name')
     def name_invalid_chars(cls, v):
-        invalidChars = set(string.punctuation.replace("-", ""))
-        if any(char in invalidChars for char in v):
+        if not INVALID_NAME_CHARACTERS.isdisjoint(v):
             raise ValueError('invalid chars used in name: ' + v)
         return v
 
@@ -2,6 +2,7 @@
 
 from pydantic import BaseModel, validator, ValidationError
 from bin.contentctl_project.contentctl_core.domain.entities.mitre_attack_enrichment import MitreAttackEnrichment
+from bin.contentctl_project.contentctl_core.domain.constants.constants import VALID_PRODUCTS, VALID_PRODUCTS_SET
 
 
 class StoryTags(BaseModel):
@@ -21,12 +22,7 @@ class StoryTags(BaseModel):
 
     @validator('product')
     def tags_product(cls, v, values):
-        valid_products = [
-            "Splunk Enterprise", "Splunk Enterprise Security", "Splunk Cloud",
-            "Splunk Security Analytics for AWS", "Splunk Behavioral Analytics"
-        ]
-
         for value in v:
-            if value not in valid_products:
-                raise ValueError('product is not valid for ' + values['name'] + '. valid products are ' + str(valid_products))
+            if value not in VALID_PRODUCTS_SET:
+                raise ValueError('product is not valid for ' + values['name'] + '. valid products are ' + str(VALID_PRODUCTS))
         return v
\ No newline at end of file
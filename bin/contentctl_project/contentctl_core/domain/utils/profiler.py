@@ -0,0 +1,221 @@
+import enum
+import json
+import os
+import threading
+import time
+
+
+class ProfilerTimer():
+    '''Times a block, see Profiler.timer'''
+    __slots__ = ('name', 'category', 'args', 'start')
+
+    def __init__(self, name: str, category: str, args: dict) -> None:
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self) -> 'ProfilerTimer':
+        Profiler.get_stack().append(self)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        end = time.perf_counter_ns()
+        stack = Profiler.get_stack()
+        stack.pop()
+        # Stages are aggregated by their path in the summary.  Files are left out of
+        # the path so that the steps of all files add up.
+        path = '/'.join([timer.name for timer in stack if timer.category != 'file'] + [self.name])
+        Profiler.events.append({
+            'name': self.name,
+            'cat': self.category,
+            'ph': 'X',
+            'ts': self.start / 1000,
+            'dur': (end - self.start) / 1000,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'args': dict(self.args, path=path)
+        })
+
+
+class ProfiledObject():
+    '''Proxy timing every public method called on the object, see Profiler.instrument'''
+    __slots__ = ('profiled_object',)
+
+    def __init__(self, obj) -> None:
+        object.__setattr__(self, 'profiled_object', obj)
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self.profiled_object, name)
+        if name.startswith('_') or not callable(attribute):
+            return attribute
+
+        def profiled_method(*args, **kwargs):
+            # e.g. writeObjects(detections) for the adapters, which are called once per type
+            content_types = [arg.name for arg in args if isinstance(arg, enum.Enum)]
+            timer_name = f"{name}({', '.join(content_types)})" if content_types else name
+            with Profiler.timer(timer_name, 'step'):
+                return attribute(*args, **kwargs)
+        return profiled_method
+
+    def __setattr__(self, name: str, value) -> None:
+        setattr(self.profiled_object, name, value)
+
+
+class Profiler():
+    '''
+    Hierarchical timers and cache counters of a run, enabled with --profile.
+
+    Timers nest: a detection file is timed inside the stage building all of the
+    detections, and the steps of the director (setObject, addDeployment, ...) inside
+    the file.  Every timed block becomes a complete event of the Chrome trace event
+    format, written by write_trace and viewable in chrome://tracing or Perfetto.
+    print_summary adds the time of each stage up, and prints the cache counters and
+    the slowest files.  While profiling is disabled, timer returns a shared no-op
+    context manager and count returns at once.
+    '''
+    enabled: bool = False
+    events: list = []
+    # Hits and misses of every cache, by name of the cache
+    counters: dict = {}
+    local: threading.local = threading.local()
+    start_time: int = None
+
+    @staticmethod
+    def initialize_profiler(enabled: bool = False) -> None:
+        Profiler.enabled = enabled
+        Profiler.events = []
+        Profiler.counters = {}
+        Profiler.local = threading.local()
+        Profiler.start_time = time.perf_counter_ns()
+
+
+    @staticmethod
+    def get_stack() -> list:
+        stack = getattr(Profiler.local, 'stack', None)
+        if stack is None:
+            stack = Profiler.local.stack = []
+        return stack
+
+
+    @staticmethod
+    def timer(name: str, category: str = 'stage', **args):
+        if Profiler.enabled is False:
+            return NO_TIMER
+        return ProfilerTimer(name, category, args)
+
+
+    @staticmethod
+    def instrument(obj):
+        # Builders and adapters, every method called on the returned object is timed
+        if Profiler.enabled is False:
+            return obj
+        return ProfiledObject(obj)
+
+
+    @staticmethod
+    def count(cache_name: str, hit: bool) -> None:
+        if Profiler.enabled is False:
+            return
+        counter = Profiler.counters.setdefault(cache_name, [0, 0])
+        counter[0 if hit else 1] += 1
+
+
+    @staticmethod
+    def collect() -> tuple:
+        # Events and counters recorded so far, handed from the workers of a --jobs
+        # build to the parent, which merges them
+        events, counters = Profiler.events, Profiler.counters
+        Profiler.events = []
+        Profiler.counters = {}
+        return events, counters
+
+
+    @staticmethod
+    def merge(events: list, counters: dict) -> None:
+        # Events of a worker are nested in the timer open in the parent
+        parent_path = '/'.join(timer.name for timer in Profiler.get_stack() if timer.category != 'file')
+        for event in events:
+            if parent_path:
+                event['args']['path'] = parent_path + '/' + event['args']['path']
+            Profiler.events.append(event)
+        for cache_name, (hits, misses) in counters.items():
+            counter = Profiler.counters.setdefault(cache_name, [0, 0])
+            counter[0] += hits
+            counter[1] += misses
+
+
+    @staticmethod
+    def write_trace(trace_file: str) -> None:
+        trace = {
+            'traceEvents': Profiler.events,
+            'displayTimeUnit': 'ms',
+            'otherData': {
+                'counters': {name: {'hits': hits, 'misses': misses} for name, (hits, misses) in Profiler.counters.items()}
+            }
+        }
+        try:
+            with open(trace_file, 'w') as f:
+                json.dump(trace, f)
+        except OSError as exc:
+            print(f"Failed to write the profile trace {trace_file}: {exc}")
+            return
+        print(f"Wrote the profile trace to {trace_file}, open it in chrome://tracing or https://ui.perfetto.dev")
+
+
+    @staticmethod
+    def get_summary(slowest_files: int = 10) -> str:
+        # Total and number of calls of every stage, in the order the stages started
+        stages = dict()
+        for event in sorted(Profiler.events, key=lambda event: event['ts']):
+            if event['cat'] == 'file':
+                continue
+            stage = stages.setdefault(event['args']['path'], [0.0, 0])
+            stage[0] += event['dur']
+            stage[1] += 1
+
+        lines = []
+        wall_time = (time.perf_counter_ns() - Profiler.start_time) / 1e9 if Profiler.start_time else 0.0
+        lines.append(f"Profile, {wall_time:.2f}s wall time")
+        lines.append(f"{'Stage'.ljust(60)} {'Calls'.rjust(8)} {'Total'.rjust(10)} {'Mean'.rjust(10)}")
+        # Children are listed below their parent
+        order = {path: index for index, path in enumerate(stages)}
+        parts = {path: path.split('/') for path in stages}
+        for path in sorted(stages, key=lambda path: [order.get('/'.join(parts[path][:depth + 1]), 0) for depth in range(len(parts[path]))]):
+            total, calls = stages[path]
+            depth = path.count('/')
+            label = ('  ' * depth + path.split('/')[-1])[:60]
+            lines.append(f"{label.ljust(60)} {calls:8d} {total / 1e6:9.3f}s {total / calls / 1e3:8.3f}ms")
+
+        if Profiler.counters:
+            lines.append('')
+            lines.append(f"{'Cache'.ljust(60)} {'Hits'.rjust(8)} {'Misses'.rjust(10)} {'Hit rate'.rjust(10)}")
+            for cache_name, (hits, misses) in sorted(Profiler.counters.items()):
+                lines.append(f"{cache_name.ljust(60)} {hits:8d} {misses:10d} {100 * hits / (hits + misses):9.1f}%")
+
+        files = sorted((event for event in Profiler.events if event['cat'] == 'file'), key=lambda event: event['dur'], reverse=True)
+        if files and slowest_files > 0:
+            lines.append('')
+            lines.append(f"Slowest {min(slowest_files, len(files))} files")
+            for event in files[:slowest_files]:
+                lines.append(f"{event['dur'] / 1e3:9.3f}ms  {event['name']}")
+        return '\n'.join(lines)
+
+
+    @staticmethod
+    def print_summary(slowest_files: int = 10) -> None:
+        print('\n' + Profiler.get_summary(slowest_files))
+
+
+class NoTimer():
+    '''Timer used while profiling is disabled'''
+    __slots__ = ()
+
+    def __enter__(self) -> 'NoTimer':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        pass
+
+
+NO_TIMER = NoTimer()
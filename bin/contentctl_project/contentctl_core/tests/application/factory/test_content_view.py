@@ -0,0 +1,55 @@
+import pickle
+
+import pytest
+from pydantic import BaseModel
+
+from bin.contentctl_project.contentctl_core.application.factory.utils.content_view import ContentInterner, ContentView
+from bin.contentctl_project.contentctl_core.domain.entities.macro import Macro
+from bin.contentctl_project.contentctl_core.domain.entities.mitre_attack_enrichment import MitreAttackEnrichment
+
+
+class Content(BaseModel):
+    name: str
+    macros: list
+    enrichment: MitreAttackEnrichment = None
+
+
+def get_content(name: str) -> Content:
+    # Every object gets its own copies, like objects built in worker processes
+    return Content(name=name,
+        macros=[Macro(name='security_content_ctime', definition='convert timeformat="%Y-%m-%dT%H:%M:%S" ctime($field$)', description='convert to ctime')],
+        enrichment=MitreAttackEnrichment(mitre_attack_id='T1003', mitre_attack_technique='OS Credential Dumping',
+            mitre_attack_tactics=['Credential Access'], mitre_attack_groups=['APT28']))
+
+
+def test_content_interner():
+    interner = ContentInterner()
+    first = interner.intern(get_content('first'))
+    second = interner.intern(get_content('second'))
+    assert first.macros[0] is second.macros[0]
+    assert first.enrichment is second.enrichment
+
+    # Same name but a different definition is not merged
+    other = get_content('other')
+    other.macros[0] = Macro(name='security_content_ctime', definition='eval time=1', description='convert to ctime')
+    other = interner.intern(other)
+    assert other.macros[0] is not first.macros[0]
+    assert other.enrichment is first.enrichment
+
+
+def test_content_view():
+    interner = ContentInterner()
+    content = [interner.intern(get_content('first')), interner.intern(get_content('second'))]
+    views = ContentView.fromObjects(content)
+
+    assert [view.name for view in views] == ['first', 'second']
+    assert views[0].macros[0] is views[1].macros[0]
+    assert views[0].enrichment.mitre_attack_tactics == ('Credential Access',)
+    assert str(views[0].enrichment.mitre_attack_tactics) == str(content[0].enrichment.mitre_attack_tactics)
+    assert not hasattr(views[0], '__dict__')
+    with pytest.raises(AttributeError):
+        views[0].name = 'changed'
+
+    views = pickle.loads(pickle.dumps(views))
+    assert views[0].macros[0] is views[1].macros[0]
+    assert views[1].enrichment.mitre_attack_id == 'T1003'
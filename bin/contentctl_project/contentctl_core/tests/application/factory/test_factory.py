@@ -1,9 +1,11 @@
 import os
+import shutil
 from re import A
 
 from bin.contentctl_project.contentctl_core.application.factory.factory import FactoryInputDto
 from bin.contentctl_project.contentctl_core.application.factory.factory import FactoryOutputDto
 from bin.contentctl_project.contentctl_core.application.factory.factory import Factory
+from bin.contentctl_project.contentctl_core.application.factory.factory import get_worker_context
 from bin.contentctl_project.contentctl_infrastructure.builder.security_content_director import SecurityContentDirector
 from bin.contentctl_project.contentctl_infrastructure.builder.security_content_basic_builder import SecurityContentBasicBuilder
 from bin.contentctl_project.contentctl_infrastructure.builder.security_content_detection_builder import SecurityContentDetectionBuilder
@@ -13,6 +15,8 @@ from bin.contentctl_project.contentctl_infrastructure.builder.security_content_i
 from bin.contentctl_project.contentctl_infrastructure.builder.security_content_baseline_builder import SecurityContentBaselineBuilder
 from bin.contentctl_project.contentctl_infrastructure.builder.attack_enrichment import AttackEnrichment
 from bin.contentctl_project.contentctl_infrastructure.builder.security_content_playbook_builder import SecurityContentPlaybookBuilder
+from bin.contentctl_project.contentctl_infrastructure.builder.cve_enrichment import CveEnrichment
+from bin.contentctl_project.contentctl_infrastructure.builder.splunk_app_enrichment import SplunkAppEnrichment
 
 
 def test_factory_ESCU():
@@ -35,3 +39,128 @@ def test_factory_ESCU():
     factory = Factory(output_dto)
     factory.execute(input_dto)
 
+
+
+def test_factory_ESCU_parallel():
+    input_path = os.path.join(os.path.dirname(__file__), '../../../../../..')
+
+    serial_output_dto = FactoryOutputDto([],[],[],[],[],[],[],[],[])
+    parallel_output_dto = FactoryOutputDto([],[],[],[],[],[],[],[],[])
+
+    for jobs, output_dto in [(1, serial_output_dto), (2, parallel_output_dto)]:
+        input_dto = FactoryInputDto(
+            input_path,
+            SecurityContentBasicBuilder(),
+            SecurityContentDetectionBuilder(skip_enrichment=True),
+            SecurityContentStoryBuilder(),
+            SecurityContentBaselineBuilder(),
+            SecurityContentInvestigationBuilder(),
+            SecurityContentPlaybookBuilder(),
+            SecurityContentDirector(),
+            AttackEnrichment.get_attack_lookup(skip_enrichment=True),
+            jobs=jobs
+        )
+        factory = Factory(output_dto)
+        factory.execute(input_dto)
+
+    assert [d.name for d in parallel_output_dto.detections] == [d.name for d in serial_output_dto.detections]
+    assert [s.name for s in parallel_output_dto.stories] == [s.name for s in serial_output_dto.stories]
+    assert parallel_output_dto.detections[0] == serial_output_dto.detections[0]
+
+
+def test_factory_worker_context():
+    # The workers inherit the cache, enrichment and profiler settings of the parent,
+    # whatever the default start method of the platform is
+    assert get_worker_context().get_start_method() == 'fork'
+
+
+def copy_test_data(tmp_path) -> str:
+    test_data_path = os.path.join(os.path.dirname(__file__), '../../../../contentctl_infrastructure/tests/builder/test_data')
+    input_path = os.path.join(tmp_path, 'security_content')
+    for source, destination in [('detection', 'detections'), ('story', 'stories'), ('baseline', 'baselines'),
+            ('investigation', 'investigations'), ('macro', 'macros'), ('lookups', 'lookups'),
+            ('deployment', 'deployments'), ('playbook', 'playbooks'), ('test', 'tests')]:
+        shutil.copytree(os.path.join(test_data_path, source), os.path.join(input_path, destination))
+    return input_path
+
+
+def test_factory_ESCU_incremental(tmp_path):
+    input_path = copy_test_data(tmp_path)
+    build_state_file = os.path.join(tmp_path, 'build_state.pickle')
+
+    def run_factory():
+        input_dto = FactoryInputDto(
+            input_path,
+            SecurityContentBasicBuilder(),
+            SecurityContentDetectionBuilder(skip_enrichment=True),
+            SecurityContentStoryBuilder(),
+            SecurityContentBaselineBuilder(),
+            SecurityContentInvestigationBuilder(),
+            SecurityContentPlaybookBuilder(),
+            SecurityContentDirector(),
+            AttackEnrichment.get_attack_lookup(skip_enrichment=True),
+            build_state_file=build_state_file
+        )
+        output_dto = FactoryOutputDto([],[],[],[],[],[],[],[],[])
+        factory = Factory(output_dto)
+        factory.execute(input_dto)
+        return factory, output_dto
+
+    factory, full_output_dto = run_factory()
+    assert factory.build_state.reused == 0
+
+    factory, output_dto = run_factory()
+    assert factory.build_state.rebuilt == 0
+    assert [d.name for d in output_dto.detections] == [d.name for d in full_output_dto.detections]
+
+    detection_file = os.path.join(input_path, 'detections', 'valid.yml')
+    with open(detection_file, 'r') as f:
+        content = f.read()
+    with open(detection_file, 'w') as f:
+        f.write(content.replace('known_false_positives:', 'known_false_positives: Updated.', 1))
+
+    # The changed detection and the story it belongs to are rebuilt
+    factory, output_dto = run_factory()
+    assert factory.build_state.rebuilt == 2
+    assert [d.name for d in output_dto.detections] == [d.name for d in full_output_dto.detections]
+
+
+def test_factory_ESCU_incremental_enrichment(tmp_path, monkeypatch):
+    input_path = copy_test_data(tmp_path)
+    build_state_file = os.path.join(tmp_path, 'build_state.pickle')
+    cve_summaries = {'CVE-2021-34527': 'PrintNightmare'}
+
+    def enrich_cves(cve_ids, force_cached_or_offline=False):
+        return [{'id': cve_id, 'summary': cve_summaries[cve_id]} for cve_id in cve_ids]
+
+    monkeypatch.setattr(CveEnrichment, 'enrich_cves', enrich_cves)
+    monkeypatch.setattr(SplunkAppEnrichment, 'enrichments', {'Splunk_TA_microsoft_sysmon': {'name': 'Splunk Add-on for Sysmon'}})
+
+    def run_factory():
+        input_dto = FactoryInputDto(
+            input_path,
+            SecurityContentBasicBuilder(),
+            SecurityContentDetectionBuilder(),
+            SecurityContentStoryBuilder(),
+            SecurityContentBaselineBuilder(),
+            SecurityContentInvestigationBuilder(),
+            SecurityContentPlaybookBuilder(),
+            SecurityContentDirector(),
+            AttackEnrichment.get_attack_lookup(skip_enrichment=True),
+            build_state_file=build_state_file
+        )
+        output_dto = FactoryOutputDto([],[],[],[],[],[],[],[],[])
+        factory = Factory(output_dto)
+        factory.execute(input_dto)
+        return factory, {d.name: d for d in output_dto.detections}
+
+    factory, detections = run_factory()
+    assert detections['Spoolsv Suspicious Loaded Modules'].cve_enrichment == [{'id': 'CVE-2021-34527', 'summary': 'PrintNightmare'}]
+
+    # The reused detections get the CVE and Splunk app data of this run, not the recorded one
+    cve_summaries['CVE-2021-34527'] = 'Windows Print Spooler Remote Code Execution Vulnerability'
+    SplunkAppEnrichment.enrichments['Splunk_TA_microsoft_sysmon'] = {'name': 'Splunk Add-on for Sysmon', 'url': 'https://splunkbase.splunk.com/app/5709/'}
+    factory, detections = run_factory()
+    assert factory.build_state.rebuilt == 0
+    assert detections['Spoolsv Suspicious Loaded Modules'].cve_enrichment == [{'id': 'CVE-2021-34527', 'summary': 'Windows Print Spooler Remote Code Execution Vulnerability'}]
+    assert [d.splunk_app_enrichment for d in detections.values() if d.tags.supported_tas] == [[SplunkAppEnrichment.enrichments['Splunk_TA_microsoft_sysmon']]]
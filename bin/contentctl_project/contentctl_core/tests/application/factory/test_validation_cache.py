@@ -0,0 +1,40 @@
+import pytest
+from pydantic import ValidationError
+
+from bin.contentctl_project.contentctl_core.application.factory.utils.validation_cache import ValidationCache
+from bin.contentctl_project.contentctl_core.domain.entities.story_tags import StoryTags
+
+
+def get_values() -> dict:
+    return {
+        'name': 'Ransomware',
+        'analytic_story': 'Ransomware',
+        'category': ['Malware'],
+        'product': ['Splunk Enterprise'],
+        'usecase': 'Advanced Threat Detection',
+        'file_path': 'stories/ransomware.yml'
+    }
+
+
+def test_validation_cache(tmp_path, monkeypatch):
+    ValidationCache.initialize_cache(True, str(tmp_path))
+    try:
+        validated = ValidationCache.parse_obj(StoryTags, get_values())
+        assert validated.product == ['Splunk Enterprise']
+
+        # The same values are not validated again
+        def parse_obj(values):
+            raise AssertionError('validated again')
+        monkeypatch.setattr(StoryTags, 'parse_obj', parse_obj)
+        cached = ValidationCache.parse_obj(StoryTags, get_values())
+        assert cached == validated
+        monkeypatch.undo()
+
+        # Other values are validated, and objects failing validation are never cached
+        values = get_values()
+        values['product'] = ['Splunk Unknown']
+        for _ in range(2):
+            with pytest.raises(ValidationError):
+                ValidationCache.parse_obj(StoryTags, values)
+    finally:
+        ValidationCache.initialize_cache(False)
@@ -0,0 +1,110 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bin.contentctl_project.contentctl_core.domain.entities.link_validator import LinkValidator, LinkStats
+
+
+class ReferenceHandler(BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def do_HEAD(self):
+        ReferenceHandler.requests_seen.append(('HEAD', self.path))
+        if self.path == '/no_head':
+            self.send_response(405)
+        elif self.path == '/etag' and self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+        elif self.path == '/missing':
+            self.send_response(404)
+        else:
+            self.send_response(200)
+            self.send_header('ETag', '"v1"')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_GET(self):
+        ReferenceHandler.requests_seen.append(('GET', self.path))
+        self.send_response(404 if self.path == '/missing' else 200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_resolve_references():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ReferenceHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    LinkValidator.cache = {}
+    ReferenceHandler.requests_seen = []
+
+    try:
+        LinkValidator.resolve_references({base + '/ok', base + '/no_head', base + '/missing', base + '/etag'})
+
+        assert LinkValidator.cache[base + '/ok'].valid is True
+        assert LinkValidator.cache[base + '/no_head'].valid is True
+        assert LinkValidator.cache[base + '/missing'].valid is False
+        assert LinkValidator.cache[base + '/missing'].status_code == 404
+        assert ('GET', '/no_head') in ReferenceHandler.requests_seen
+        assert ('GET', '/ok') not in ReferenceHandler.requests_seen
+        assert LinkValidator.validate_reference(base + '/ok', 'test_file') is True
+
+        # Cached references are not requested again unless they are revalidated
+        ReferenceHandler.requests_seen = []
+        cached_stats = LinkValidator.cache[base + '/etag']
+        LinkValidator.resolve_references({base + '/etag'})
+        assert ReferenceHandler.requests_seen == []
+        LinkValidator.resolve_references({base + '/etag'}, revalidate=True)
+        assert ReferenceHandler.requests_seen == [('HEAD', '/etag')]
+        assert LinkValidator.cache[base + '/etag'] is cached_stats
+    finally:
+        server.shutdown()
+        LinkValidator.cache = {}
+        LinkValidator.updated_references = set()
+
+
+def test_interleave_hosts():
+    references = sorted(['https://a.example/1', 'https://a.example/2', 'https://a.example/3',
+                         'https://B.example/1', 'https://b.example/2', 'https://c.example/1'])
+    assert LinkValidator.interleave_hosts(references) == ['https://B.example/1', 'https://a.example/1', 'https://c.example/1',
+                                                          'https://b.example/2', 'https://a.example/2', 'https://a.example/3']
+
+
+def test_reference_file_cache(tmp_path):
+    LinkValidator.cache = {}
+    reference_cache_file = LinkValidator.reference_cache_file
+    LinkValidator.reference_cache_file = str(tmp_path / "REFERENCE_CACHE.sqlite")
+    now = time.time()
+    valid_stats = LinkStats.construct(reference="https://valid.example", referencing_files=set(), access_count=0,
+        status_code=200, valid=True, fetched_at=now - 60)
+    old_stats = LinkStats.construct(reference="https://old.example", referencing_files=set(), access_count=0,
+        status_code=200, valid=True, fetched_at=now - LinkValidator.reference_ttl_seconds - 60)
+    failed_stats = LinkStats.construct(reference="https://failed.example", referencing_files=set(), access_count=0,
+        status_code=404, valid=False, fetched_at=now - 60)
+
+    try:
+        LinkValidator.initialize_cache(True)
+        for stats in [valid_stats, old_stats, failed_stats]:
+            LinkValidator.record_link_stats(stats.reference, stats)
+        # A second consecutive failure doubles the backoff
+        LinkValidator.record_link_stats(failed_stats.reference, LinkStats.construct(reference="https://failed.example",
+            referencing_files=set(), access_count=0, status_code=404, valid=False,
+            fetched_at=now - LinkValidator.failure_backoff_seconds - 60))
+        assert LinkValidator.cache["https://failed.example"].failure_count == 2
+        assert LinkValidator.validate_reference("https://valid.example", "test_file") is True
+        LinkValidator.close_cache()
+
+        LinkValidator.cache = {}
+        LinkValidator.stale_references = set()
+        LinkValidator.initialize_cache(True)
+        assert set(LinkValidator.cache.keys()) == {"https://valid.example", "https://old.example", "https://failed.example"}
+        assert LinkValidator.cache["https://valid.example"].access_count == 0
+        assert LinkValidator.stale_references == {"https://old.example"}
+        LinkValidator.close_cache()
+    finally:
+        LinkValidator.reference_cache_file = reference_cache_file
+        LinkValidator.use_file_cache = False
+        LinkValidator.cache = {}
+        LinkValidator.stale_references = set()
+        LinkValidator.updated_references = set()
@@ -0,0 +1,59 @@
+import json
+
+from bin.contentctl_project.contentctl_core.domain.utils.profiler import Profiler
+from bin.contentctl_project.contentctl_core.domain.entities.enums.enums import SecurityContentType
+
+
+class Builder():
+
+    def setObject(self, path: str) -> None:
+        with Profiler.timer('validate', 'step'):
+            self.path = path
+
+    def addMacros(self, macros: list) -> None:
+        Profiler.count('Macro cache', len(macros) > 0)
+
+
+def test_profiler_disabled():
+    Profiler.initialize_profiler(False)
+    builder = Builder()
+    assert Profiler.instrument(builder) is builder
+    with Profiler.timer('Detections'):
+        Profiler.count('Macro cache', True)
+    assert Profiler.events == [] and Profiler.counters == {}
+
+
+def test_profiler(tmp_path):
+    Profiler.initialize_profiler(True)
+    try:
+        with Profiler.timer('Detections'):
+            for file in ['detections/a.yml', 'detections/b.yml']:
+                with Profiler.timer(file, 'file'):
+                    builder = Profiler.instrument(Builder())
+                    builder.setObject(file)
+                    builder.addMacros([file])
+                    builder.addMacros([])
+            assert builder.path == 'detections/b.yml'
+            Profiler.instrument(Builder()).setObject(SecurityContentType.macros)
+
+        # Events of a worker process are nested in the open timer of the parent
+        events, counters = Profiler.collect()
+        with Profiler.timer('Stories'):
+            Profiler.merge(events, counters)
+
+        paths = [event['args']['path'] for event in Profiler.events]
+        assert 'Stories/Detections/setObject/validate' in paths
+        assert 'Stories/Detections/setObject(macros)' in paths
+        assert Profiler.counters == {'Macro cache': [2, 2]}
+
+        summary = Profiler.get_summary(1)
+        assert 'Slowest 1 files' in summary
+        assert summary.index('  Detections') < summary.index('    setObject ') < summary.index('      validate')
+
+        trace_file = tmp_path / 'trace.json'
+        Profiler.write_trace(str(trace_file))
+        trace = json.loads(trace_file.read_text())
+        assert all(event['ph'] == 'X' for event in trace['traceEvents'])
+        assert trace['otherData']['counters']['Macro cache'] == {'hits': 2, 'misses': 2}
+    finally:
+        Profiler.initialize_profiler(False)
@@ -0,0 +1,73 @@
+from bin.contentctl_project.contentctl_core.domain.entities.spl_search import SplSearch
+
+
+def test_spl_search():
+    search = '| tstats `security_content_summariesonly` count from datamodel=Endpoint.Processes where Processes.process="*`whoami`*" ' \
+        'by Processes.dest | `drop_dm_object_name(Processes)` | `security_content_ctime(firstTime)`|`security_content_ctime(lastTime)` ' \
+        '| lookup update=true ut_shannon_lookup word as Processes.dest | search NOT [| inputlookup append=T "allowed_hosts.csv" | fields dest] ' \
+        '| stats count by dest | `detection_name_filter`'
+    spl = SplSearch.parse(search)
+
+    # Splunk expands macros in quoted strings too, but pipes and commands in them are text
+    assert spl.macros == ('security_content_summariesonly', 'whoami', 'drop_dm_object_name(Processes)', 'security_content_ctime(firstTime)',
+        'security_content_ctime(lastTime)', 'detection_name_filter')
+    assert spl.getMacroNames()[2] == 'drop_dm_object_name'
+    assert spl.lookups == ('ut_shannon_lookup', 'allowed_hosts.csv')
+    assert spl.commands == ('tstats', 'lookup', 'search', 'inputlookup', 'fields', 'stats')
+    assert spl.datamodels == ('Endpoint',)
+    assert not spl.usesFilter()
+
+    # The same search is parsed once
+    assert SplSearch.parse(search) is spl
+
+
+def test_spl_search_filters():
+    spl = SplSearch.parse('index=_internal (source=/var/log/x.log) eventType=AwsApiCall | stats count by host')
+    assert spl.filters == (('index', '_internal'), ('source', '/var/log/x.log'))
+    assert spl.usesFilter()
+    assert not spl.usesFilter(('eventtype',))
+
+    spl = SplSearch.parse('`cloudtrail` sourcetype="aws:cloudtrail" | from datamodel Network_Traffic.All_Traffic')
+    assert spl.filters == (('sourcetype', 'aws:cloudtrail'),)
+    assert spl.datamodels == ('Network_Traffic',)
+
+
+def test_spl_search_filters_strict():
+    # The field names of index, sourcetype and source are matched in any case
+    spl = SplSearch.parse('Index=main SOURCETYPE="WinEventLog" Source=x | stats count')
+    assert spl.filters == (('index', 'main'), ('sourcetype', 'WinEventLog'), ('source', 'x'))
+
+    # Also inside functions and when qualified by a dataset
+    spl = SplSearch.parse('`sysmon` | eval type=if(sourcetype="xmlwineventlog", "xml", "text") | search All_Traffic.sourcetype=aws')
+    assert spl.filters == (('sourcetype', 'xmlwineventlog'), ('sourcetype', 'aws'))
+    assert SplSearch.parse('`sysmon` | stats count(index=main) by host').usesFilter()
+
+    # eventtype only in lower case, eventType is a field of CloudTrail
+    assert not SplSearch.parse('`cloudtrail` eventType=AwsApiCall EventType=x').usesFilter()
+    assert SplSearch.parse('eventtype=wineventlog_security').filters == (('eventtype', 'wineventlog_security'),)
+
+    # Quoted strings are text and other fields are not filters
+    assert not SplSearch.parse('`cloudtrail` | eval note="sourcetype=aws"').usesFilter()
+    assert not SplSearch.parse('`cloudtrail` original_sourcetype=aws').usesFilter()
+
+
+def test_spl_search_string_macros():
+    # first_time_seen_child_process_of_zoom.yml
+    spl = SplSearch.parse('| tstats `security_content_summariesonly` min(_time) as firstTime from datamodel=Endpoint.Processes '
+        'by Processes.dest | lookup zoom_first_time_child_process dest as dest OUTPUT firstTimeSeen '
+        '| where isnull(firstTimeSeen) OR firstTimeSeen > relative_time(now(), "`previously_seen_zoom_child_processes_window`") '
+        '| `security_content_ctime(firstTime)` |`first_time_seen_child_process_of_zoom_filter`')
+    assert 'previously_seen_zoom_child_processes_window' in spl.getMacroNames()
+    assert spl.lookups == ('zoom_first_time_child_process',)
+
+    # potential_password_in_username.yml
+    spl = SplSearch.parse('| tstats `security_content_summariesonly` count FROM datamodel=Authentication BY "Authentication.user" '
+        '| lookup ut_shannon_lookup word AS user | map maxsearches=70 search="| tstats `security_content_summariesonly` count '
+        'FROM datamodel=Authentication WHERE Authentication.src=\\"$src$\\" BY \\"Authentication.user\\" '
+        '| `drop_dm_object_name(\\"Authentication\\")` | `potential_password_in_username_false_positive_reduction` '
+        '| lookup not_a_lookup word | sort count" | where user!=incorrect_password | `potential_password_in_username_filter`')
+    assert spl.getMacroNames() == ['security_content_summariesonly', 'security_content_summariesonly', 'drop_dm_object_name',
+        'potential_password_in_username_false_positive_reduction', 'potential_password_in_username_filter']
+    # The pipes and the lookup of the map search are text
+    assert spl.lookups == ('ut_shannon_lookup',)
+    assert spl.commands == ('tstats', 'lookup', 'map', 'where')
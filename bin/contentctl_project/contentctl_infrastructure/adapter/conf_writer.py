@@ -1,61 +1,94 @@
 import datetime
 import os
-from jinja2 import Environment, FileSystemLoader
+import re
+from typing import Union
+
+from jinja2 import Template
 
 from bin.contentctl_project.contentctl_core.domain.entities.security_content_object import SecurityContentObject
+from bin.contentctl_project.contentctl_infrastructure.adapter.template_engine import TemplateEngine
+from bin.contentctl_project.contentctl_infrastructure.adapter.output_writer import OutputFile, OutputWriter
+
+# Matches every %field% token, including tokens overlapping on a % with the previous one
+ENRICHMENT_TOKEN_REGEX = re.compile(r'(?=%(\w+)%)')
+ENRICHMENT_MISSING_VALUE = object()
 
 class ConfWriter():
 
     @staticmethod
-    def writeConfFileHeader(output_path : str) -> None:
-        utc_time = datetime.datetime.utcnow().replace(microsecond=0).isoformat()
-        j2_env = Environment(
-            loader=FileSystemLoader(os.path.join(os.path.dirname(__file__), 'templates')), 
-            trim_blocks=True)
+    def openConfFile(output_path : str, mode : str = 'a') -> OutputFile:
+        # Streamed to a temporary file, the file is only replaced on close if its content changed
+        return OutputWriter.open(output_path, mode)
+
 
-        template = j2_env.get_template('header.j2')
-        output = template.render(time=utc_time)
-        with open(output_path, 'w') as f:
-            output = output.encode('ascii', 'ignore').decode('ascii')
-            f.write(output)
+    @staticmethod
+    def writeConfFileHeader(output : Union[str, OutputFile]) -> None:
+        # The header is left out of the comparison with the existing file, whose header
+        # (and generation time) is kept if nothing else changed
+        utc_time = datetime.datetime.utcnow().replace(microsecond=0).isoformat()
+        template = TemplateEngine.get_template('header.j2', trim_blocks=True)
+        header = template.render(time=utc_time).encode('ascii', 'ignore').decode('ascii')
+        if isinstance(output, str):
+            with ConfWriter.openConfFile(output, 'w') as f:
+                f.write_header(header)
+        else:
+            output.write_header(header)
 
 
     @staticmethod
     def writeConfFileHeaderEmpty(output_path : str) -> None:
-        with open(output_path, 'w') as f:
-            f.write('')
+        OutputWriter.write(output_path, '')
+
+
+    @staticmethod
+    def custom_jinja2_enrichment_filter(string, object):
+        # Replaces every %field% token of the string with the value of that field of the
+        # object, or else of its tags.  Only the fields named by tokens in the string
+        # are looked up.  Tokens are searched with a lookahead so that an unknown token
+        # does not hide a known one sharing its % (e.g. "%unknown%user%").
+        parts = []
+        position = 0
+        for match in ENRICHMENT_TOKEN_REGEX.finditer(string):
+            if match.start() < position:
+                continue
+            value = ConfWriter.get_enrichment_value(object, match.group(1))
+            if value is None:
+                continue
+            parts.append(string[position:match.start()])
+            parts.append(value)
+            position = match.start() + len(match.group(1)) + 2
+        parts.append(string[position:])
+        return ''.join(parts)
+
+
+    @staticmethod
+    def get_enrichment_value(object, key: str) -> str:
+        if key.startswith('__') or key == "_abc_impl":
+            return None
+        for source in (object, object.tags):
+            value = getattr(source, key, ENRICHMENT_MISSING_VALUE)
+            if value is not ENRICHMENT_MISSING_VALUE and not callable(value):
+                return str(value)
+        return None
 
 
     @staticmethod
-    def writeConfFile(template_name : str, output_path : str, objects : list) -> None:
-
-        def custom_jinja2_enrichment_filter(string, object):
-            customized_string = string
-
-            for key in dir(object):
-                if type(key) is not str:
-                    key = key.decode()
-                if not key.startswith('__') and not key == "_abc_impl" and not callable(getattr(object, key)):
-                    if hasattr(object, key):
-                        customized_string = customized_string.replace("%" + key + "%", str(getattr(object, key)))
-
-            for key in dir(object.tags):
-                if type(key) is not str:
-                    key = key.decode()
-                if not key.startswith('__') and not key == "_abc_impl" and not callable(getattr(object.tags, key)):
-                    if hasattr(object.tags, key):
-                        customized_string = customized_string.replace("%" + key + "%", str(getattr(object.tags, key)))
-
-            return customized_string
-
-        j2_env = Environment(
-            loader=FileSystemLoader(os.path.join(os.path.dirname(__file__), 'templates')), 
-            trim_blocks=True)
-
-        j2_env.filters['custom_jinja2_enrichment_filter'] = custom_jinja2_enrichment_filter
-        template = j2_env.get_template(template_name)
-        output = template.render(objects=objects)
-        with open(output_path, 'a') as f:
-            output = output.encode('ascii', 'ignore').decode('ascii')
-            f.write(output)
+    def writeConfFile(template_name : str, output : Union[str, OutputFile], objects : list) -> None:
+        template = TemplateEngine.get_template(template_name, trim_blocks=True)
+        ConfWriter.writeTemplate(template, output, 'a', objects=objects)
+
+
+    @staticmethod
+    def writeTemplate(template : Template, output : Union[str, OutputFile], mode : str, **context) -> None:
+        # Stream the rendered template into the file chunk by chunk instead of
+        # rendering the whole file into memory first.  output is either the path
+        # of the file, opened with mode, or a file that is already open.
+        if isinstance(output, str):
+            with ConfWriter.openConfFile(output, mode) as f:
+                ConfWriter.writeTemplate(template, f, mode, **context)
+            return
+        for chunk in template.generate(**context):
+            output.write(chunk.encode('ascii', 'ignore').decode('ascii'))
+
 
+TemplateEngine.add_filter('custom_jinja2_enrichment_filter', ConfWriter.custom_jinja2_enrichment_filter)
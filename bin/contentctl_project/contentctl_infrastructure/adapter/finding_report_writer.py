@@ -1,9 +1,9 @@
 import os
 import re
-from jinja2 import Environment, FileSystemLoader
 
 from bin.contentctl_project.contentctl_core.domain.entities.detection import Detection
 from bin.contentctl_project.contentctl_core.domain.constants.constants import *
+from bin.contentctl_project.contentctl_infrastructure.adapter.template_engine import TemplateEngine
 
 class FindingReportObject():
 
@@ -65,10 +65,7 @@ class FindingReportObject():
 
         detection.tags.observable_str = observable_str
 
-        j2_env = Environment(
-            loader=FileSystemLoader(os.path.join(os.path.dirname(__file__), 'templates')), 
-            trim_blocks=True)
-        template = j2_env.get_template('finding_report.j2')
+        template = TemplateEngine.get_template('finding_report.j2', trim_blocks=True)
         body = template.render(detection=detection)
 
         return body
@@ -1,6 +1,7 @@
 import os
 
-from jinja2 import Environment, FileSystemLoader
+from bin.contentctl_project.contentctl_infrastructure.adapter.template_engine import TemplateEngine
+from bin.contentctl_project.contentctl_infrastructure.adapter.output_writer import OutputWriter
 
 
 class JinjaWriter:
@@ -8,26 +9,21 @@ class JinjaWriter:
     @staticmethod
     def writeObjectsList(template_name : str, output_path : str, objects : list) -> None:
 
-        j2_env = Environment(
-            loader=FileSystemLoader(os.path.join(os.path.dirname(__file__), 'templates')), 
-            trim_blocks=False)
-
-        template = j2_env.get_template(template_name)
+        template = TemplateEngine.get_template(template_name)
         output = template.render(objects=objects)
-        with open(output_path, 'w') as f:
-            output = output.encode('ascii', 'ignore').decode('ascii')
-            f.write(output)
+        output = output.encode('ascii', 'ignore').decode('ascii')
+        OutputWriter.write(output_path, output)
 
 
     @staticmethod
     def writeObject(template_name : str, output_path : str, object : dict) -> None:
 
-        j2_env = Environment(
-            loader=FileSystemLoader(os.path.join(os.path.dirname(__file__), 'templates')), 
-            trim_blocks=False)
+        OutputWriter.write(output_path, JinjaWriter.renderObject(template_name, object))
+
+
+    @staticmethod
+    def renderObject(template_name : str, object : dict) -> str:
 
-        template = j2_env.get_template(template_name)
+        template = TemplateEngine.get_template(template_name)
         output = template.render(object=object)
-        with open(output_path, 'w') as f:
-            output = output.encode('ascii', 'ignore').decode('ascii')
-            f.write(output)
\ No newline at end of file
+        return output.encode('ascii', 'ignore').decode('ascii')
\ No newline at end of file
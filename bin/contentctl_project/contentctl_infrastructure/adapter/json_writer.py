@@ -1,10 +1,52 @@
 import json
 
+from bin.contentctl_project.contentctl_infrastructure.adapter.output_writer import OutputWriter
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 class JsonWriter():
 
     @staticmethod
     def writeJsonObject(file_path : str, obj) -> None:
 
-        with open(file_path, 'w') as outfile:
-            json.dump(obj, outfile, ensure_ascii=False)
\ No newline at end of file
+        OutputWriter.write(file_path, JsonWriter.dumps(obj))
+
+
+    @staticmethod
+    def writeJsonArray(file_path : str, key : str, objects, compact : bool = False) -> None:
+        # Writes {key: [objects]} one object at a time, objects can be any iterable.
+        # The output is the same as writeJsonObject(file_path, {key: list(objects)}).
+        item_separator, key_separator = (',', ':') if compact else (', ', ': ')
+        with OutputWriter.open(file_path, 'w') as outfile:
+            outfile.write('{' + JsonWriter.dumps(key) + key_separator + '[')
+            for index, obj in enumerate(objects):
+                if index > 0:
+                    outfile.write(item_separator)
+                outfile.write(JsonWriter.dumps(obj, compact))
+            outfile.write(']}')
+
+
+    @staticmethod
+    def writeJsonLines(file_path : str, objects) -> None:
+        # Newline delimited JSON, one compact object per line
+        with OutputWriter.open(file_path, 'w') as outfile:
+            for obj in objects:
+                outfile.write(JsonWriter.dumps(obj, compact=True))
+                outfile.write('\n')
+
+
+    @staticmethod
+    def dumps(obj, compact : bool = False) -> str:
+        if not compact:
+            return json.dumps(obj, ensure_ascii=False)
+        if orjson is not None:
+            try:
+                return orjson.dumps(obj).decode('utf-8')
+            except TypeError:
+                # e.g. integers larger than 64 bits, which json handles
+                pass
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
@@ -1,55 +1,80 @@
 import os
 import glob
-import shutil
 
 from bin.contentctl_project.contentctl_core.application.adapter.adapter import Adapter
 from bin.contentctl_project.contentctl_infrastructure.adapter.conf_writer import ConfWriter
+from bin.contentctl_project.contentctl_infrastructure.adapter.output_writer import OutputFile, OutputWriter
 from bin.contentctl_project.contentctl_core.domain.entities.enums.enums import SecurityContentType
 
 
 class ObjToConfAdapter(Adapter):
+    #Conf files kept open from the header until close() or discard(), so that each
+    #of them is opened once no matter how many types of content are written to it
+    conf_files: dict
+
+    def __init__(self) -> None:
+        self.conf_files = dict()
+
+
+    def getConfFile(self, output_path: str, mode: str = 'a') -> OutputFile:
+        if output_path not in self.conf_files:
+            self.conf_files[output_path] = ConfWriter.openConfFile(output_path, mode)
+        return self.conf_files[output_path]
+
 
     def writeHeaders(self, output_folder: str) -> None:
-        ConfWriter.writeConfFileHeader(os.path.join(output_folder, 'default/analyticstories.conf'))
-        ConfWriter.writeConfFileHeader(os.path.join(output_folder, 'default/savedsearches.conf'))
-        ConfWriter.writeConfFileHeader(os.path.join(output_folder, 'default/collections.conf'))
-        ConfWriter.writeConfFileHeader(os.path.join(output_folder, 'default/es_investigations.conf'))
-        ConfWriter.writeConfFileHeader(os.path.join(output_folder, 'default/macros.conf'))
-        ConfWriter.writeConfFileHeader(os.path.join(output_folder, 'default/transforms.conf'))
-        ConfWriter.writeConfFileHeader(os.path.join(output_folder, 'default/workflow_actions.conf'))
+        OutputWriter.add_output_root(output_folder)
+        for conf_file in ['analyticstories.conf', 'savedsearches.conf', 'collections.conf', 'es_investigations.conf',
+                          'macros.conf', 'transforms.conf', 'workflow_actions.conf']:
+            ConfWriter.writeConfFileHeader(self.getConfFile(os.path.join(output_folder, 'default', conf_file), 'w'))
+
+
+    def close(self) -> None:
+        for conf_file in self.conf_files.values():
+            conf_file.close()
+        self.conf_files = dict()
+        OutputWriter.write_manifest()
+
+
+    def discard(self) -> None:
+        #Removes the temporary files, the conf files keep their previous content
+        for conf_file in self.conf_files.values():
+            conf_file.discard()
+        self.conf_files = dict()
 
 
     def writeObjects(self, objects: list, output_path: str, type: SecurityContentType = None) -> None:
+        OutputWriter.add_output_root(output_path)
         if type == SecurityContentType.detections:
             ConfWriter.writeConfFile('savedsearches_detections.j2', 
-            os.path.join(output_path, 'default/savedsearches.conf'), 
+            self.getConfFile(os.path.join(output_path, 'default/savedsearches.conf')), 
             objects)
 
             ConfWriter.writeConfFile('analyticstories_detections.j2',
-                os.path.join(output_path, 'default/analyticstories.conf'), 
+                self.getConfFile(os.path.join(output_path, 'default/analyticstories.conf')), 
                 objects)
 
             ConfWriter.writeConfFile('macros_detections.j2',
-                os.path.join(output_path, 'default/macros.conf'), 
+                self.getConfFile(os.path.join(output_path, 'default/macros.conf')), 
                 objects)
         
         elif type == SecurityContentType.stories:
             ConfWriter.writeConfFile('analyticstories_stories.j2',
-                os.path.join(output_path, 'default/analyticstories.conf'), 
+                self.getConfFile(os.path.join(output_path, 'default/analyticstories.conf')), 
                 objects)
 
         elif type == SecurityContentType.baselines:
             ConfWriter.writeConfFile('savedsearches_baselines.j2', 
-                os.path.join(output_path, 'default/savedsearches.conf'), 
+                self.getConfFile(os.path.join(output_path, 'default/savedsearches.conf')), 
                 objects)
 
         elif type == SecurityContentType.investigations:
             ConfWriter.writeConfFile('savedsearches_investigations.j2', 
-                os.path.join(output_path, 'default/savedsearches.conf'), 
+                self.getConfFile(os.path.join(output_path, 'default/savedsearches.conf')), 
                 objects)
             
             ConfWriter.writeConfFile('analyticstories_investigations.j2', 
-                os.path.join(output_path, 'default/analyticstories.conf'), 
+                self.getConfFile(os.path.join(output_path, 'default/analyticstories.conf')), 
                 objects)
 
             workbench_panels = []
@@ -59,37 +84,34 @@ class ObjToConfAdapter(Adapter):
                     workbench_panels.append(investigation)
                     investigation.search = investigation.search.replace(">","&gt;")
                     investigation.search = investigation.search.replace("<","&lt;")
-                    ConfWriter.writeConfFileHeaderEmpty(os.path.join(output_path, 
-                        'default/data/ui/panels/', str("workbench_panel_" + response_file_name_xml)))
-                    ConfWriter.writeConfFile('panel.j2', 
-                        os.path.join(output_path, 
-                        'default/data/ui/panels/', str("workbench_panel_" + response_file_name_xml)),
-                        [investigation.search])
+                    with ConfWriter.openConfFile(os.path.join(output_path,
+                        'default/data/ui/panels/', str("workbench_panel_" + response_file_name_xml)), 'w') as panel_file:
+                        ConfWriter.writeConfFile('panel.j2', panel_file, [investigation.search])
 
             ConfWriter.writeConfFile('es_investigations_investigations.j2', 
-                os.path.join(output_path, 'default/es_investigations.conf'), 
+                self.getConfFile(os.path.join(output_path, 'default/es_investigations.conf')), 
                 workbench_panels)
 
             ConfWriter.writeConfFile('workflow_actions.j2', 
-                os.path.join(output_path, 'default/workflow_actions.conf'), 
+                self.getConfFile(os.path.join(output_path, 'default/workflow_actions.conf')), 
                 workbench_panels)   
 
         elif type == SecurityContentType.lookups:
             ConfWriter.writeConfFile('collections.j2', 
-                os.path.join(output_path, 'default/collections.conf'), 
+                self.getConfFile(os.path.join(output_path, 'default/collections.conf')), 
                 objects)
 
             ConfWriter.writeConfFile('transforms.j2', 
-                os.path.join(output_path, 'default/transforms.conf'), 
+                self.getConfFile(os.path.join(output_path, 'default/transforms.conf')), 
                 objects)
 
             files = glob.iglob(os.path.join(os.path.dirname(__file__), '../../../..' , 'lookups', '*.csv'))
             for file in files:
                 if os.path.isfile(file):
-                    shutil.copy(file, os.path.join(output_path, 'lookups'))
+                    OutputWriter.copy(file, os.path.join(output_path, 'lookups'))
 
         elif type == SecurityContentType.macros:
             ConfWriter.writeConfFile('macros.j2', 
-                os.path.join(output_path, 'default/macros.conf'), 
+                self.getConfFile(os.path.join(output_path, 'default/macros.conf')), 
                 objects)
 
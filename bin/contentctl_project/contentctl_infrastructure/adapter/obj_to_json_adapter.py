@@ -3,82 +3,61 @@ import os
 
 from bin.contentctl_project.contentctl_core.application.adapter.adapter import Adapter
 from bin.contentctl_project.contentctl_infrastructure.adapter.json_writer import JsonWriter
+from bin.contentctl_project.contentctl_infrastructure.adapter.output_writer import OutputWriter
 from bin.contentctl_project.contentctl_core.domain.entities.enums.enums import SecurityContentType
 
 
-class ObjToJsonAdapter(Adapter):
-
-
-    def writeObjects(self, objects: list, output_path: str, type: SecurityContentType = None) -> None:
-        if type == SecurityContentType.detections:
-            obj_array = []
-            for detection in objects:
-                obj_array.append(detection.dict(exclude_none=True, 
-                    exclude =
-                    {
-                        "deprecated": True,
-                        "experimental": True,
-                        "annotations": True,
-                        "risk": True,
-                        "playbooks": True,
-                        "baselines": True,
-                        "mappings": True,
-                        "test": True,
-                        "deployment": True
-                    }
-                ))
-            
-            JsonWriter.writeJsonObject(os.path.join(output_path, 'detections.json'), {'detections': obj_array })
-        
-        elif type == SecurityContentType.stories:
-            obj_array = []
-            for story in objects:
-                obj_array.append(story.dict(exclude_none=True,
-                    exclude =
-                    {
-                        "investigations": True
-                    }
-                ))
-
-            JsonWriter.writeJsonObject(os.path.join(output_path, 'stories.json'), {'stories': obj_array })
-
-        elif type == SecurityContentType.baselines:
-            obj_array = []
-            for baseline in objects:
-                obj_array.append(baseline.dict(
-                    exclude =
-                    {
-                        "deployment": True
-                    }
-                ))
+# Name of the API file and arguments of .dict() giving the fields exported for every
+# type of content, built once instead of for every object
+JSON_API_PROJECTIONS = {
+    SecurityContentType.detections: ('detections', {
+        'exclude_none': True,
+        'exclude': {"deprecated", "experimental", "annotations", "risk", "playbooks",
+                    "baselines", "mappings", "test", "deployment"}
+    }),
+    SecurityContentType.stories: ('stories', {
+        'exclude_none': True,
+        'exclude': {"investigations"}
+    }),
+    SecurityContentType.baselines: ('baselines', {
+        'exclude': {"deployment"}
+    }),
+    SecurityContentType.investigations: ('response_tasks', {
+        'exclude_none': True
+    }),
+    SecurityContentType.lookups: ('lookups', {
+        'exclude_none': True
+    }),
+    SecurityContentType.macros: ('macros', {
+        'exclude_none': True
+    }),
+    SecurityContentType.deployments: ('deployments', {
+        'exclude_none': True
+    }),
+}
 
-            JsonWriter.writeJsonObject(os.path.join(output_path, 'baselines.json'), {'baselines': obj_array })
 
-        elif type == SecurityContentType.investigations:
-            obj_array = []
-            for investigation in objects:
-                obj_array.append(investigation.dict(exclude_none=True))
-
-            JsonWriter.writeJsonObject(os.path.join(output_path, 'response_tasks.json'), {'response_tasks': obj_array })
-        
-        elif type == SecurityContentType.lookups:
-            obj_array = []
-            for lookup in objects:
-                obj_array.append(lookup.dict(exclude_none=True))
-
-            JsonWriter.writeJsonObject(os.path.join(output_path, 'lookups.json'), {'lookups': obj_array })
-
-        elif type == SecurityContentType.macros:      
-            obj_array = []
-            for macro in objects:
-                obj_array.append(macro.dict(exclude_none=True))
-
-            JsonWriter.writeJsonObject(os.path.join(output_path, 'macros.json'), {'macros': obj_array })
+class ObjToJsonAdapter(Adapter):
 
-        elif type == SecurityContentType.deployments:
-            obj_array = []
-            for deployment in objects:
-                obj_array.append(deployment.dict(exclude_none=True))
+    def __init__(self, format: str = 'json') -> None:
+        # json: <name>.json files holding a single {<name>: [...]} object
+        # compact: the same without whitespace, encoded with orjson when it is installed
+        # ndjson: <name>.ndjson files with one compact object per line
+        self.format = format
 
-            JsonWriter.writeJsonObject(os.path.join(output_path, 'deployments.json'), {'deployments': obj_array })
+    def close(self) -> None:
+        OutputWriter.write_manifest()
 
+    def writeObjects(self, objects: list, output_path: str, type: SecurityContentType = None) -> None:
+        OutputWriter.add_output_root(output_path)
+        if type not in JSON_API_PROJECTIONS:
+            return
+
+        name, projection = JSON_API_PROJECTIONS[type]
+        # Objects are converted one at a time while they are written
+        obj_dicts = (obj.dict(**projection) for obj in objects)
+        if self.format == 'ndjson':
+            JsonWriter.writeJsonLines(os.path.join(output_path, name + '.ndjson'), obj_dicts)
+        else:
+            JsonWriter.writeJsonArray(os.path.join(output_path, name + '.json'), name, obj_dicts,
+                compact=(self.format == 'compact'))
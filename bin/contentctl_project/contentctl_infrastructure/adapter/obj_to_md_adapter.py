@@ -1,16 +1,41 @@
 import os
 import asyncio
+from concurrent.futures import ProcessPoolExecutor
 
 from bin.contentctl_project.contentctl_core.application.adapter.adapter import Adapter
 from bin.contentctl_project.contentctl_core.domain.entities.enums.enums import SecurityContentType
 from bin.contentctl_project.contentctl_infrastructure.adapter.jinja_writer import JinjaWriter
+from bin.contentctl_project.contentctl_infrastructure.adapter.output_writer import OutputWriter
+
+
+def render_object_worker(template_name: str, object) -> str:
+    # Every worker process has its own TemplateEngine, so each template is only
+    # compiled once per worker
+    return JinjaWriter.renderObject(template_name, object)
 
 
 class ObjToMdAdapter(Adapter):
     index = 0
     files_to_write = 0
-    
+    jobs = 1
+    executor = None
+
+    def __init__(self, jobs: int = 1) -> None:
+        self.jobs = jobs
+
     def writeObjects(self, objects: list, output_path: str, type: SecurityContentType = None) -> None:
+        OutputWriter.add_output_root(output_path)
+        if self.jobs > 1:
+            # Pages are rendered by a pool of worker processes and written by this
+            # process in their original order, so the output and the progress are
+            # the same as with a single process
+            with ProcessPoolExecutor(max_workers=self.jobs) as self.executor:
+                self.writeMdFiles(objects, output_path)
+            self.executor = None
+        else:
+            self.writeMdFiles(objects, output_path)
+
+    def writeMdFiles(self, objects: list, output_path: str) -> None:
         self.files_to_write = sum([len(obj) for obj in objects])
         self.index = 0
         progress_percent = ((self.index+1)/self.files_to_write) * 100
@@ -53,6 +78,10 @@ class ObjToMdAdapter(Adapter):
         self.writeObjectsMd(objects[2], os.path.join(output_path, '_playbooks'), 'doc_playbooks.j2')
         
         print("Done!")
+
+    def close(self) -> None:
+        OutputWriter.write_manifest()
+
     def writeNavigationPageObjects(self, objects: list, output_path: str) -> None:
         for obj in objects:
             JinjaWriter.writeObject('doc_navigation_pages.j2', os.path.join(output_path, '_pages', obj.lower().replace(' ', '_') + '.md'),
@@ -62,17 +91,22 @@ class ObjToMdAdapter(Adapter):
             )
 
     def writeObjectsMd(self, objects, output_path: str, template_name: str) -> None:
-        for obj in objects:
-            progress_percent = ((self.index+1)/self.files_to_write) * 100
-            self.index+=1
-            print(f"\r{'Docgen Progress'.rjust(23)}: [{progress_percent:3.0f}%]...", end="", flush=True)
-
-            JinjaWriter.writeObject(template_name, os.path.join(output_path, obj.name.lower().replace(' ', '_') + '.md'), obj)
+        self.writePages([(os.path.join(output_path, obj.name.lower().replace(' ', '_') + '.md'), obj) for obj in objects], template_name)
 
     def writeDetectionsMd(self, objects, output_path: str, template_name: str) -> None:
-        for obj in objects:
+        self.writePages([(os.path.join(output_path, obj.date + '-' + obj.name.lower().replace(' ', '_') + '.md'), obj) for obj in objects], template_name)
+
+    def writePages(self, pages: list, template_name: str) -> None:
+        if self.executor is not None and len(pages) > 1:
+            chunksize = max(1, len(pages) // (self.jobs * 4))
+            outputs = self.executor.map(render_object_worker,
+                [template_name] * len(pages), [obj for _, obj in pages], chunksize=chunksize)
+        else:
+            outputs = (JinjaWriter.renderObject(template_name, obj) for _, obj in pages)
+
+        for (page_path, _), output in zip(pages, outputs):
             progress_percent = ((self.index+1)/self.files_to_write) * 100
             self.index+=1
             print(f"\r{'Docgen Progress'.rjust(23)}: [{progress_percent:3.0f}%]...", end="", flush=True)
 
-            JinjaWriter.writeObject(template_name, os.path.join(output_path, obj.date + '-' + obj.name.lower().replace(' ', '_') + '.md'), obj)
\ No newline at end of file
+            OutputWriter.write(page_path, output)
@@ -1,9 +1,9 @@
 import os
-import re
 
 from bin.contentctl_project.contentctl_infrastructure.adapter.yml_writer import YmlWriter
 from bin.contentctl_project.contentctl_core.application.adapter.adapter import Adapter
 from bin.contentctl_project.contentctl_core.domain.entities.enums.enums import SecurityContentType
+from bin.contentctl_project.contentctl_core.domain.entities.spl_search import SplSearch
 from bin.contentctl_project.contentctl_infrastructure.adapter.finding_report_writer import FindingReportObject
 
 class ObjToYmlAdapter(Adapter):
@@ -144,6 +144,7 @@ class ObjToYmlAdapter(Adapter):
 
 
     def isComplexBARule(self, search):
-        return re.findall("stats|first_time_event|adaptive_threshold", search)
+        return any(keyword in word for word in SplSearch.parse(search).words
+            for keyword in ('stats', 'first_time_event', 'adaptive_threshold'))
 
 
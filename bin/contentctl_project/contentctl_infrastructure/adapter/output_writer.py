@@ -0,0 +1,261 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Union
+
+# Bump this whenever the format of the manifest changes
+OUTPUT_MANIFEST_VERSION = 2
+
+OUTPUT_CHUNK_SIZE = 1024 * 1024
+
+# Files created by mkstemp are only readable by their owner, the outputs get the
+# permissions open() would have given them
+UMASK = os.umask(0o022)
+os.umask(UMASK)
+FILE_MODE = 0o666 & ~UMASK
+
+
+class OutputFile():
+    '''
+    File like object the writers stream into.  The content goes to a temporary file
+    next to the output while its sha256 is computed, and on close the temporary file
+    either replaces the output or, if the content did not change, is removed.
+
+    The header (e.g. the generation time of the conf files) is written with
+    write_header and left out of the hash, so a file whose body did not change keeps
+    its existing header.
+    '''
+    def __init__(self, output_path: str, mode: str = 'w') -> None:
+        self.output_path = os.path.normpath(output_path)
+        directory = os.path.dirname(self.output_path) or '.'
+        fd, self.temp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(self.output_path) + '.', suffix='.tmp')
+        self.file = os.fdopen(fd, 'wb')
+        self.sha256 = hashlib.sha256()
+        self.header_size = 0
+        self.closed = False
+        # Whether the output was replaced, set on close
+        self.replaced = False
+        if mode.startswith('a') and os.path.isfile(self.output_path):
+            with open(self.output_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(OUTPUT_CHUNK_SIZE), b''):
+                    self.write(chunk)
+
+
+    def write_header(self, content: str) -> None:
+        if self.header_size != self.file.tell():
+            raise ValueError(f"The header of {self.output_path} must be written first")
+        data = content.encode('utf-8')
+        self.file.write(data)
+        self.header_size += len(data)
+
+
+    def write(self, content: Union[str, bytes]) -> int:
+        data = content.encode('utf-8') if isinstance(content, str) else content
+        self.sha256.update(data)
+        self.file.write(data)
+        return len(content)
+
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.file.close()
+            self.replaced = OutputWriter.replace(self.temp_path, self.output_path, self.sha256.hexdigest(), self.header_size)
+        except BaseException:
+            self.discard()
+            raise
+
+
+    def discard(self) -> None:
+        # Leaves the output as it was, e.g. when rendering failed half way
+        self.closed = True
+        self.file.close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+
+    def __enter__(self) -> 'OutputFile':
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is not None:
+            self.discard()
+        else:
+            self.close()
+
+
+class OutputWriter():
+    '''
+    Writes the output files of generate and docgen only when their content changed.
+
+    The content is streamed to a temporary file in the same directory as the output
+    while its sha256 is computed, then compared with the hash of the existing file.
+    Unchanged files are left alone, so their modification time is kept and packaging,
+    rsync or Jekyll only redo the work for the files that did change.  Changed files
+    are renamed over the old one, so readers never see a partially written file.
+
+    The hash, size and modification time of the outputs are kept in one manifest per
+    output root (the output path given to the adapters), stored in .contentctl_cache
+    next to the root.  When the size and modification time of a file still match the
+    manifest, its hash is taken from there instead of reading the file again.
+    '''
+    # Directory of the manifests, .contentctl_cache next to each output root if None
+    manifest_directory: str = None
+    # Manifest of every output root, by absolute path of the root, loaded when first used
+    manifests: dict = {}
+    manifest_lock = threading.Lock()
+    written: int = 0
+    unchanged: int = 0
+
+    @staticmethod
+    def open(output_path: str, mode: str = 'w') -> OutputFile:
+        return OutputFile(output_path, mode)
+
+
+    @staticmethod
+    def write(output_path: str, content: Union[str, bytes]) -> bool:
+        # Returns whether the file was written
+        with OutputFile(output_path) as f:
+            f.write(content)
+        return f.replaced
+
+
+    @staticmethod
+    def copy(source_path: str, output_path: str) -> None:
+        if os.path.isdir(output_path):
+            output_path = os.path.join(output_path, os.path.basename(source_path))
+        with OutputFile(output_path) as output, open(source_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(OUTPUT_CHUNK_SIZE), b''):
+                output.write(chunk)
+
+
+    @staticmethod
+    def replace(temp_path: str, output_path: str, digest: str, header_size: int) -> bool:
+        # Returns whether the output was replaced by the temporary file
+        if OutputWriter.get_file_hash(output_path, header_size) == digest:
+            os.remove(temp_path)
+            with OutputWriter.manifest_lock:
+                OutputWriter.unchanged += 1
+            return False
+
+        os.chmod(temp_path, FILE_MODE)
+        os.replace(temp_path, output_path)
+        stat = os.stat(output_path)
+        with OutputWriter.manifest_lock:
+            OutputWriter.set_manifest_entry(output_path, {'sha256': digest, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'header_size': header_size})
+            OutputWriter.written += 1
+        return True
+
+
+    @staticmethod
+    def get_file_hash(output_path: str, header_size: int = 0) -> str:
+        # Hash of the file without its first header_size bytes
+        try:
+            stat = os.stat(output_path)
+        except FileNotFoundError:
+            return None
+
+        with OutputWriter.manifest_lock:
+            entry = OutputWriter.get_manifest_entry(output_path)
+        if entry is not None and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns and entry['header_size'] == header_size:
+            return entry['sha256']
+
+        sha256 = hashlib.sha256()
+        with open(output_path, 'rb') as f:
+            f.seek(header_size)
+            for chunk in iter(lambda: f.read(OUTPUT_CHUNK_SIZE), b''):
+                sha256.update(chunk)
+        digest = sha256.hexdigest()
+        with OutputWriter.manifest_lock:
+            OutputWriter.set_manifest_entry(output_path, {'sha256': digest, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'header_size': header_size})
+        return digest
+
+
+    @staticmethod
+    def add_output_root(output_root: str) -> None:
+        # Called by the adapters with their output path, so that the files written
+        # below it are recorded in its manifest
+        output_root = os.path.abspath(output_root)
+        with OutputWriter.manifest_lock:
+            OutputWriter.manifests.setdefault(output_root, None)
+
+
+    @staticmethod
+    def get_manifest_file(output_root: str) -> str:
+        directory = OutputWriter.manifest_directory or os.path.join(os.path.dirname(output_root), '.contentctl_cache')
+        return os.path.join(directory, os.path.basename(output_root) + '_output_manifest.json')
+
+
+    @staticmethod
+    def get_output_root(output_path: str) -> str:
+        # The innermost output root containing the file, None if the file is not
+        # below any of them.  Must be called with manifest_lock held
+        output_path = os.path.abspath(output_path)
+        roots = [root for root in OutputWriter.manifests if output_path.startswith(os.path.join(root, ''))]
+        if len(roots) == 0:
+            return None
+        output_root = max(roots, key=len)
+        if OutputWriter.manifests[output_root] is None:
+            OutputWriter.manifests[output_root] = OutputWriter.load_manifest(output_root)
+        return output_root
+
+
+    @staticmethod
+    def load_manifest(output_root: str) -> dict:
+        try:
+            with open(OutputWriter.get_manifest_file(output_root), 'r') as f:
+                manifest = json.load(f)
+            if manifest.get('version') == OUTPUT_MANIFEST_VERSION:
+                return manifest['files']
+        except (OSError, ValueError, KeyError):
+            pass
+        return {}
+
+
+    @staticmethod
+    def get_manifest_entry(output_path: str) -> dict:
+        # Must be called with manifest_lock held
+        output_root = OutputWriter.get_output_root(output_path)
+        if output_root is None:
+            return None
+        return OutputWriter.manifests[output_root].get(os.path.relpath(os.path.abspath(output_path), output_root))
+
+
+    @staticmethod
+    def set_manifest_entry(output_path: str, entry: dict) -> None:
+        # Must be called with manifest_lock held
+        output_root = OutputWriter.get_output_root(output_path)
+        if output_root is not None:
+            OutputWriter.manifests[output_root][os.path.relpath(os.path.abspath(output_path), output_root)] = entry
+
+
+    @staticmethod
+    def write_manifest() -> None:
+        with OutputWriter.manifest_lock:
+            for output_root, manifest in OutputWriter.manifests.items():
+                if manifest is None:
+                    continue
+                # Forget the outputs that were removed since
+                manifest = {path: entry for path, entry in manifest.items() if os.path.isfile(os.path.join(output_root, path))}
+                OutputWriter.manifests[output_root] = manifest
+                manifest_file = OutputWriter.get_manifest_file(output_root)
+                try:
+                    directory = os.path.dirname(manifest_file)
+                    os.makedirs(directory, exist_ok=True)
+                    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+                    with os.fdopen(fd, 'w') as f:
+                        json.dump({'version': OUTPUT_MANIFEST_VERSION, 'files': manifest}, f, indent=1, sort_keys=True)
+                    os.chmod(temp_path, FILE_MODE)
+                    os.replace(temp_path, manifest_file)
+                except OSError:
+                    print(f"Failed to write the output manifest {manifest_file}.")
+
+            if OutputWriter.written + OutputWriter.unchanged > 0:
+                print(f"{OutputWriter.written} output files written, {OutputWriter.unchanged} unchanged.")
+            OutputWriter.written = 0
+            OutputWriter.unchanged = 0
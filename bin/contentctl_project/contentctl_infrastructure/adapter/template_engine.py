@@ -0,0 +1,57 @@
+import os
+from typing import Callable
+
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, Template
+
+
+class TemplateEngine():
+    '''
+    Process wide Jinja2 environments used by all of the writers.
+
+    There is one environment per set of options (the conf files are rendered with
+    trim_blocks, the docs without), created on first use.  Each environment keeps
+    the templates it compiled, so a template is only compiled once per run no
+    matter how many objects are rendered with it, and the compiled bytecode is
+    stored in a FileSystemBytecodeCache so later runs do not compile it at all.
+    '''
+    template_directory: str = os.path.join(os.path.dirname(__file__), 'templates')
+    bytecode_cache_directory: str = ".contentctl_cache/jinja"
+    environments: dict = {}
+    filters: dict = {}
+
+    @staticmethod
+    def get_environment(trim_blocks: bool = False) -> Environment:
+        if trim_blocks not in TemplateEngine.environments:
+            # The bytecode of a template depends on the options of the environment, which
+            # are not part of the cache key, so every environment has its own directory
+            bytecode_cache_directory = os.path.join(TemplateEngine.bytecode_cache_directory, 'trim_blocks' if trim_blocks else 'default')
+            try:
+                os.makedirs(bytecode_cache_directory, exist_ok=True)
+                bytecode_cache = FileSystemBytecodeCache(bytecode_cache_directory)
+            except OSError:
+                print(f"Failed to create the cache directory {bytecode_cache_directory}.  Compiled templates will not be cached.")
+                bytecode_cache = None
+
+            # Templates do not change during a run, so there is no need to check
+            # whether they are up to date every time they are used
+            j2_env = Environment(
+                loader=FileSystemLoader(TemplateEngine.template_directory),
+                trim_blocks=trim_blocks,
+                bytecode_cache=bytecode_cache,
+                auto_reload=False)
+            j2_env.filters.update(TemplateEngine.filters)
+            TemplateEngine.environments[trim_blocks] = j2_env
+        return TemplateEngine.environments[trim_blocks]
+
+
+    @staticmethod
+    def add_filter(name: str, filter: Callable) -> None:
+        # Filters must be known before the templates using them are compiled
+        TemplateEngine.filters[name] = filter
+        for j2_env in TemplateEngine.environments.values():
+            j2_env.filters[name] = filter
+
+
+    @staticmethod
+    def get_template(template_name: str, trim_blocks: bool = False) -> Template:
+        return TemplateEngine.get_environment(trim_blocks).get_template(template_name)
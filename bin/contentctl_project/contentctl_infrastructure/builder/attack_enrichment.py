@@ -1,5 +1,7 @@
 
 import csv
+import hashlib
+import json
 import os
 from posixpath import split
 from typing import Optional
@@ -10,10 +12,16 @@ import logging
 logging.getLogger('taxii2client').setLevel(logging.CRITICAL)
 
 
+# Bump this whenever the structure of the enrichment artifact changes
+ATTACK_ENRICHMENT_VERSION = 1
+
+ATTACK_ENRICHMENT_ARTIFACT = ".contentctl_cache/mitre_enrichment.json"
+
+
 class AttackEnrichment():
 
     @classmethod
-    def get_attack_lookup(self, store_csv = None, force_cached_or_offline: bool = False, skip_enrichment:bool = False) -> dict:
+    def get_attack_lookup(self, store_csv = None, force_cached_or_offline: bool = False, skip_enrichment:bool = False, stix_bundle: str = None) -> dict:
         print("Getting MITRE Attack Enrichment Data. This may take some time...")
         attack_lookup = dict()
         file_path = os.path.join(os.path.dirname(__file__), '../../../../lookups/mitre_enrichment.csv')
@@ -22,42 +30,19 @@ class AttackEnrichment():
             print("Skipping enrichment")
             return attack_lookup
         try:
-
-            if force_cached_or_offline is True:
-                raise(Exception("WARNING - Using cached MITRE Attack Enrichment.  Attack Enrichment may be out of date. Only use this setting for offline environments and development purposes."))
-            print(f"\r{'Client'.rjust(23)}: [{0:3.0f}%]...", end="", flush=True)
-            lift = attack_client()
-            print(f"\r{'Client'.rjust(23)}: [{100:3.0f}%]...Done!", end="\n", flush=True)
-            
-            print(f"\r{'Enterprise'.rjust(23)}: [{0.0:3.0f}%]...", end="", flush=True)
-            all_enterprise = lift.get_enterprise(stix_format=False)
-            print(f"\r{'Enterprise'.rjust(23)}: [{100:3.0f}%]...Done!", end="\n", flush=True)
-            
-            print(f"\r{'Relationships'.rjust(23)}: [{0.0:3.0f}%]...", end="", flush=True)
-            enterprise_relationships = lift.get_enterprise_relationships()
-            print(f"\r{'Relationships'.rjust(23)}: [{100:3.0f}%]...Done!", end="\n", flush=True)
-            
-            print(f"\r{'Groups'.rjust(23)}: [{0:3.0f}%]...", end="", flush=True)
-            enterprise_groups = lift.get_enterprise_groups()
-            print(f"\r{'Groups'.rjust(23)}: [{100:3.0f}%]...Done!", end="\n", flush=True)
-            
-            for index, technique in enumerate(all_enterprise['techniques']):
-                progress_percent = ((index+1)/len(all_enterprise['techniques'])) * 100
-                print(f"\r\t{'MITRE Technique Progress'.rjust(23)}: [{progress_percent:3.0f}%]...", end="", flush=True)
-                apt_groups = []
-                for relationship in enterprise_relationships:
-                    if (relationship['target_ref'] == technique['id']) and relationship['source_ref'].startswith('intrusion-set'):
-                        for group in enterprise_groups:
-                            if relationship['source_ref'] == group['id']:
-                                apt_groups.append(group['name'])
-
-                tactics = []
-                if ('tactic' in technique):
-                    for tactic in technique['tactic']:
-                        tactics.append(tactic.replace('-',' ').title())
-
-                if not ('revoked' in technique):
-                    attack_lookup[technique['technique_id']] = {'technique': technique['technique'], 'tactics': tactics, 'groups': apt_groups}
+            if stix_bundle is not None:
+                source = 'stix_bundle:' + AttackEnrichment.get_file_hash(stix_bundle)
+                attack_lookup = AttackEnrichment.load_artifact(ATTACK_ENRICHMENT_ARTIFACT, source)
+                if attack_lookup is None:
+                    techniques, relationships, groups = AttackEnrichment.get_attack_objects_from_stix_bundle(stix_bundle)
+                    attack_lookup = AttackEnrichment.build_attack_lookup(techniques, relationships, groups)
+                    AttackEnrichment.store_artifact(ATTACK_ENRICHMENT_ARTIFACT, source, attack_lookup)
+            else:
+                # Offline runs use the committed lookups/mitre_enrichment.csv below
+                if force_cached_or_offline is True:
+                    raise(Exception("WARNING - Using cached MITRE Attack Enrichment.  Attack Enrichment may be out of date. Only use this setting for offline environments and development purposes."))
+                techniques, relationships, groups = AttackEnrichment.get_attack_objects_from_client()
+                attack_lookup = AttackEnrichment.build_attack_lookup(techniques, relationships, groups)
 
             if store_csv:
                 f = open(file_path, 'w')
@@ -88,4 +73,123 @@ class AttackEnrichment():
             attack_lookup.pop('mitre_id')
 
         print("Done!")
-        return attack_lookup
\ No newline at end of file
+        return attack_lookup
+
+
+    @staticmethod
+    def get_attack_objects_from_client() -> tuple:
+        print(f"\r{'Client'.rjust(23)}: [{0:3.0f}%]...", end="", flush=True)
+        lift = attack_client()
+        print(f"\r{'Client'.rjust(23)}: [{100:3.0f}%]...Done!", end="\n", flush=True)
+
+        # Only the techniques are needed from the enterprise matrix
+        print(f"\r{'Enterprise'.rjust(23)}: [{0.0:3.0f}%]...", end="", flush=True)
+        techniques = lift.get_enterprise_techniques(stix_format=False)
+        print(f"\r{'Enterprise'.rjust(23)}: [{100:3.0f}%]...Done!", end="\n", flush=True)
+
+        print(f"\r{'Relationships'.rjust(23)}: [{0.0:3.0f}%]...", end="", flush=True)
+        relationships = lift.get_enterprise_relationships()
+        print(f"\r{'Relationships'.rjust(23)}: [{100:3.0f}%]...Done!", end="\n", flush=True)
+
+        print(f"\r{'Groups'.rjust(23)}: [{0:3.0f}%]...", end="", flush=True)
+        groups = lift.get_enterprise_groups()
+        print(f"\r{'Groups'.rjust(23)}: [{100:3.0f}%]...Done!", end="\n", flush=True)
+        return techniques, relationships, groups
+
+
+    @staticmethod
+    def get_attack_objects_from_stix_bundle(stix_bundle: str) -> tuple:
+        # Returns the same objects as the TAXII client: techniques in the friendly
+        # (non STIX) format, skipping revoked and deprecated techniques and groups
+        with open(stix_bundle, 'r', encoding="utf-8") as f:
+            bundle = json.load(f)
+
+        techniques = []
+        relationships = []
+        groups = []
+        for obj in bundle.get('objects', []):
+            if obj['type'] != 'relationship' and (obj.get('revoked', False) or obj.get('x_mitre_deprecated', False)):
+                continue
+            if obj['type'] == 'attack-pattern':
+                technique_id = next((reference['external_id'] for reference in obj.get('external_references', [])
+                                     if reference.get('source_name') == 'mitre-attack'), None)
+                if technique_id is None:
+                    continue
+                techniques.append({
+                    'id': obj['id'],
+                    'technique_id': technique_id,
+                    'technique': obj['name'],
+                    'tactic': [phase['phase_name'] for phase in obj.get('kill_chain_phases', [])
+                               if phase.get('kill_chain_name') == 'mitre-attack']
+                })
+            elif obj['type'] == 'relationship':
+                relationships.append(obj)
+            elif obj['type'] == 'intrusion-set':
+                groups.append(obj)
+        return techniques, relationships, groups
+
+
+    @staticmethod
+    def build_attack_lookup(techniques: list, relationships: list, groups: list) -> dict:
+        # Index the groups by id and the relationships of intrusion sets by their
+        # target once, instead of scanning every relationship and every group for
+        # every technique
+        group_names = dict()
+        for group in groups:
+            group_names.setdefault(group['id'], []).append(group['name'])
+
+        groups_by_target = dict()
+        for relationship in relationships:
+            if relationship['source_ref'].startswith('intrusion-set'):
+                groups_by_target.setdefault(relationship['target_ref'], []).extend(group_names.get(relationship['source_ref'], []))
+
+        attack_lookup = dict()
+        for index, technique in enumerate(techniques):
+            progress_percent = ((index+1)/len(techniques)) * 100
+            print(f"\r\t{'MITRE Technique Progress'.rjust(23)}: [{progress_percent:3.0f}%]...", end="", flush=True)
+            tactics = []
+            if ('tactic' in technique):
+                for tactic in technique['tactic']:
+                    tactics.append(tactic.replace('-',' ').title())
+
+            if not ('revoked' in technique):
+                attack_lookup[technique['technique_id']] = {'technique': technique['technique'], 'tactics': tactics,
+                                                            'groups': list(groups_by_target.get(technique['id'], []))}
+        return attack_lookup
+
+
+    @staticmethod
+    def get_file_hash(file_path: str) -> str:
+        with open(file_path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+
+    @staticmethod
+    def load_artifact(artifact_path: str, source: str) -> Optional[dict]:
+        # Returns None if there is no artifact, if it was written by another version
+        # or if it was built from another source
+        try:
+            with open(artifact_path, 'r', encoding="utf-8") as f:
+                artifact = json.load(f)
+        except Exception:
+            return None
+        if artifact.get('version') != ATTACK_ENRICHMENT_VERSION:
+            return None
+        if artifact.get('source') != source:
+            return None
+        return artifact['techniques']
+
+
+    @staticmethod
+    def store_artifact(artifact_path: str, source: str, attack_lookup: dict) -> None:
+        # Unlike lookups/mitre_enrichment.csv, the artifact keeps techniques without groups as empty lists
+        directory = os.path.dirname(artifact_path)
+        tmp_file = f"{artifact_path}.{os.getpid()}.tmp"
+        try:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(tmp_file, 'w', encoding="utf-8") as f:
+                json.dump({'version': ATTACK_ENRICHMENT_VERSION, 'source': source, 'techniques': attack_lookup}, f, separators=(',', ':'))
+            os.replace(tmp_file, artifact_path)
+        except OSError as exc:
+            print(f"Failed to write the MITRE Attack Enrichment artifact {artifact_path}: {exc}")
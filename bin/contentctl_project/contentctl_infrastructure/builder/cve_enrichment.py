@@ -1,8 +1,13 @@
 
 from pycvesearch import CVESearch
 import functools
+import sys
 import os
 import shelve
+import atexit
+
+from bin.contentctl_project.contentctl_infrastructure.builder.cve_store import CveStore, CVE_STORE_FILENAME
+from bin.contentctl_project.contentctl_core.domain.utils.profiler import Profiler
 
 CVESSEARCH_API_URL = 'https://cve.circl.lu'
 
@@ -13,6 +18,7 @@ def cvesearch_helper(url:str, cve_id:str):
     if not os.path.exists(CVE_CACHE_FILENAME):
         print(f"Cache at {CVE_CACHE_FILENAME} not found - Creating it.")
     cache = shelve.open(CVE_CACHE_FILENAME, flag='c', writeback=True)
+    Profiler.count('CVE cache', cve_id in cache)
     if cve_id in cache:
         req = cache[cve_id]
         cache.close()
@@ -42,6 +48,42 @@ def cvesearch_id_helper(url:str):
 
 
 class CveEnrichment():
+    #Local store of CVE records, see initialize_store.  When it is set, CVEs are only
+    #looked up in the store and never over the network.
+    store: CveStore = None
+
+    @staticmethod
+    def initialize_store(dump_file: str, store_file: str = CVE_STORE_FILENAME) -> None:
+        CveEnrichment.store = CveStore(store_file)
+        atexit.register(CveEnrichment.close_store)
+        try:
+            count = CveEnrichment.store.import_dump(dump_file)
+        except Exception as e:
+            print(f"Failed to import the CVE dump {dump_file} into {store_file}: {str(e)}")
+            sys.exit(1)
+        if count > 0:
+            print(f"Imported {count} CVEs from {dump_file} into {store_file}")
+
+    @staticmethod
+    def close_store() -> None:
+        if CveEnrichment.store is not None:
+            CveEnrichment.store.close()
+
+    @classmethod
+    def enrich_cves(self, cve_ids: list, force_cached_or_offline: bool = False) -> list:
+        if CveEnrichment.store is None:
+            return [CveEnrichment.enrich_cve(cve_id, force_cached_or_offline) for cve_id in cve_ids]
+
+        results = CveEnrichment.store.get_many(cve_ids)
+        cves_enriched = []
+        for cve_id in cve_ids:
+            Profiler.count('CVE store', cve_id in results)
+            if cve_id in results:
+                cves_enriched.append(dict(results[cve_id]))
+            else:
+                print("WARNING - CveEnrichment for [ {0} ] failed - CVE not found in {1}".format(cve_id, CveEnrichment.store.path))
+                cves_enriched.append(dict())
+        return cves_enriched
 
     @classmethod
     def enrich_cve(self, cve_id: str, force_cached_or_offline: bool = False) -> dict:
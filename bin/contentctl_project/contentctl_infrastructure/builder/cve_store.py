@@ -0,0 +1,157 @@
+import gzip
+import json
+import os
+import sqlite3
+
+# Bump this whenever the tables of the store change
+CVE_STORE_VERSION = 1
+
+CVE_STORE_FILENAME = "lookups/CVE_STORE.sqlite"
+
+
+class CveStore():
+    '''
+    Local, indexed store of CVE records imported from a CVE JSON feed dump, so that
+    CVE enrichment does not need any network access.
+
+    Supported dumps are NVD JSON 1.1 feeds ("CVE_Items"), NVD API 2.0 responses
+    ("vulnerabilities") and CIRCL cve-search exports (a list or JSON lines of objects
+    with "id", "cvss" and "summary"), optionally gzip compressed.  Several dumps can
+    be concatenated in JSON lines form.  The dump is only imported again when its
+    size or modification time changes, and then replaces everything in the store, so
+    CVEs removed from a newer dump are removed from the store too.
+    '''
+    path: str
+    connection: sqlite3.Connection
+    connection_pid: int
+
+    def __init__(self, path: str = CVE_STORE_FILENAME) -> None:
+        self.path = path
+        self.connection = None
+        self.connection_pid = None
+
+
+    def get_connection(self) -> sqlite3.Connection:
+        # Connections must not be shared with forked worker processes (see Factory --jobs)
+        if self.connection is None or self.connection_pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.connection = sqlite3.connect(self.path)
+            self.connection_pid = os.getpid()
+            if self.connection.execute("PRAGMA user_version").fetchone()[0] != CVE_STORE_VERSION:
+                self.connection.execute("DROP TABLE IF EXISTS cve")
+                self.connection.execute("DROP TABLE IF EXISTS dump")
+                self.connection.execute(f"PRAGMA user_version={CVE_STORE_VERSION}")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS cve (id TEXT PRIMARY KEY, cvss REAL, summary TEXT)")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS dump (path TEXT PRIMARY KEY, size INTEGER, mtime REAL)")
+            self.connection.commit()
+        return self.connection
+
+
+    def import_dump(self, dump_file: str) -> int:
+        stat = os.stat(dump_file)
+        connection = self.get_connection()
+        imported = connection.execute("SELECT size, mtime FROM dump WHERE path = ?", (os.path.abspath(dump_file),)).fetchone()
+        if imported == (stat.st_size, stat.st_mtime):
+            return 0
+
+        count = 0
+        with connection:
+            # Rolled back with the import if the dump cannot be read
+            connection.execute("DELETE FROM cve")
+            connection.execute("DELETE FROM dump")
+            for batch in CveStore.read_batches(dump_file):
+                connection.executemany("INSERT OR REPLACE INTO cve (id, cvss, summary) VALUES (?, ?, ?)", batch)
+                count += len(batch)
+            connection.execute("INSERT OR REPLACE INTO dump (path, size, mtime) VALUES (?, ?, ?)",
+                               (os.path.abspath(dump_file), stat.st_size, stat.st_mtime))
+        return count
+
+
+    def get_many(self, cve_ids: list) -> dict:
+        # Resolve all of the ids with a single query
+        cve_ids = list(dict.fromkeys(cve_ids))
+        if len(cve_ids) == 0:
+            return {}
+        placeholders = ", ".join("?" for _ in cve_ids)
+        cursor = self.get_connection().execute(f"SELECT id, cvss, summary FROM cve WHERE id IN ({placeholders})", cve_ids)
+        return {cve_id: {'id': cve_id, 'cvss': cvss, 'summary': summary} for cve_id, cvss, summary in cursor}
+
+
+    def close(self) -> None:
+        if self.connection is not None and self.connection_pid == os.getpid():
+            self.connection.close()
+        self.connection = None
+
+
+    @staticmethod
+    def read_batches(dump_file: str, batch_size: int = 10000):
+        batch = []
+        for document in CveStore.read_documents(dump_file):
+            for record in CveStore.get_records(document):
+                batch.append(record)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+        if len(batch) > 0:
+            yield batch
+
+
+    @staticmethod
+    def read_documents(dump_file: str):
+        opener = gzip.open if dump_file.endswith(".gz") else open
+        with opener(dump_file, 'rt', encoding="utf-8") as f:
+            first_character = f.read(1)
+            f.seek(0)
+            if first_character in ('{', '['):
+                try:
+                    yield json.load(f)
+                    return
+                except json.JSONDecodeError:
+                    # Not a single document, read it as JSON lines
+                    f.seek(0)
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+    @staticmethod
+    def get_records(document) -> list:
+        if isinstance(document, list):
+            return [record for item in document for record in CveStore.get_records(item)]
+        if 'CVE_Items' in document:
+            return [CveStore.get_nvd_feed_record(item) for item in document['CVE_Items']]
+        if 'vulnerabilities' in document:
+            return [CveStore.get_nvd_api_record(item['cve']) for item in document['vulnerabilities']]
+        if 'id' in document:
+            return [(document['id'], document.get('cvss'), document.get('summary'))]
+        return []
+
+
+    @staticmethod
+    def get_nvd_feed_record(item: dict) -> tuple:
+        cve_id = item['cve']['CVE_data_meta']['ID']
+        descriptions = item['cve'].get('description', {}).get('description_data', [])
+        summary = next((d['value'] for d in descriptions if d.get('lang', 'en') == 'en'), None)
+        impact = item.get('impact', {})
+        # cve-search reports the CVSS v2 base score, prefer it for consistent enrichment
+        if 'baseMetricV2' in impact:
+            cvss = impact['baseMetricV2']['cvssV2']['baseScore']
+        elif 'baseMetricV3' in impact:
+            cvss = impact['baseMetricV3']['cvssV3']['baseScore']
+        else:
+            cvss = None
+        return cve_id, cvss, summary
+
+
+    @staticmethod
+    def get_nvd_api_record(cve: dict) -> tuple:
+        summary = next((d['value'] for d in cve.get('descriptions', []) if d.get('lang') == 'en'), None)
+        cvss = None
+        metrics = cve.get('metrics', {})
+        for metric in ['cvssMetricV2', 'cvssMetricV31', 'cvssMetricV30']:
+            if metrics.get(metric):
+                cvss = metrics[metric][0]['cvssData']['baseScore']
+                break
+        return cve['id'], cvss, summary
@@ -7,11 +7,15 @@ from bin.contentctl_project.contentctl_infrastructure.builder.yml_reader import
 from bin.contentctl_project.contentctl_core.domain.entities.baseline import Baseline
 from bin.contentctl_project.contentctl_core.domain.entities.enums.enums import SecurityContentType
 from bin.contentctl_project.contentctl_core.domain.entities.enums.enums import SecurityContentProduct
+from bin.contentctl_project.contentctl_core.application.factory.utils.content_index import ContentIndex
+from bin.contentctl_project.contentctl_core.application.factory.utils.deployment_matcher import DeploymentMatch
+from bin.contentctl_project.contentctl_core.application.factory.utils.validation_cache import ValidationCache
 
 
 class SecurityContentBaselineBuilder(BaselineBuilder):
     baseline : Baseline
     check_references: bool
+    deployment_match: DeploymentMatch
 
     def __init__(self, check_references: bool = False):
         self.check_references = check_references
@@ -22,39 +26,25 @@ class SecurityContentBaselineBuilder(BaselineBuilder):
 
         yml_dict["check_references"] = self.check_references
         try:
-            self.baseline = Baseline.parse_obj(yml_dict)
+            self.baseline = ValidationCache.parse_obj(Baseline, yml_dict)
             del(yml_dict["check_references"])
         except ValidationError as e:
             print('Validation Error for file ' + path)
             print(e)
             sys.exit(1)
 
-    def addDeployment(self, deployments: list) -> None:
-        matched_deployments = []
-
-        for d in deployments:
-            d_tags = dict(d.tags)
-            for d_tag in d_tags.keys():
-                for attr in dir(self.baseline):
-                    if not (attr.startswith('__') or attr.startswith('_')):
-                        if attr == d_tag:
-                            if type(self.baseline.__getattribute__(attr)) is str:
-                                attr_values = [self.baseline.__getattribute__(attr)]
-                            else:
-                                attr_values = self.baseline.__getattribute__(attr)
-                            
-                            for attr_value in attr_values:
-                                if attr_value == d_tags[d_tag]:
-                                    matched_deployments.append(d)
-
-        if len(matched_deployments) == 0:
+    def addDeployment(self, content_index: ContentIndex) -> None:
+        self.deployment_match = content_index.getDeploymentMatcher().match(self.baseline)
+
+        if self.deployment_match.deployment is None:
             raise ValueError('No deployment found for baseline: ' + self.baseline.name)
 
-        self.baseline.deployment = matched_deployments[-1]
+        self.baseline.deployment = self.deployment_match.deployment
 
 
     def reset(self) -> None:
         self.baseline = None
+        self.deployment_match = None
 
 
     def getObject(self) -> Baseline:
@@ -11,6 +11,7 @@ from bin.contentctl_project.contentctl_core.domain.entities.macro import Macro
 from bin.contentctl_project.contentctl_core.domain.entities.lookup import Lookup
 from bin.contentctl_project.contentctl_core.domain.entities.playbook import Playbook
 from bin.contentctl_project.contentctl_core.domain.entities.unit_test import UnitTest
+from bin.contentctl_project.contentctl_core.application.factory.utils.validation_cache import ValidationCache
 
 
 class SecurityContentBasicBuilder(BasicBuilder):
@@ -25,28 +26,28 @@ class SecurityContentBasicBuilder(BasicBuilder):
                 for key in alert_action_dict.keys():
                     yml_dict[key] = yml_dict["alert_action"][key]
             try:
-                self.security_content_obj = Deployment.parse_obj(yml_dict)
+                self.security_content_obj = ValidationCache.parse_obj(Deployment, yml_dict)
             except ValidationError as e:
                 print('Validation Error for file ' + path)
                 print(e)
                 sys.exit(1)
         elif type == SecurityContentType.macros:
             try:
-                self.security_content_obj = Macro.parse_obj(yml_dict)
+                self.security_content_obj = ValidationCache.parse_obj(Macro, yml_dict)
             except ValidationError as e:
                 print('Validation Error for file ' + path)
                 print(e)
                 sys.exit(1)
         elif type == SecurityContentType.lookups:
             try:
-                self.security_content_obj = Lookup.parse_obj(yml_dict)
+                self.security_content_obj = ValidationCache.parse_obj(Lookup, yml_dict)
             except ValidationError as e:
                 print('Validation Error for file ' + path)
                 print(e)
                 sys.exit(1)
         elif type == SecurityContentType.unit_tests:
             try:
-                self.security_content_obj = UnitTest.parse_obj(yml_dict)
+                self.security_content_obj = ValidationCache.parse_obj(UnitTest, yml_dict)
             except ValidationError as e:
                 print('Validation Error for file ' + path)
                 print(e)
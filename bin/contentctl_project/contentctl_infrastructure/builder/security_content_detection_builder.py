@@ -1,5 +1,4 @@
 import sys
-import re
 import os
 
 from pydantic import ValidationError
@@ -9,9 +8,13 @@ from bin.contentctl_project.contentctl_infrastructure.builder.yml_reader import
 from bin.contentctl_project.contentctl_core.domain.entities.detection import Detection
 from bin.contentctl_project.contentctl_core.domain.entities.security_content_object import SecurityContentObject
 from bin.contentctl_project.contentctl_core.domain.entities.macro import Macro
+from bin.contentctl_project.contentctl_core.domain.entities.spl_search import SplSearch
 from bin.contentctl_project.contentctl_core.domain.entities.mitre_attack_enrichment import MitreAttackEnrichment
+from bin.contentctl_project.contentctl_core.application.factory.utils.content_index import ContentIndex
+from bin.contentctl_project.contentctl_core.application.factory.utils.deployment_matcher import DeploymentMatch
 from bin.contentctl_project.contentctl_infrastructure.builder.cve_enrichment import CveEnrichment
 from bin.contentctl_project.contentctl_infrastructure.builder.splunk_app_enrichment import SplunkAppEnrichment
+from bin.contentctl_project.contentctl_core.application.factory.utils.validation_cache import ValidationCache
 
 
 class SecurityContentDetectionBuilder(DetectionBuilder):
@@ -21,44 +24,47 @@ class SecurityContentDetectionBuilder(DetectionBuilder):
     force_cached_or_offline: bool 
     check_references: bool
     skip_enrichment: bool
+    #Why the deployment of the last detection was chosen, useful for debugging deployments
+    deployment_match: DeploymentMatch
+    #Set by the Factory, addSplunkApp then leaves the Splunk apps to enrichObjects
+    deferred_enrichment: bool
 
     def __init__(self, force_cached_or_offline: bool = False, check_references: bool = False, skip_enrichment:bool = False):
         self.force_cached_or_offline = force_cached_or_offline
         self.check_references = check_references
         self.skip_enrichment = skip_enrichment
+        self.deferred_enrichment = False
+
+    def deferEnrichment(self) -> None:
+        self.deferred_enrichment = True
+
+    def enrichObjects(self, objects: list) -> None:
+        if self.skip_enrichment or not self.deferred_enrichment:
+            return None
+        #The apps used by many detections are resolved once, concurrently
+        SplunkAppEnrichment.enrich_splunk_apps([splunk_app for obj in objects for splunk_app in (obj.tags.supported_tas or [])],
+                                               force_cached_or_offline=self.force_cached_or_offline)
+        for obj in objects:
+            self.enrichSplunkApps(obj, fetch=False)
+        #Each CVE is looked up once, even when many detections reference it
+        cve_ids = list(dict.fromkeys(cve_id for obj in objects for cve_id in (obj.tags.cve or [])))
+        cve_enrichments = dict(zip(cve_ids, CveEnrichment.enrich_cves(cve_ids, force_cached_or_offline=self.force_cached_or_offline)))
+        for obj in objects:
+            obj.cve_enrichment = [dict(cve_enrichments[cve_id]) for cve_id in (obj.tags.cve or [])]
 
     def setObject(self, path: str) -> None:
         yml_dict = YmlReader.load_file(path)
         yml_dict["tags"]["name"] = yml_dict["name"]
         yml_dict["check_references"] = self.check_references
-        self.security_content_obj = Detection.parse_obj(yml_dict)
+        self.security_content_obj = ValidationCache.parse_obj(Detection, yml_dict)
         del(yml_dict["check_references"])
         self.security_content_obj.source = os.path.split(os.path.dirname(self.security_content_obj.file_path))[-1]      
 
 
-    def addDeployment(self, deployments: list) -> None:
+    def addDeployment(self, content_index: ContentIndex) -> None:
         if self.security_content_obj:
-            matched_deployments = []
-
-            for d in deployments:
-                d_tags = dict(d.tags)
-                for d_tag in d_tags.keys():
-                    for attr in dir(self.security_content_obj):
-                        if not (attr.startswith('__') or attr.startswith('_')):
-                            if attr == d_tag:
-                                if type(self.security_content_obj.__getattribute__(attr)) is str:
-                                    attr_values = [self.security_content_obj.__getattribute__(attr)]
-                                else:
-                                    attr_values = self.security_content_obj.__getattribute__(attr)
-                                
-                                for attr_value in attr_values:
-                                    if attr_value == d_tags[d_tag]:
-                                        matched_deployments.append(d)
-
-            if len(matched_deployments) == 0:
-                self.security_content_obj.deployment = None
-            else:
-                self.security_content_obj.deployment = matched_deployments[-1]
+            self.deployment_match = content_index.getDeploymentMatcher().match(self.security_content_obj)
+            self.security_content_obj.deployment = self.deployment_match.deployment
 
 
     def addRBA(self) -> None:
@@ -140,35 +146,21 @@ class SecurityContentDetectionBuilder(DetectionBuilder):
             self.security_content_obj.annotations = annotations    
 
 
-    def addPlaybook(self, playbooks: list) -> None:
+    def addPlaybook(self, content_index: ContentIndex) -> None:
         if self.security_content_obj:
-            matched_playbooks = []
-            for playbook in playbooks:
-                if playbook.tags.detections:
-                    for detection in playbook.tags.detections:
-                        if detection == self.security_content_obj.name:
-                            matched_playbooks.append(playbook)
-
-            self.security_content_obj.playbooks = matched_playbooks
+            self.security_content_obj.playbooks = list(content_index.getPlaybooksForDetection(self.security_content_obj.name))
 
 
-    def addBaseline(self, baselines: list) -> None:
+    def addBaseline(self, content_index: ContentIndex) -> None:
         if self.security_content_obj:
-            matched_baselines = []
-            for baseline in baselines:
-                for detection in baseline.tags.detections:
-                    if detection == self.security_content_obj.name:
-                        matched_baselines.append(baseline)
+            self.security_content_obj.baselines = list(content_index.getBaselinesForDetection(self.security_content_obj.name))
 
-            self.security_content_obj.baselines = matched_baselines
 
-
-    def addUnitTest(self, tests: list) -> None:
+    def addUnitTest(self, content_index: ContentIndex) -> None:
         if self.security_content_obj:
-            for test in tests:
-                if test.tests[0].name == self.security_content_obj.name:
-                    self.security_content_obj.test = test
-                    return
+            test = content_index.getTest(self.security_content_obj.name)
+            if test is not None:
+                self.security_content_obj.test = test
 
 
     def addMitreAttackEnrichment(self, attack_enrichment: dict) -> None:
@@ -194,9 +186,9 @@ class SecurityContentDetectionBuilder(DetectionBuilder):
                             raise ValueError("mitre_attack_id " + mitre_attack_id + " doesn't exist for detection " + self.security_content_obj.name)
 
 
-    def addMacros(self, macros: list) -> None:
+    def addMacros(self, content_index: ContentIndex) -> None:
         if self.security_content_obj:
-            macros_found = re.findall(r'`([^\s]+)`', self.security_content_obj.search)
+            macros_found = SplSearch.parse(self.security_content_obj.search).macros
             macros_filtered = set()
             self.security_content_obj.macros = []
 
@@ -209,9 +201,7 @@ class SecurityContentDetectionBuilder(DetectionBuilder):
                         macros_filtered.add(macro)
 
             for macro_name in macros_filtered:
-                for macro in macros:
-                    if macro_name == macro.name:
-                        self.security_content_obj.macros.append(macro)
+                self.security_content_obj.macros.extend(content_index.getMacros(macro_name))
 
             name = self.security_content_obj.name.replace(' ', '_').replace('-', '_').replace('.', '_').replace('/', '_').lower() + '_filter'
             macro = Macro(name=name, definition='search *', description='Update this macro to limit the output results to filter out false positives.')
@@ -219,36 +209,37 @@ class SecurityContentDetectionBuilder(DetectionBuilder):
             self.security_content_obj.macros.append(macro)
 
 
-    def addLookups(self, lookups: list) -> None:
+    def addLookups(self, content_index: ContentIndex) -> None:
         if self.security_content_obj:
-            lookups_found = re.findall(r'lookup (?:update=true)?(?:append=t)?\s*([^\s]*)', self.security_content_obj.search)
+            lookups_found = SplSearch.parse(self.security_content_obj.search).lookups
             self.security_content_obj.lookups = []
             for lookup_name in lookups_found:
-                for lookup in lookups:
-                    if lookup.name == lookup_name:
-                        self.security_content_obj.lookups.append(lookup)
+                self.security_content_obj.lookups.extend(content_index.getLookups(lookup_name))
 
 
     def addCve(self) -> None:
         if self.skip_enrichment:
             return None
-        if self.security_content_obj:
+        if self.security_content_obj and not self.deferred_enrichment:
             self.security_content_obj.cve_enrichment = []
             if self.security_content_obj.tags.cve:
-                for cve in self.security_content_obj.tags.cve:
-                    self.security_content_obj.cve_enrichment.append(CveEnrichment.enrich_cve(cve, force_cached_or_offline = self.force_cached_or_offline))
+                self.security_content_obj.cve_enrichment = CveEnrichment.enrich_cves(self.security_content_obj.tags.cve, force_cached_or_offline = self.force_cached_or_offline)
 
     def addSplunkApp(self) -> None:
         if self.skip_enrichment:
             return None
-        if self.security_content_obj:
-            self.security_content_obj.splunk_app_enrichment = []
-            if self.security_content_obj.tags.supported_tas:
-                for splunk_app in self.security_content_obj.tags.supported_tas:
-                    self.security_content_obj.splunk_app_enrichment.append(SplunkAppEnrichment.enrich_splunk_app(splunk_app, force_cached_or_offline=self.force_cached_or_offline))
+        if self.security_content_obj and not self.deferred_enrichment:
+            self.enrichSplunkApps(self.security_content_obj)
+
+    def enrichSplunkApps(self, detection: Detection, fetch: bool = True) -> None:
+        detection.splunk_app_enrichment = []
+        if detection.tags.supported_tas:
+            for splunk_app in detection.tags.supported_tas:
+                detection.splunk_app_enrichment.append(SplunkAppEnrichment.enrich_splunk_app(splunk_app, force_cached_or_offline=self.force_cached_or_offline, fetch=fetch))
 
     def reset(self) -> None:
         self.security_content_obj = None
+        self.deployment_match = None
 
 
     def getObject(self) -> SecurityContentObject:
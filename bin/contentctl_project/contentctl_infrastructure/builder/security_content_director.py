@@ -7,76 +7,96 @@ from bin.contentctl_project.contentctl_core.application.builder.story_builder im
 from bin.contentctl_project.contentctl_core.application.builder.investigation_builder import InvestigationBuilder
 from bin.contentctl_project.contentctl_core.application.builder.baseline_builder import BaselineBuilder
 from bin.contentctl_project.contentctl_core.application.builder.playbook_builder import PlaybookBuilder
+from bin.contentctl_project.contentctl_core.application.factory.utils.content_index import ContentIndex
 from bin.contentctl_project.contentctl_core.domain.entities.enums.enums import SecurityContentType
 from bin.contentctl_project.contentctl_core.domain.entities.enums.enums import SecurityContentProduct
+from bin.contentctl_project.contentctl_core.domain.utils.profiler import Profiler
+from bin.contentctl_project.contentctl_infrastructure.builder.yml_reader import YmlReader
 
 class SecurityContentDirector(Director):
 
-    def constructDetection(self, builder: DetectionBuilder, path: str, deployments: list, playbooks: list, baselines: list, tests: list, attack_enrichment: dict, macros: list, lookups: list, force_cached_or_offline: bool = False) -> None:
+    def constructDetection(self, builder: DetectionBuilder, path: str, content_index: ContentIndex, attack_enrichment: dict, force_cached_or_offline: bool = False) -> None:
+        # Every step is timed when profiling
+        builder = Profiler.instrument(builder)
         builder.reset()
         builder.setObject(os.path.join(os.path.dirname(__file__), path))
-        builder.addDeployment(deployments)
+        builder.addDeployment(content_index)
         builder.addRBA()
         builder.addNesFields()
         builder.addAnnotations()
         builder.addMappings()
-        builder.addBaseline(baselines)
-        builder.addPlaybook(playbooks)
-        builder.addUnitTest(tests)
+        builder.addBaseline(content_index)
+        builder.addPlaybook(content_index)
+        builder.addUnitTest(content_index)
         builder.addMitreAttackEnrichment(attack_enrichment)
-        builder.addMacros(macros)
-        builder.addLookups(lookups)
+        builder.addMacros(content_index)
+        builder.addLookups(content_index)
         builder.addCve()
         builder.addSplunkApp()
 
 
-    def constructStory(self, builder: StoryBuilder, path: str, detections: list, baselines: list, investigations: list) -> None:
+    def constructStory(self, builder: StoryBuilder, path: str, content_index: ContentIndex) -> None:
+        builder = Profiler.instrument(builder)
         builder.reset()
         builder.setObject(os.path.join(os.path.dirname(__file__), path))
-        builder.addDetections(detections)
-        builder.addInvestigations(investigations)
-        builder.addBaselines(baselines)
+        builder.addDetections(content_index)
+        builder.addInvestigations(content_index)
+        builder.addBaselines(content_index)
         builder.addAuthorCompanyName()
 
 
-    def constructBaseline(self, builder: BaselineBuilder, path: str, deployments: list) -> None:
+    def constructBaseline(self, builder: BaselineBuilder, path: str, content_index: ContentIndex) -> None:
+        builder = Profiler.instrument(builder)
         builder.reset()
         builder.setObject(os.path.join(os.path.dirname(__file__), path))
-        builder.addDeployment(deployments)
+        builder.addDeployment(content_index)
 
 
     def constructDeployment(self, builder: BasicBuilder, path: str) -> None:
+        builder = Profiler.instrument(builder)
         builder.reset()
         builder.setObject(os.path.join(os.path.dirname(__file__), path), SecurityContentType.deployments)
 
 
     def constructLookup(self, builder: BasicBuilder, path: str) -> None:
+        builder = Profiler.instrument(builder)
         builder.reset()
         builder.setObject(os.path.join(os.path.dirname(__file__), path), SecurityContentType.lookups)
 
 
     def constructMacro(self, builder: BasicBuilder, path: str) -> None:
+        builder = Profiler.instrument(builder)
         builder.reset()
         builder.setObject(os.path.join(os.path.dirname(__file__), path), SecurityContentType.macros)
 
 
     def constructPlaybook(self, builder: PlaybookBuilder, path: str) -> None:
+        builder = Profiler.instrument(builder)
         builder.reset()
         builder.setObject(os.path.join(os.path.dirname(__file__), path))
         builder.addDetections()
 
 
     def constructTest(self, builder: BasicBuilder, path: str) -> None:
+        builder = Profiler.instrument(builder)
         builder.reset()
         builder.setObject(os.path.join(os.path.dirname(__file__), path), SecurityContentType.unit_tests)
 
 
     def constructInvestigation(self, builder: InvestigationBuilder, path: str) -> None:
+        builder = Profiler.instrument(builder)
         builder.reset()
         builder.setObject(os.path.join(os.path.dirname(__file__), path))
         builder.addInputs()
         builder.addLowercaseName()
 
     def constructObjects(self, builder: BasicBuilder, path: str) -> None:
+        builder = Profiler.instrument(builder)
         builder.reset()
-        builder.setObject(os.path.join(os.path.dirname(__file__), path))
\ No newline at end of file
+        builder.setObject(os.path.join(os.path.dirname(__file__), path))
+
+
+    def getReferences(self, path: str) -> list:
+        # Read through the YAML cache, so the file is parsed once for the references
+        # and the object built from it
+        return YmlReader.load_file(os.path.join(os.path.dirname(__file__), path)).get('references') or []
\ No newline at end of file
@@ -7,6 +7,7 @@ from bin.contentctl_project.contentctl_core.application.builder.investigation_bu
 from bin.contentctl_project.contentctl_core.domain.entities.investigation import Investigation
 from bin.contentctl_project.contentctl_infrastructure.builder.yml_reader import YmlReader
 from bin.contentctl_project.contentctl_core.domain.entities.enums.enums import SecurityContentType
+from bin.contentctl_project.contentctl_core.application.factory.utils.validation_cache import ValidationCache
 
 
 class SecurityContentInvestigationBuilder(InvestigationBuilder):
@@ -20,7 +21,7 @@ class SecurityContentInvestigationBuilder(InvestigationBuilder):
         yml_dict = YmlReader.load_file(path)
         try:
             yml_dict["check_references"] = self.check_references
-            self.investigation = Investigation.parse_obj(yml_dict)
+            self.investigation = ValidationCache.parse_obj(Investigation, yml_dict)
             del(yml_dict["check_references"])
         except ValidationError as e:
             print('Validation Error for file ' + path)
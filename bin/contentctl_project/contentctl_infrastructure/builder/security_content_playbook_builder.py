@@ -8,6 +8,7 @@ from pathlib import Path
 from bin.contentctl_project.contentctl_core.application.builder.playbook_builder import PlaybookBuilder
 from bin.contentctl_project.contentctl_core.domain.entities.playbook import Playbook
 from bin.contentctl_project.contentctl_infrastructure.builder.yml_reader import YmlReader
+from bin.contentctl_project.contentctl_core.application.factory.utils.validation_cache import ValidationCache
 
 
 class SecurityContentPlaybookBuilder(PlaybookBuilder):
@@ -21,7 +22,7 @@ class SecurityContentPlaybookBuilder(PlaybookBuilder):
         yml_dict = YmlReader.load_file(path)
         yml_dict["check_references"] = self.check_references
         try:
-            self.playbook = Playbook.parse_obj(yml_dict)
+            self.playbook = ValidationCache.parse_obj(Playbook, yml_dict)
             del(yml_dict["check_references"])
         except ValidationError as e:
             print('Validation Error for file ' + path)
@@ -6,7 +6,9 @@ from pydantic import ValidationError
 from bin.contentctl_project.contentctl_core.application.builder.story_builder import StoryBuilder
 from bin.contentctl_project.contentctl_core.domain.entities.story import Story
 from bin.contentctl_project.contentctl_core.domain.entities.enums.enums import SecurityContentType
+from bin.contentctl_project.contentctl_core.application.factory.utils.content_index import ContentIndex
 from bin.contentctl_project.contentctl_infrastructure.builder.yml_reader import YmlReader
+from bin.contentctl_project.contentctl_core.application.factory.utils.validation_cache import ValidationCache
 
 
 class SecurityContentStoryBuilder(StoryBuilder):
@@ -21,7 +23,7 @@ class SecurityContentStoryBuilder(StoryBuilder):
         yml_dict["tags"]["name"] = yml_dict["name"]
         yml_dict["check_references"] = self.check_references
         try:
-            self.story = Story.parse_obj(yml_dict)
+            self.story = ValidationCache.parse_obj(Story, yml_dict)
             del(yml_dict["check_references"])
         except ValidationError as e:
             print('Validation Error for file ' + path)
@@ -34,42 +36,41 @@ class SecurityContentStoryBuilder(StoryBuilder):
     def getObject(self) -> Story:
         return self.story
 
-    def addDetections(self, detections: list) -> None:
+    def addDetections(self, content_index: ContentIndex) -> None:
         matched_detection_names = []
         matched_detections = []
         mitre_attack_enrichments = []
+        mitre_attack_ids = set()
         mitre_attack_tactics = set()
         datamodels = set()
         kill_chain_phases = set()
 
-        for detection in detections:
-            if detection:
-                for detection_analytic_story in detection.tags.analytic_story:
-                    if detection_analytic_story == self.story.name:
-                        matched_detection_names.append(str('ESCU - ' + detection.name + ' - Rule'))
-                        # SSE-638: detections object should at least contain the name attribute.
-                        # We also need a minimal set of the following attributes to satisfy docgen (doc_stories.j2):
-                        # name, source, type, tags.mitre_attack_enrichments.mitre_attack_technique
-                        mitre_attack_enrichments_list = []
-                        if (detection.tags.mitre_attack_enrichments):
-                            for attack in detection.tags.mitre_attack_enrichments:
-                                mitre_attack_enrichments_list.append({"mitre_attack_technique": attack.mitre_attack_technique})
-                        tags_obj = {"mitre_attack_enrichments": mitre_attack_enrichments_list}
-                        matched_detections.append({
-                            "name": detection.name,
-                            "source": detection.source,
-                            "type": detection.type,
-                            "tags": tags_obj
-                        })
-                        datamodels.update(detection.datamodel)
-                        if detection.tags.kill_chain_phases:
-                            kill_chain_phases.update(detection.tags.kill_chain_phases)
-
-                        if detection.tags.mitre_attack_enrichments:
-                            for attack_enrichment in detection.tags.mitre_attack_enrichments:
-                                mitre_attack_tactics.update(attack_enrichment.mitre_attack_tactics)
-                                if attack_enrichment.mitre_attack_id not in [attack.mitre_attack_id for attack in mitre_attack_enrichments]:
-                                    mitre_attack_enrichments.append(attack_enrichment)
+        for detection in content_index.getDetectionsForStory(self.story.name):
+            matched_detection_names.append(str('ESCU - ' + detection.name + ' - Rule'))
+            # SSE-638: detections object should at least contain the name attribute.
+            # We also need a minimal set of the following attributes to satisfy docgen (doc_stories.j2):
+            # name, source, type, tags.mitre_attack_enrichments.mitre_attack_technique
+            mitre_attack_enrichments_list = []
+            if (detection.tags.mitre_attack_enrichments):
+                for attack in detection.tags.mitre_attack_enrichments:
+                    mitre_attack_enrichments_list.append({"mitre_attack_technique": attack.mitre_attack_technique})
+            tags_obj = {"mitre_attack_enrichments": mitre_attack_enrichments_list}
+            matched_detections.append({
+                "name": detection.name,
+                "source": detection.source,
+                "type": detection.type,
+                "tags": tags_obj
+            })
+            datamodels.update(detection.datamodel)
+            if detection.tags.kill_chain_phases:
+                kill_chain_phases.update(detection.tags.kill_chain_phases)
+
+            if detection.tags.mitre_attack_enrichments:
+                for attack_enrichment in detection.tags.mitre_attack_enrichments:
+                    mitre_attack_tactics.update(attack_enrichment.mitre_attack_tactics)
+                    if attack_enrichment.mitre_attack_id not in mitre_attack_ids:
+                        mitre_attack_ids.add(attack_enrichment.mitre_attack_id)
+                        mitre_attack_enrichments.append(attack_enrichment)
 
         self.story.detection_names = matched_detection_names
         self.story.detections = matched_detections
@@ -79,23 +80,19 @@ class SecurityContentStoryBuilder(StoryBuilder):
         self.story.tags.mitre_attack_tactics = sorted(list(mitre_attack_tactics))
 
 
-    def addBaselines(self, baselines: list) -> None:
+    def addBaselines(self, content_index: ContentIndex) -> None:
         matched_baseline_names = []
-        for baseline in baselines:
-            for baseline_analytic_story in  baseline.tags.analytic_story:
-                if baseline_analytic_story == self.story.name:
-                    matched_baseline_names.append(str('ESCU - ' + baseline.name))
+        for baseline in content_index.getBaselinesForStory(self.story.name):
+            matched_baseline_names.append(str('ESCU - ' + baseline.name))
 
         self.story.baseline_names = matched_baseline_names
 
-    def addInvestigations(self, investigations: list) -> None:
+    def addInvestigations(self, content_index: ContentIndex) -> None:
         matched_investigation_names = []
         matched_investigations = []
-        for investigation in investigations:
-            for investigation_analytic_story in  investigation.tags.analytic_story:
-                if investigation_analytic_story == self.story.name:
-                    matched_investigation_names.append(str('ESCU - ' + investigation.name + ' - Response Task'))
-                    matched_investigations.append(investigation)
+        for investigation in content_index.getInvestigationsForStory(self.story.name):
+            matched_investigation_names.append(str('ESCU - ' + investigation.name + ' - Response Task'))
+            matched_investigations.append(investigation)
 
         self.story.investigation_names = matched_investigation_names
         self.story.investigations = matched_investigations
@@ -5,68 +5,132 @@ import functools
 import pickle
 import shelve
 import os
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from bin.contentctl_project.contentctl_core.domain.utils.profiler import Profiler
 
 SPLUNKBASE_API_URL = "https://apps.splunk.com/api/apps/entriesbyid/"
 
 APP_ENRICHMENT_CACHE_FILENAME = "lookups/APP_ENRICHMENT_CACHE.db"
 
+#One keep-alive session shared by all of the Splunkbase requests of the run
+session = requests.Session()
+
+#The cache is opened once and kept open for the whole run, see get_app_enrichment_cache
+app_enrichment_cache = None
+app_enrichment_cache_pid = None
+app_enrichment_cache_lock = threading.Lock()
+
+
+def get_app_enrichment_cache() -> shelve.Shelf:
+    global app_enrichment_cache, app_enrichment_cache_pid
+    #Forked worker processes (see Factory --jobs) must not share the handle of the parent
+    if app_enrichment_cache is None or app_enrichment_cache_pid != os.getpid():
+        if not os.path.exists(APP_ENRICHMENT_CACHE_FILENAME):
+            print(f"Cache at {APP_ENRICHMENT_CACHE_FILENAME} not found - Creating it.")
+        app_enrichment_cache = shelve.open(APP_ENRICHMENT_CACHE_FILENAME, flag='c')
+        app_enrichment_cache_pid = os.getpid()
+        atexit.register(close_app_enrichment_cache)
+    return app_enrichment_cache
+
+
+def close_app_enrichment_cache() -> None:
+    global app_enrichment_cache
+    with app_enrichment_cache_lock:
+        if app_enrichment_cache is not None and app_enrichment_cache_pid == os.getpid():
+            app_enrichment_cache.close()
+            app_enrichment_cache = None
+
+
 @functools.cache
 def requests_get_helper(url:str)->bytes:
-    if not os.path.exists(APP_ENRICHMENT_CACHE_FILENAME):
-        print(f"Cache at {APP_ENRICHMENT_CACHE_FILENAME} not found - Creating it.")
-    cache = shelve.open(APP_ENRICHMENT_CACHE_FILENAME, flag='c', writeback=True)
-    if url in cache:
-        req_content = cache[url]
-        cache.close()
-        return req_content
+    with app_enrichment_cache_lock:
+        cache = get_app_enrichment_cache()
+        Profiler.count('Splunk app cache', url in cache)
+        if url in cache:
+            return cache[url]
     try:
-        req = requests.get(url)
+        req = session.get(url)
         req_content = req.content
-        cache[url] = req_content
-        cache.close()
-        return req_content
     except Exception as e:
         raise(Exception(f"ERROR - Failed to get Splunk App Enrichment at {SPLUNKBASE_API_URL}"))
+    with app_enrichment_cache_lock:
+        get_app_enrichment_cache()[url] = req_content
+    return req_content
 
 
 class SplunkAppEnrichment():
+    #Enrichment of every app resolved during this run, by TA id
+    enrichments: dict = {}
+    max_concurrent_requests: int = 8
 
     @classmethod
-    def enrich_splunk_app(self, splunk_ta: str, force_cached_or_offline: bool = False) -> dict:
+    def enrich_splunk_apps(self, splunk_tas: list, force_cached_or_offline: bool = False) -> None:
+        #Resolve the apps referenced by many detections once, concurrently, before the
+        #detections are built.  enrich_splunk_app then returns the stored enrichment.
+        pending = [splunk_ta for splunk_ta in dict.fromkeys(splunk_tas) if splunk_ta not in SplunkAppEnrichment.enrichments]
+        if len(pending) == 0:
+            return
+
+        def fetch(splunk_ta: str) -> dict:
+            try:
+                return self.fetch_splunk_app(splunk_ta, force_cached_or_offline)
+            except requests.exceptions.ConnectionError:
+                #Not stored, the detections using the app only get its name
+                return None
+
+        with ThreadPoolExecutor(max_workers=SplunkAppEnrichment.max_concurrent_requests) as executor:
+            for splunk_ta, splunk_app_enriched in zip(pending, executor.map(fetch, pending)):
+                if splunk_app_enriched is not None:
+                    SplunkAppEnrichment.enrichments[splunk_ta] = splunk_app_enriched
+
+    @classmethod
+    def enrich_splunk_app(self, splunk_ta: str, force_cached_or_offline: bool = False, fetch: bool = True) -> dict:
+        #fetch is False once enrich_splunk_apps tried every app, the apps it could not
+        #resolve are not requested again
+        Profiler.count('Splunk app enrichments', splunk_ta in SplunkAppEnrichment.enrichments)
+        if splunk_ta not in SplunkAppEnrichment.enrichments:
+            # Failed fetches are not stored, so the app is fetched again by the next run
+            if not fetch:
+                return {'name': splunk_ta, 'url': ''}
+            try:
+                SplunkAppEnrichment.enrichments[splunk_ta] = self.fetch_splunk_app(splunk_ta, force_cached_or_offline)
+            except requests.exceptions.ConnectionError as connErr:
+                # there was a connection error lets just capture the name
+                return {'name': splunk_ta, 'url': ''}
+        #Every detection gets its own copy
+        return dict(SplunkAppEnrichment.enrichments[splunk_ta])
+
+    @classmethod
+    def fetch_splunk_app(self, splunk_ta: str, force_cached_or_offline: bool = False) -> dict:
         appurl = SPLUNKBASE_API_URL + splunk_ta
         splunk_app_enriched = dict()
-        try:
-            if force_cached_or_offline is True:
-                content = requests_get_helper(appurl)
-                response_dict = xmltodict.parse(content)
-            else:
-                response = requests.get(appurl)
-                response_dict = xmltodict.parse(response.content)
-            # check if list since data changes depending on answer
+        response_dict = self._get_splunkbase_response(appurl, force_cached_or_offline)
+        # check if list since data changes depending on answer
+        url, results = self._parse_splunkbase_response(response_dict)
+        # grab the app name
+        for i in results:
+            if i['@name'] == 'appName':
+                splunk_app_enriched['name'] = i['#text']
+        # grab out the splunkbase url
+        if 'entriesbyid' in url:
+            response_dict = self._get_splunkbase_response(url, force_cached_or_offline)
+            #print(json.dumps(response_dict, indent=2))
             url, results = self._parse_splunkbase_response(response_dict)
-            # grab the app name
-            for i in results:
-                if i['@name'] == 'appName':
-                    splunk_app_enriched['name'] = i['#text']
-            # grab out the splunkbase url  
-            if 'entriesbyid' in url:
-                if force_cached_or_offline is True:
-                    content = requests_get_helper(url)
-                    response_dict = xmltodict.parse(content)
-                else:
-                    response = requests.get(url)
-                    response_dict = xmltodict.parse(response.content)
-                #print(json.dumps(response_dict, indent=2))
-                url, results = self._parse_splunkbase_response(response_dict)
-                # chop the url so we grab the splunkbase portion but not direct download
-                splunk_app_enriched['url'] = url.rsplit('/', 4)[0]
-        except requests.exceptions.ConnectionError as connErr:
-            # there was a connection error lets just capture the name
-            splunk_app_enriched['name'] = splunk_ta
-            splunk_app_enriched['url'] = ''
+            # chop the url so we grab the splunkbase portion but not direct download
+            splunk_app_enriched['url'] = url.rsplit('/', 4)[0]
 
         return splunk_app_enriched
 
+    def _get_splunkbase_response(url: str, force_cached_or_offline: bool) -> dict:
+        if force_cached_or_offline is True:
+            content = requests_get_helper(url)
+        else:
+            content = session.get(url).content
+        return xmltodict.parse(content)
+
     def _parse_splunkbase_response(response_dict):
         if isinstance(response_dict['feed']['entry'], list):
             url = response_dict['feed']['entry'][0]['link']['@href']
@@ -75,4 +139,3 @@ class SplunkAppEnrichment():
             url = response_dict['feed']['entry']['link']['@href']
             results = response_dict['feed']['entry']['content']['s:dict']['s:key']
         return url, results
-
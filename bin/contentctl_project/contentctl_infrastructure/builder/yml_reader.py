@@ -1,19 +1,45 @@
 from typing import Dict
 
+import hashlib
+import os
+import pickle
 import yaml
 import sys
 
+from bin.contentctl_project.contentctl_core.domain.utils.profiler import Profiler
+
+# Bump this whenever the structure of the documents returned by the reader changes
+# so that entries written by an older version of the reader are ignored.
+YML_READER_VERSION = 1
+
 class YmlReader():
+    use_file_cache: bool = False
+    cache_directory: str = ".contentctl_cache/yml"
+
+    @staticmethod
+    def initialize_cache(use_file_cache: bool = False, cache_directory: str = None) -> None:
+        YmlReader.use_file_cache = use_file_cache
+        if cache_directory is not None:
+            YmlReader.cache_directory = cache_directory
+        if use_file_cache is False:
+            return
+        try:
+            os.makedirs(YmlReader.cache_directory, exist_ok=True)
+        except OSError:
+            print(f"Failed to create the cache directory {YmlReader.cache_directory}.  Parsed YAML files will not be cached.")
+            YmlReader.use_file_cache = False
 
     @staticmethod
     def load_file(file_path: str) -> Dict:
         try:
-            file_handler = open(file_path, 'r', encoding="utf-8")
-            try:
-                yml_obj = list(yaml.safe_load_all(file_handler))[0]
-            except yaml.YAMLError as exc:
-                print(exc)
-                sys.exit(1)
+            with Profiler.timer('load yml', 'step'):
+                with open(file_path, 'rb') as file_handler:
+                    content = file_handler.read()
+                try:
+                    yml_obj = YmlReader.parse_content(file_path, content)
+                except yaml.YAMLError as exc:
+                    print(exc)
+                    sys.exit(1)
 
         except OSError as exc:
             print(exc)
@@ -32,3 +58,50 @@ class YmlReader():
             yml_obj['experimental'] = False
 
         return yml_obj
+
+    @staticmethod
+    def parse_content(file_path: str, content: bytes) -> Dict:
+        if YmlReader.use_file_cache is False:
+            return list(yaml.safe_load_all(content.decode("utf-8")))[0]
+
+        content_hash = hashlib.sha256(content).hexdigest()
+        cache_file = YmlReader.get_cache_file(file_path)
+        cached = YmlReader.read_cache_entry(cache_file)
+        if cached is not None and cached['version'] == (YML_READER_VERSION, yaml.__version__) and cached['hash'] == content_hash:
+            Profiler.count('YAML cache', True)
+            return cached['document']
+        Profiler.count('YAML cache', False)
+
+        yml_obj = list(yaml.safe_load_all(content.decode("utf-8")))[0]
+        YmlReader.write_cache_entry(cache_file, {
+            'version': (YML_READER_VERSION, yaml.__version__),
+            'hash': content_hash,
+            'document': yml_obj
+        })
+        return yml_obj
+
+    @staticmethod
+    def get_cache_file(file_path: str) -> str:
+        path_hash = hashlib.sha256(os.path.abspath(file_path).encode("utf-8")).hexdigest()
+        return os.path.join(YmlReader.cache_directory, path_hash + '.pickle')
+
+    @staticmethod
+    def read_cache_entry(cache_file: str) -> Dict:
+        try:
+            with open(cache_file, 'rb') as f:
+                return pickle.load(f)
+        except Exception:
+            # A missing or unreadable entry is simply a cache miss
+            return None
+
+    @staticmethod
+    def write_cache_entry(cache_file: str, entry: Dict) -> None:
+        # Write to a temporary file and rename it so that concurrent readers
+        # (e.g. the workers of a --jobs build) never see a partial entry
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_file, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, cache_file)
+        except OSError as exc:
+            print(f"Failed to write the cache entry {cache_file}: {exc}")
@@ -3,6 +3,8 @@ import datetime
 import pytest
 import filecmp
 from bin.contentctl_project.contentctl_infrastructure.adapter.obj_to_conf_adapter import ObjToConfAdapter
+from bin.contentctl_project.contentctl_infrastructure.adapter.conf_writer import ConfWriter
+from bin.contentctl_project.contentctl_core.application.factory.utils.content_index import ContentIndex
 from bin.contentctl_project.contentctl_infrastructure.builder.security_content_director import SecurityContentDirector
 from bin.contentctl_project.contentctl_infrastructure.builder.security_content_basic_builder import SecurityContentBasicBuilder
 from bin.contentctl_project.contentctl_infrastructure.builder.security_content_detection_builder import SecurityContentDetectionBuilder
@@ -46,7 +48,7 @@ def test_write_conf_files(patch_datetime_now):
     playbook = playbook_builder.getObject()    
     baseline_builder = SecurityContentBaselineBuilder()
     director.constructBaseline(baseline_builder, os.path.join(os.path.dirname(__file__), 
-        '../builder/test_data/baseline/baseline.yml'), [deployment_baseline])
+        '../builder/test_data/baseline/baseline.yml'), ContentIndex.fromObjects({SecurityContentType.deployments: [deployment_baseline]}))
     baseline = baseline_builder.getObject()
     unit_test_builder = SecurityContentBasicBuilder()
     director.constructTest(unit_test_builder, os.path.join(os.path.dirname(__file__), 
@@ -54,12 +56,12 @@ def test_write_conf_files(patch_datetime_now):
     test = unit_test_builder.getObject()
     detection_builder = SecurityContentDetectionBuilder()
     director.constructDetection(detection_builder, os.path.join(os.path.dirname(__file__), 
-        '../builder/test_data/detection/valid.yml'), [deployment], [playbook], [baseline], [test],
-        {}, [], [])
+        '../builder/test_data/detection/valid.yml'),
+        ContentIndex.fromObjects({SecurityContentType.deployments: [deployment], SecurityContentType.playbooks: [playbook], SecurityContentType.baselines: [baseline], SecurityContentType.unit_tests: [test]}), {})
     detection = detection_builder.getObject()
     director.constructDetection(detection_builder, os.path.join(os.path.dirname(__file__), 
-        '../builder/test_data/detection/deprecated/detect_new_user_aws_console_login.yml'), [deployment], [playbook], [baseline], [test],
-        {}, [], [])
+        '../builder/test_data/detection/deprecated/detect_new_user_aws_console_login.yml'),
+        ContentIndex.fromObjects({SecurityContentType.deployments: [deployment], SecurityContentType.playbooks: [playbook], SecurityContentType.baselines: [baseline], SecurityContentType.unit_tests: [test]}), {})
     detection_deprecated = detection_builder.getObject()
     investigation_builder = SecurityContentInvestigationBuilder()
     director.constructInvestigation(investigation_builder, os.path.join(os.path.dirname(__file__), 
@@ -68,7 +70,7 @@ def test_write_conf_files(patch_datetime_now):
     story_builder = SecurityContentStoryBuilder()
     director.constructStory(story_builder, os.path.join(os.path.dirname(__file__), 
         '../builder/test_data/story/ransomware_darkside.yml'),
-        [detection], [baseline], [investigation])
+        ContentIndex.fromObjects({SecurityContentType.detections: [detection], SecurityContentType.baselines: [baseline], SecurityContentType.investigations: [investigation]}))
     story = story_builder.getObject()
     output_path = os.path.join(os.path.dirname(__file__), 'data')
     adapter = ObjToConfAdapter()
@@ -79,6 +81,7 @@ def test_write_conf_files(patch_datetime_now):
     adapter.writeObjects([investigation], output_path, SecurityContentType.investigations)
     adapter.writeObjects([kv_lookup, lookup], output_path, SecurityContentType.lookups)
     adapter.writeObjects([macro], output_path, SecurityContentType.macros)
+    adapter.close()
     files_to_compare = [
         'data/ui/panels/workbench_panel_get_parent_process_info___response_task.xml',
         'analyticstories.conf',
@@ -92,4 +95,37 @@ def test_write_conf_files(patch_datetime_now):
     for file in files_to_compare:
         path = os.path.join(os.path.dirname(__file__), 'data/default', file)
         path_ref = os.path.join(os.path.dirname(__file__), 'data/default_reference', file)
-        assert filecmp.cmp(path, path_ref, shallow=False)
\ No newline at end of file
+        assert filecmp.cmp(path, path_ref, shallow=False)
+
+def test_write_conf_files_failure(tmp_path, monkeypatch):
+    output_path = str(tmp_path)
+    (tmp_path / 'default').mkdir()
+    with ObjToConfAdapter() as adapter:
+        adapter.writeHeaders(output_path)
+    savedsearches = (tmp_path / 'default' / 'savedsearches.conf').read_bytes()
+
+    def writeConfFile(template_name, output, objects):
+        output.write('[ESCU - Half written]\n')
+        raise ValueError('Rendering failed')
+
+    monkeypatch.setattr(ConfWriter, 'writeConfFile', writeConfFile)
+    # The conf files written so far keep their content and no temporary file is left
+    with pytest.raises(ValueError):
+        with ObjToConfAdapter() as adapter:
+            adapter.writeHeaders(output_path)
+            adapter.writeObjects([], output_path, SecurityContentType.detections)
+    assert (tmp_path / 'default' / 'savedsearches.conf').read_bytes() == savedsearches
+    assert sorted(os.listdir(tmp_path / 'default')) == ['analyticstories.conf', 'collections.conf', 'es_investigations.conf',
+        'macros.conf', 'savedsearches.conf', 'transforms.conf', 'workflow_actions.conf']
+
+
+def test_custom_jinja2_enrichment_filter():
+    detection_builder = SecurityContentDetectionBuilder(skip_enrichment=True)
+    detection_builder.setObject(os.path.join(os.path.dirname(__file__),
+        '../builder/test_data/detection/valid.yml'))
+    detection = detection_builder.getObject()
+
+    rendered = ConfWriter.custom_jinja2_enrichment_filter("%name% on %unknown%type% by %author% 100%", detection)
+    assert rendered == detection.name + " on %unknown" + str(detection.type) + " by " + detection.author + " 100%"
+    # Fields missing from the detection are taken from its tags
+    assert ConfWriter.custom_jinja2_enrichment_filter("risk %risk_score%", detection) == "risk " + str(detection.tags.risk_score)
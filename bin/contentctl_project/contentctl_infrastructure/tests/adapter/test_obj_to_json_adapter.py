@@ -1,5 +1,6 @@
 import os
 import filecmp
+import json
 
 from bin.contentctl_project.contentctl_infrastructure.adapter.obj_to_json_adapter import ObjToJsonAdapter
 from bin.contentctl_project.contentctl_infrastructure.builder.security_content_basic_builder import SecurityContentBasicBuilder
@@ -7,6 +8,7 @@ from bin.contentctl_project.contentctl_infrastructure.builder.security_content_d
 from bin.contentctl_project.contentctl_infrastructure.builder.security_content_baseline_builder import SecurityContentBaselineBuilder
 from bin.contentctl_project.contentctl_infrastructure.builder.security_content_investigation_builder import SecurityContentInvestigationBuilder
 from bin.contentctl_project.contentctl_infrastructure.builder.security_content_story_builder import SecurityContentStoryBuilder
+from bin.contentctl_project.contentctl_core.application.factory.utils.content_index import ContentIndex
 from bin.contentctl_project.contentctl_infrastructure.builder.security_content_director import SecurityContentDirector
 from bin.contentctl_project.contentctl_infrastructure.builder.attack_enrichment import AttackEnrichment
 from bin.contentctl_project.contentctl_core.domain.entities.enums.enums import SecurityContentType
@@ -28,8 +30,8 @@ def test_write_detections():
 
     detection_builder = SecurityContentDetectionBuilder()
     director.constructDetection(detection_builder, os.path.join(os.path.dirname(__file__), 
-        '../builder/test_data/detection/valid.yml'), [], [], [], [],
-        AttackEnrichment.get_attack_lookup(), [macro], [lookup])
+        '../builder/test_data/detection/valid.yml'),
+        ContentIndex.fromObjects({SecurityContentType.macros: [macro], SecurityContentType.lookups: [lookup]}), AttackEnrichment.get_attack_lookup())
     detection = detection_builder.getObject()
     
     output_path = os.path.join(os.path.dirname(__file__), 'obj_to_json_adapter_data')
@@ -51,7 +53,7 @@ def test_write_baselines():
 
     baseline_builder = SecurityContentBaselineBuilder()
     director.constructBaseline(baseline_builder, os.path.join(os.path.dirname(__file__), 
-        '../builder/test_data/baseline/baseline.yml'), [deployment])
+        '../builder/test_data/baseline/baseline.yml'), ContentIndex.fromObjects({SecurityContentType.deployments: [deployment]}))
     baseline = baseline_builder.getObject()
 
     output_path = os.path.join(os.path.dirname(__file__), 'obj_to_json_adapter_data')
@@ -148,7 +150,7 @@ def test_write_stories():
 
     baseline_builder = SecurityContentBaselineBuilder()
     director.constructBaseline(baseline_builder, os.path.join(os.path.dirname(__file__), 
-        '../builder/test_data/baseline/baseline2.yml'), [deployment_baseline])
+        '../builder/test_data/baseline/baseline2.yml'), ContentIndex.fromObjects({SecurityContentType.deployments: [deployment_baseline]}))
     baseline = baseline_builder.getObject()
 
     unit_test_builder = SecurityContentBasicBuilder()
@@ -158,8 +160,8 @@ def test_write_stories():
 
     detection_builder = SecurityContentDetectionBuilder()
     director.constructDetection(detection_builder, os.path.join(os.path.dirname(__file__), 
-        '../builder/test_data/detection/valid.yml'), [deployment], [playbook], [baseline], [test],
-        AttackEnrichment.get_attack_lookup(), [], [])
+        '../builder/test_data/detection/valid.yml'),
+        ContentIndex.fromObjects({SecurityContentType.deployments: [deployment], SecurityContentType.playbooks: [playbook], SecurityContentType.baselines: [baseline], SecurityContentType.unit_tests: [test]}), AttackEnrichment.get_attack_lookup())
     detection = detection_builder.getObject()
 
     investigation_builder = SecurityContentInvestigationBuilder()
@@ -170,7 +172,7 @@ def test_write_stories():
     story_builder = SecurityContentStoryBuilder()
     director.constructStory(story_builder, os.path.join(os.path.dirname(__file__), 
         '../builder/test_data/story/ransomware_darkside.yml'),
-        [detection], [baseline], [investigation])
+        ContentIndex.fromObjects({SecurityContentType.detections: [detection], SecurityContentType.baselines: [baseline], SecurityContentType.investigations: [investigation]}))
     story = story_builder.getObject()
 
     output_path = os.path.join(os.path.dirname(__file__), 'obj_to_json_adapter_data')
@@ -179,4 +181,33 @@ def test_write_stories():
 
     path = os.path.join(os.path.dirname(__file__), 'obj_to_json_adapter_data/stories.json')
     path_ref = os.path.join(os.path.dirname(__file__), 'obj_to_json_adapter_data/stories_ref.json')
-    #assert filecmp.cmp(path, path_ref, shallow=False)
\ No newline at end of file
+    #assert filecmp.cmp(path, path_ref, shallow=False)
+
+def test_write_ndjson(tmp_path):
+    director = SecurityContentDirector()
+
+    deployment_builder = SecurityContentBasicBuilder()
+    director.constructDeployment(deployment_builder, os.path.join(os.path.dirname(__file__), 
+        '../builder/test_data/deployment/ESCU/00_default_baseline.yml'))
+    deployment = deployment_builder.getObject()
+
+    director.constructDeployment(deployment_builder, os.path.join(os.path.dirname(__file__), 
+        '../builder/test_data/deployment/ESCU/00_default_ttp.yml'))
+    deployment_ttp = deployment_builder.getObject()
+
+    for format in ['compact', 'ndjson']:
+        adapter = ObjToJsonAdapter(format=format)
+        adapter.writeObjects([deployment, deployment_ttp], str(tmp_path), SecurityContentType.deployments)
+
+    path_ref = os.path.join(os.path.dirname(__file__), 'obj_to_json_adapter_data/deployments_ref.json')
+    with open(path_ref) as f:
+        deployment_ref = json.load(f)['deployments'][0]
+
+    with open(os.path.join(tmp_path, 'deployments.json')) as f:
+        deployments = json.load(f)['deployments']
+    assert deployments[0] == deployment_ref
+    assert len(deployments) == 2
+
+    with open(os.path.join(tmp_path, 'deployments.ndjson')) as f:
+        lines = f.read().splitlines()
+    assert [json.loads(line) for line in lines] == deployments
@@ -2,6 +2,7 @@ import os
 import filecmp
 
 from bin.contentctl_project.contentctl_infrastructure.adapter.obj_to_md_adapter import ObjToMdAdapter
+from bin.contentctl_project.contentctl_core.application.factory.utils.content_index import ContentIndex
 from bin.contentctl_project.contentctl_infrastructure.builder.security_content_director import SecurityContentDirector
 from bin.contentctl_project.contentctl_infrastructure.builder.security_content_basic_builder import SecurityContentBasicBuilder
 from bin.contentctl_project.contentctl_infrastructure.builder.security_content_detection_builder import SecurityContentDetectionBuilder
@@ -38,7 +39,7 @@ def test_md_writer():
 
     baseline_builder = SecurityContentBaselineBuilder()
     director.constructBaseline(baseline_builder, os.path.join(os.path.dirname(__file__), 
-        '../builder/test_data/baseline/baseline.yml'), [deployment_baseline])
+        '../builder/test_data/baseline/baseline.yml'), ContentIndex.fromObjects({SecurityContentType.deployments: [deployment_baseline]}))
     baseline = baseline_builder.getObject()
 
     unit_test_builder = SecurityContentBasicBuilder()
@@ -53,13 +54,13 @@ def test_md_writer():
 
     detection_builder = SecurityContentDetectionBuilder()
     director.constructDetection(detection_builder, os.path.join(os.path.dirname(__file__), 
-        '../builder/test_data/detection/valid.yml'), [deployment], [playbook], [baseline], [test],
-        AttackEnrichment.get_attack_lookup(), [], [])
+        '../builder/test_data/detection/valid.yml'),
+        ContentIndex.fromObjects({SecurityContentType.deployments: [deployment], SecurityContentType.playbooks: [playbook], SecurityContentType.baselines: [baseline], SecurityContentType.unit_tests: [test]}), AttackEnrichment.get_attack_lookup())
     detection = detection_builder.getObject()
 
     director.constructDetection(detection_builder, os.path.join(os.path.dirname(__file__), 
-        '../builder/test_data/detection/deprecated/detect_new_user_aws_console_login.yml'), [deployment], [playbook], [baseline], [test],
-        AttackEnrichment.get_attack_lookup(), [], [])
+        '../builder/test_data/detection/deprecated/detect_new_user_aws_console_login.yml'),
+        ContentIndex.fromObjects({SecurityContentType.deployments: [deployment], SecurityContentType.playbooks: [playbook], SecurityContentType.baselines: [baseline], SecurityContentType.unit_tests: [test]}), AttackEnrichment.get_attack_lookup())
     detection_deprecated = detection_builder.getObject()
 
     playbook_builder = SecurityContentPlaybookBuilder()
@@ -75,7 +76,7 @@ def test_md_writer():
     story_builder = SecurityContentStoryBuilder()
     director.constructStory(story_builder, os.path.join(os.path.dirname(__file__), 
         '../builder/test_data/story/ransomware_darkside.yml'),
-        [detection], [baseline], [investigation])
+        ContentIndex.fromObjects({SecurityContentType.detections: [detection], SecurityContentType.baselines: [baseline], SecurityContentType.investigations: [investigation]}))
     story = story_builder.getObject()
 
     output_path = os.path.join(os.path.dirname(__file__), 'obj_to_md_data')
@@ -102,3 +103,36 @@ def test_md_writer():
         path = os.path.join(os.path.dirname(__file__), 'obj_to_md_data', file)
         path_ref = os.path.join(os.path.dirname(__file__), 'obj_to_md_data_ref', file)
         assert filecmp.cmp(path, path_ref, shallow=False)
+
+
+def test_md_writer_parallel(tmp_path):
+    director = SecurityContentDirector()
+
+    playbook_builder = SecurityContentPlaybookBuilder()
+    director.constructPlaybook(playbook_builder, os.path.join(os.path.dirname(__file__), 
+        '../builder/test_data/playbook/example_playbook.yml'))
+    playbook = playbook_builder.getObject()
+
+    investigation_builder = SecurityContentInvestigationBuilder()
+    director.constructInvestigation(investigation_builder, os.path.join(os.path.dirname(__file__), 
+        '../builder/test_data/investigation/investigation.yml'))
+    investigation = investigation_builder.getObject()
+
+    story_builder = SecurityContentStoryBuilder()
+    director.constructStory(story_builder, os.path.join(os.path.dirname(__file__), 
+        '../builder/test_data/story/ransomware_darkside.yml'),
+        ContentIndex.fromObjects({SecurityContentType.investigations: [investigation]}))
+    story = story_builder.getObject()
+
+    for jobs in [1, 2]:
+        output_path = os.path.join(tmp_path, str(jobs))
+        for folder in ['_data', '_pages', '_stories', '_posts', '_playbooks']:
+            os.makedirs(os.path.join(output_path, folder))
+        adapter = ObjToMdAdapter(jobs=jobs)
+        adapter.writeObjects([[story], [], [playbook, playbook]], output_path)
+
+    for folder in ['_data', '_pages', '_stories', '_posts', '_playbooks']:
+        files = sorted(os.listdir(os.path.join(tmp_path, '1', folder)))
+        assert files == sorted(os.listdir(os.path.join(tmp_path, '2', folder)))
+        for file in files:
+            assert filecmp.cmp(os.path.join(tmp_path, '1', folder, file), os.path.join(tmp_path, '2', folder, file), shallow=False)
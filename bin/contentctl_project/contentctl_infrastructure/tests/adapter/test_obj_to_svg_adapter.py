@@ -2,6 +2,7 @@ import os
 import filecmp
 
 from bin.contentctl_project.contentctl_infrastructure.adapter.obj_to_md_adapter import ObjToMdAdapter
+from bin.contentctl_project.contentctl_core.application.factory.utils.content_index import ContentIndex
 from bin.contentctl_project.contentctl_infrastructure.builder.security_content_director import SecurityContentDirector
 from bin.contentctl_project.contentctl_infrastructure.builder.security_content_basic_builder import SecurityContentBasicBuilder
 from bin.contentctl_project.contentctl_infrastructure.builder.security_content_detection_builder import SecurityContentDetectionBuilder
@@ -38,7 +39,7 @@ def test_svg_writer():
 
     baseline_builder = SecurityContentBaselineBuilder()
     director.constructBaseline(baseline_builder, os.path.join(os.path.dirname(__file__), 
-        '../builder/test_data/baseline/baseline.yml'), [deployment_baseline])
+        '../builder/test_data/baseline/baseline.yml'), ContentIndex.fromObjects({SecurityContentType.deployments: [deployment_baseline]}))
     baseline = baseline_builder.getObject()
 
     unit_test_builder = SecurityContentBasicBuilder()
@@ -53,8 +54,8 @@ def test_svg_writer():
 
     detection_builder = SecurityContentDetectionBuilder()
     director.constructDetection(detection_builder, os.path.join(os.path.dirname(__file__), 
-        '../builder/test_data/detection/valid.yml'), [deployment], [playbook], [baseline], [test],
-        AttackEnrichment.get_attack_lookup(), [], [])
+        '../builder/test_data/detection/valid.yml'),
+        ContentIndex.fromObjects({SecurityContentType.deployments: [deployment], SecurityContentType.playbooks: [playbook], SecurityContentType.baselines: [baseline], SecurityContentType.unit_tests: [test]}), AttackEnrichment.get_attack_lookup())
     detection = detection_builder.getObject()
 
     adapter = ObjToSvgAdapter()
@@ -3,6 +3,8 @@ import filecmp
 
 from bin.contentctl_project.contentctl_infrastructure.builder.yml_reader import YmlReader
 from bin.contentctl_project.contentctl_infrastructure.adapter.obj_to_yml_adapter import ObjToYmlAdapter
+from bin.contentctl_project.contentctl_core.application.factory.utils.content_index import ContentIndex
+from bin.contentctl_project.contentctl_core.domain.entities.enums.enums import SecurityContentType
 from bin.contentctl_project.contentctl_infrastructure.builder.security_content_director import SecurityContentDirector
 from bin.contentctl_project.contentctl_infrastructure.builder.security_content_detection_builder import SecurityContentDetectionBuilder
 from bin.contentctl_project.contentctl_infrastructure.builder.security_content_basic_builder import SecurityContentBasicBuilder
@@ -31,8 +33,8 @@ def test_write_ssa_detection():
 
     detection_builder = SecurityContentDetectionBuilder()
     director.constructDetection(detection_builder, os.path.join(os.path.dirname(__file__), 
-        'obj_to_yml_data/ssa___anomalous_usage_of_archive_tools.yml'), [], [], [], [test],
-        {}, [], [])
+        'obj_to_yml_data/ssa___anomalous_usage_of_archive_tools.yml'),
+        ContentIndex.fromObjects({SecurityContentType.unit_tests: [test]}), {})
     detection = detection_builder.getObject()
 
     adapter = ObjToYmlAdapter()
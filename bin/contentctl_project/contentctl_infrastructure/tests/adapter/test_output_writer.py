@@ -0,0 +1,88 @@
+import os
+import json
+import stat
+
+from bin.contentctl_project.contentctl_infrastructure.adapter.output_writer import OutputWriter
+
+
+def test_output_writer_skips_unchanged_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(OutputWriter, 'manifest_directory', str(tmp_path / 'cache'))
+    monkeypatch.setattr(OutputWriter, 'manifests', {})
+    output_root = tmp_path / 'output'
+    output_root.mkdir()
+    OutputWriter.add_output_root(str(output_root))
+    output_path = str(output_root / 'savedsearches.conf')
+
+    assert OutputWriter.write(output_path, '[search]\n')
+    os.utime(output_path, ns=(1000000000, 1000000000))
+    assert not OutputWriter.write(output_path, '[search]\n')
+    assert os.stat(output_path).st_mtime_ns == 1000000000
+
+    with OutputWriter.open(output_path, 'a') as f:
+        f.write('search = index=main\n')
+    with open(output_path) as f:
+        assert f.read() == '[search]\nsearch = index=main\n'
+    assert os.stat(output_path).st_mtime_ns != 1000000000
+    # No temporary file is left behind
+    assert os.listdir(output_root) == ['savedsearches.conf']
+
+    OutputWriter.write_manifest()
+    manifest_file = OutputWriter.get_manifest_file(str(output_root))
+    assert manifest_file == str(tmp_path / 'cache' / 'output_output_manifest.json')
+    with open(manifest_file) as f:
+        manifest = json.load(f)
+    assert manifest['files']['savedsearches.conf']['size'] == os.stat(output_path).st_size
+    assert stat.S_IMODE(os.stat(manifest_file).st_mode) == stat.S_IMODE(os.stat(output_path).st_mode)
+
+    # A new run takes the hash from the manifest
+    monkeypatch.setattr(OutputWriter, 'manifests', {})
+    OutputWriter.add_output_root(str(output_root))
+    assert not OutputWriter.write(output_path, '[search]\nsearch = index=main\n')
+
+
+def test_output_writer_ignores_header(tmp_path, monkeypatch):
+    monkeypatch.setattr(OutputWriter, 'manifest_directory', None)
+    monkeypatch.setattr(OutputWriter, 'manifests', {})
+    output_root = tmp_path / 'output'
+    output_root.mkdir()
+    OutputWriter.add_output_root(str(output_root))
+    output_path = str(output_root / 'macros.conf')
+
+    with OutputWriter.open(output_path) as f:
+        f.write_header('# Generated on 2020-12-25T17:05:55\n')
+        f.write('[macro]\n')
+    assert f.replaced
+
+    # Same body with a new header, the existing file and its header are kept
+    with OutputWriter.open(output_path) as f:
+        f.write_header('# Generated on 2021-01-01T00:00:00\n')
+        f.write('[macro]\n')
+    assert not f.replaced
+    with open(output_path) as f:
+        assert f.read() == '# Generated on 2020-12-25T17:05:55\n[macro]\n'
+
+    with OutputWriter.open(output_path) as f:
+        f.write_header('# Generated on 2021-01-01T00:00:00\n')
+        f.write('[other_macro]\n')
+    assert f.replaced
+    with open(output_path) as f:
+        assert f.read() == '# Generated on 2021-01-01T00:00:00\n[other_macro]\n'
+
+    # The manifest is next to the output root by default
+    OutputWriter.write_manifest()
+    assert os.listdir(tmp_path / '.contentctl_cache') == ['output_output_manifest.json']
+
+
+def test_output_writer_discards_failed_outputs(tmp_path):
+    output_path = str(tmp_path / 'savedsearches.conf')
+    OutputWriter.write(output_path, '[search]\n')
+
+    try:
+        with OutputWriter.open(output_path) as f:
+            f.write('[partial')
+            raise RuntimeError('rendering failed')
+    except RuntimeError:
+        pass
+    with open(output_path) as f:
+        assert f.read() == '[search]\n'
+    assert os.listdir(tmp_path) == ['savedsearches.conf']
@@ -0,0 +1,31 @@
+from bin.contentctl_project.contentctl_infrastructure.adapter.template_engine import TemplateEngine
+
+
+def test_get_template_cached(tmp_path, monkeypatch):
+    (tmp_path / 'templates').mkdir()
+    (tmp_path / 'templates' / 'stanza.j2').write_text('{% for name in names %}\n[{{ name }}]\n{% endfor %}\n')
+    monkeypatch.setattr(TemplateEngine, 'template_directory', str(tmp_path / 'templates'))
+    monkeypatch.setattr(TemplateEngine, 'bytecode_cache_directory', str(tmp_path / 'jinja'))
+    monkeypatch.setattr(TemplateEngine, 'environments', {})
+
+    template = TemplateEngine.get_template('stanza.j2', trim_blocks=True)
+    # Compiled once, the same template is returned for every object rendered with it
+    assert TemplateEngine.get_template('stanza.j2', trim_blocks=True) is template
+    assert len(TemplateEngine.environments) == 1
+
+    # The conf files (trim_blocks) and the docs do not share their environment
+    doc_template = TemplateEngine.get_template('stanza.j2')
+    assert doc_template is not template
+    assert TemplateEngine.get_template('stanza.j2') is doc_template
+    assert TemplateEngine.get_environment(True) is not TemplateEngine.get_environment(False)
+    assert template.render(names=['a', 'b']) == '[a]\n[b]\n'
+    assert doc_template.render(names=['a', 'b']) == '\n[a]\n\n[b]\n'
+
+    # The compiled templates are stored for the next run, apart for each environment
+    assert len(list((tmp_path / 'jinja' / 'trim_blocks').iterdir())) == 1
+    assert len(list((tmp_path / 'jinja' / 'default').iterdir())) == 1
+
+    # A new run loads them from there
+    monkeypatch.setattr(TemplateEngine, 'environments', {})
+    assert TemplateEngine.get_template('stanza.j2').render(names=['a']) == '\n[a]\n'
+    assert TemplateEngine.get_template('stanza.j2', trim_blocks=True).render(names=['a']) == '[a]\n'
@@ -1,4 +1,4 @@
-
+import json
 
 from bin.contentctl_project.contentctl_infrastructure.builder.attack_enrichment import AttackEnrichment
 
@@ -6,3 +6,40 @@ from bin.contentctl_project.contentctl_infrastructure.builder.attack_enrichment
 def test_mitre_attack_enrichment():
     attack_enrichment = AttackEnrichment.get_attack_lookup()
     assert attack_enrichment["T1003.002"]["technique"] == "Security Account Manager"
+
+
+def test_mitre_attack_enrichment_from_stix_bundle(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    bundle_file = tmp_path / 'enterprise-attack.json'
+    bundle_file.write_text(json.dumps({'type': 'bundle', 'objects': [
+        {'type': 'attack-pattern', 'id': 'attack-pattern--1', 'name': 'Security Account Manager',
+            'external_references': [{'source_name': 'mitre-attack', 'external_id': 'T1003.002'}],
+            'kill_chain_phases': [{'kill_chain_name': 'mitre-attack', 'phase_name': 'credential-access'}]},
+        {'type': 'attack-pattern', 'id': 'attack-pattern--2', 'name': 'Revoked Technique', 'revoked': True,
+            'external_references': [{'source_name': 'mitre-attack', 'external_id': 'T9999'}]},
+        {'type': 'attack-pattern', 'id': 'attack-pattern--3', 'name': 'Plist File Modification',
+            'external_references': [{'source_name': 'mitre-attack', 'external_id': 'T1647'}],
+            'kill_chain_phases': [{'kill_chain_name': 'mitre-attack', 'phase_name': 'defense-evasion'}]},
+        {'type': 'intrusion-set', 'id': 'intrusion-set--1', 'name': 'APT29'},
+        {'type': 'relationship', 'id': 'relationship--1', 'relationship_type': 'uses',
+            'source_ref': 'intrusion-set--1', 'target_ref': 'attack-pattern--1'},
+        {'type': 'relationship', 'id': 'relationship--2', 'relationship_type': 'mitigates',
+            'source_ref': 'course-of-action--1', 'target_ref': 'attack-pattern--1'}
+    ]}))
+
+    attack_enrichment = AttackEnrichment.get_attack_lookup(stix_bundle=str(bundle_file))
+    assert attack_enrichment == {
+        'T1003.002': {'technique': 'Security Account Manager', 'tactics': ['Credential Access'], 'groups': ['APT29']},
+        'T1647': {'technique': 'Plist File Modification', 'tactics': ['Defense Evasion'], 'groups': []}
+    }
+
+    # The artifact is reused as long as the bundle does not change and keeps empty groups
+    def get_attack_objects_from_stix_bundle(stix_bundle):
+        raise AssertionError('The bundle is parsed again')
+    monkeypatch.setattr(AttackEnrichment, 'get_attack_objects_from_stix_bundle', get_attack_objects_from_stix_bundle)
+    assert AttackEnrichment.get_attack_lookup(stix_bundle=str(bundle_file)) == attack_enrichment
+
+    # Offline runs without a bundle use the committed lookup, not the artifact
+    attack_enrichment = AttackEnrichment.get_attack_lookup(force_cached_or_offline=True)
+    assert attack_enrichment["T1003.002"]["technique"] == "Security Account Manager"
+    assert attack_enrichment["T1647"]["groups"] == ['no']
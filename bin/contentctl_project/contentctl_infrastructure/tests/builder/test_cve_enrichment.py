@@ -1,10 +1,56 @@
-
+import os
+import json
 
 from bin.contentctl_project.contentctl_infrastructure.builder.cve_enrichment import CveEnrichment
+from bin.contentctl_project.contentctl_infrastructure.builder.cve_store import CveStore
 
 
 def test_cve_enrichment():
     cve_enrichment = CveEnrichment.enrich_cve('CVE-2021-34527')
     assert cve_enrichment['id'] == 'CVE-2021-34527'
     assert cve_enrichment['cvss'] == 9.0
-    assert cve_enrichment['summary'] == 'Windows Print Spooler Remote Code Execution Vulnerability'
\ No newline at end of file
+    assert cve_enrichment['summary'] == 'Windows Print Spooler Remote Code Execution Vulnerability'
+
+def test_cve_enrichment_from_dump(tmp_path):
+    dump_file = tmp_path / 'nvdcve.json'
+    dump_file.write_text(json.dumps({'CVE_Items': [{
+        'cve': {
+            'CVE_data_meta': {'ID': 'CVE-2021-34527'},
+            'description': {'description_data': [{'lang': 'en', 'value': 'Windows Print Spooler Remote Code Execution Vulnerability'}]}
+        },
+        'impact': {
+            'baseMetricV3': {'cvssV3': {'baseScore': 8.8}},
+            'baseMetricV2': {'cvssV2': {'baseScore': 9.0}}
+        }
+    }]}))
+
+    try:
+        CveEnrichment.initialize_store(str(dump_file), str(tmp_path / 'CVE_STORE.sqlite'))
+        assert CveEnrichment.store.import_dump(str(dump_file)) == 0
+        cve_enrichment = CveEnrichment.enrich_cves(['CVE-2021-34527', 'CVE-1999-0001'])
+    finally:
+        CveEnrichment.store.close()
+        CveEnrichment.store = None
+
+    assert cve_enrichment[0] == {'id': 'CVE-2021-34527', 'cvss': 9.0,
+        'summary': 'Windows Print Spooler Remote Code Execution Vulnerability'}
+    assert cve_enrichment[1] == {}
+
+
+def test_cve_store_reimport(tmp_path):
+    dump_file = tmp_path / 'cves.jsonl'
+    dump_file.write_text('{"id": "CVE-2021-34527", "cvss": 9.0, "summary": "Print Spooler"}\n'
+                         '{"id": "CVE-2021-1675", "cvss": 9.3, "summary": "Print Spooler"}\n')
+    store = CveStore(str(tmp_path / 'CVE_STORE.sqlite'))
+    try:
+        assert store.import_dump(str(dump_file)) == 2
+        assert store.import_dump(str(dump_file)) == 0
+
+        # CVEs missing from the newer dump are removed from the store
+        dump_file.write_text('{"id": "CVE-2021-34527", "cvss": 8.8, "summary": "Print Spooler"}\n')
+        os.utime(dump_file, (1000000000, 1000000000))
+        assert store.import_dump(str(dump_file)) == 1
+        assert store.get_many(['CVE-2021-34527', 'CVE-2021-1675']) == {
+            'CVE-2021-34527': {'id': 'CVE-2021-34527', 'cvss': 8.8, 'summary': 'Print Spooler'}}
+    finally:
+        store.close()
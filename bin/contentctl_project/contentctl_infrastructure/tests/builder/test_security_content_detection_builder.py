@@ -10,6 +10,7 @@ from bin.contentctl_project.contentctl_infrastructure.builder.security_content_i
 from bin.contentctl_project.contentctl_infrastructure.builder.security_content_baseline_builder import SecurityContentBaselineBuilder
 from bin.contentctl_project.contentctl_infrastructure.builder.attack_enrichment import AttackEnrichment
 from bin.contentctl_project.contentctl_infrastructure.builder.security_content_playbook_builder import SecurityContentPlaybookBuilder
+from bin.contentctl_project.contentctl_core.application.factory.utils.content_index import ContentIndex
 
 
 def test_read_detection():
@@ -31,10 +32,30 @@ def test_add_deployment_to_detection():
     security_content_builder = SecurityContentDetectionBuilder()
     security_content_builder.setObject(os.path.join(os.path.dirname(__file__), 
         'test_data/detection/valid.yml'))
-    security_content_builder.addDeployment([deployment])
+    security_content_builder.addDeployment(ContentIndex.fromObjects({SecurityContentType.deployments: [deployment]}))
     detection = security_content_builder.getObject()
 
-    assert detection.deployment.name == "ESCU Default Configuration TTP"  
+    assert detection.deployment.name == "ESCU Default Configuration TTP"
+
+
+def test_add_deployment_from_content_index():
+    deployment_dir = os.path.join(os.path.dirname(__file__), 'test_data/deployment/ESCU')
+    content_index = ContentIndex()
+    for deployment_file in sorted(os.listdir(deployment_dir)):
+        security_content_builder_deployment = SecurityContentBasicBuilder()
+        security_content_builder_deployment.setObject(os.path.join(deployment_dir, deployment_file),
+            SecurityContentType.deployments)
+        content_index.addObject(SecurityContentType.deployments, security_content_builder_deployment.getObject())
+
+    security_content_builder = SecurityContentDetectionBuilder()
+    security_content_builder.setObject(os.path.join(os.path.dirname(__file__),
+        'test_data/detection/valid.yml'))
+    security_content_builder.addDeployment(content_index)
+    detection = security_content_builder.getObject()
+
+    assert detection.deployment.name == "ESCU Default Configuration TTP"
+    assert ('type', 'TTP') in security_content_builder.deployment_match.matched_tags
+    assert security_content_builder.deployment_match.explain().startswith("ESCU Default Configuration TTP matched on")
 
 
 def test_detection_nes_field_enrichment():
@@ -46,7 +67,7 @@ def test_detection_nes_field_enrichment():
     security_content_builder = SecurityContentDetectionBuilder()
     security_content_builder.setObject(os.path.join(os.path.dirname(__file__), 
         'test_data/detection/valid.yml'))
-    security_content_builder.addDeployment([deployment])
+    security_content_builder.addDeployment(ContentIndex.fromObjects({SecurityContentType.deployments: [deployment]}))
     security_content_builder.addNesFields()
     detection = security_content_builder.getObject()
 
@@ -62,7 +83,7 @@ def test_detection_annotation_enrichment():
     security_content_builder = SecurityContentDetectionBuilder()
     security_content_builder.setObject(os.path.join(os.path.dirname(__file__), 
         'test_data/detection/valid.yml'))
-    security_content_builder.addDeployment([deployment])
+    security_content_builder.addDeployment(ContentIndex.fromObjects({SecurityContentType.deployments: [deployment]}))
     security_content_builder.addAnnotations()
     detection = security_content_builder.getObject()
 
@@ -120,7 +141,7 @@ def test_detection_add_playbooks():
     security_content_builder = SecurityContentDetectionBuilder()
     security_content_builder.setObject(os.path.join(os.path.dirname(__file__), 
         'test_data/detection/valid.yml'))
-    security_content_builder.addPlaybook([playbook])
+    security_content_builder.addPlaybook(ContentIndex.fromObjects({SecurityContentType.playbooks: [playbook]}))
     detection = security_content_builder.getObject()
 
     assert detection.playbooks[0].name == "Ransomware Investigate and Contain"
@@ -135,7 +156,7 @@ def test_detection_enrich_baseline():
     security_content_builder = SecurityContentDetectionBuilder()
     security_content_builder.setObject(os.path.join(os.path.dirname(__file__), 
         'test_data/detection/valid.yml'))
-    security_content_builder.addBaseline([baseline])
+    security_content_builder.addBaseline(ContentIndex.fromObjects({SecurityContentType.baselines: [baseline]}))
     detection = security_content_builder.getObject()
 
     assert detection.baselines[0].name == "Previously Seen Users In CloudTrail - Update"
@@ -150,12 +171,40 @@ def test_detection_enrich_unit_test():
     security_content_builder = SecurityContentDetectionBuilder()
     security_content_builder.setObject(os.path.join(os.path.dirname(__file__), 
         'test_data/detection/valid.yml'))
-    security_content_builder.addUnitTest([test])
+    security_content_builder.addUnitTest(ContentIndex.fromObjects({SecurityContentType.unit_tests: [test]}))
     detection = security_content_builder.getObject()
 
     assert detection.test.tests[0].file == "endpoint/attempted_credential_dump_from_registry_via_reg_exe.yml"
 
 
+def test_detection_enrich_from_content_index():
+    baseline_builder = SecurityContentBaselineBuilder()
+    baseline_builder.setObject(os.path.join(os.path.dirname(__file__), 'test_data/baseline/baseline.yml'))
+    baseline = baseline_builder.getObject()
+
+    playbook_builder = SecurityContentPlaybookBuilder()
+    playbook_builder.setObject(os.path.join(os.path.dirname(__file__), 
+        'test_data/playbook/example_playbook.yml'))
+    playbook = playbook_builder.getObject()
+
+    content_index = ContentIndex()
+    content_index.addObject(SecurityContentType.baselines, baseline)
+    content_index.addObject(SecurityContentType.playbooks, playbook)
+
+    security_content_builder = SecurityContentDetectionBuilder()
+    security_content_builder.setObject(os.path.join(os.path.dirname(__file__), 
+        'test_data/detection/valid.yml'))
+    security_content_builder.addBaseline(content_index)
+    security_content_builder.addPlaybook(content_index)
+    security_content_builder.addUnitTest(content_index)
+    detection = security_content_builder.getObject()
+
+    assert detection.baselines[0].name == "Previously Seen Users In CloudTrail - Update"
+    assert detection.playbooks[0].name == "Ransomware Investigate and Contain"
+    assert detection.test is None
+    assert content_index.getBaselinesForStory(baseline.tags.analytic_story[0]) == [baseline]
+
+
 def test_attack_enrichment():
     security_content_builder = SecurityContentDetectionBuilder()
     security_content_builder.setObject(os.path.join(os.path.dirname(__file__), 
@@ -177,7 +226,7 @@ def test_macros_enrichment():
     security_content_builder = SecurityContentDetectionBuilder()
     security_content_builder.setObject(os.path.join(os.path.dirname(__file__), 
         'test_data/detection/valid.yml'))
-    security_content_builder.addMacros([macro])
+    security_content_builder.addMacros(ContentIndex.fromObjects({SecurityContentType.macros: [macro]}))
     detection = security_content_builder.getObject()
     
     assert detection.macros[0].name == 'process_reg'
@@ -193,7 +242,7 @@ def test_lookup_enrichment():
     security_content_builder = SecurityContentDetectionBuilder()
     security_content_builder.setObject(os.path.join(os.path.dirname(__file__), 
         'test_data/detection/attacker_tools_on_endpoint.yml'))
-    security_content_builder.addLookups([lookup])
+    security_content_builder.addLookups(ContentIndex.fromObjects({SecurityContentType.lookups: [lookup]}))
     detection = security_content_builder.getObject()
 
     assert detection.lookups[0].name == 'attacker_tools'
@@ -5,6 +5,8 @@ from bin.contentctl_project.contentctl_infrastructure.builder.security_content_b
 from bin.contentctl_project.contentctl_infrastructure.builder.security_content_detection_builder import SecurityContentDetectionBuilder
 from bin.contentctl_project.contentctl_infrastructure.builder.security_content_story_builder import SecurityContentStoryBuilder
 from bin.contentctl_project.contentctl_core.domain.entities.enums.enums import SecurityContentProduct
+from bin.contentctl_project.contentctl_core.domain.entities.enums.enums import SecurityContentType
+from bin.contentctl_project.contentctl_core.application.factory.utils.content_index import ContentIndex
 from bin.contentctl_project.contentctl_infrastructure.builder.security_content_investigation_builder import SecurityContentInvestigationBuilder
 from bin.contentctl_project.contentctl_infrastructure.builder.security_content_baseline_builder import SecurityContentBaselineBuilder
 from bin.contentctl_project.contentctl_infrastructure.builder.security_content_object_builder import SecurityContentObjectBuilder
@@ -79,13 +81,13 @@ def test_construct_baselines():
 
     baseline_builder = SecurityContentBaselineBuilder()
     director.constructBaseline(baseline_builder, os.path.join(os.path.dirname(__file__), 
-        'test_data/baseline/baseline.yml'), [deployment])
+        'test_data/baseline/baseline.yml'), ContentIndex.fromObjects({SecurityContentType.deployments: [deployment]}))
     baseline = baseline_builder.getObject()
 
     assert baseline.name == "Previously Seen Users In CloudTrail - Update"
 
     director.constructBaseline(baseline_builder, os.path.join(os.path.dirname(__file__), 
-        'test_data/baseline/baseline2.yml'), [deployment])
+        'test_data/baseline/baseline2.yml'), ContentIndex.fromObjects({SecurityContentType.deployments: [deployment]}))
     baseline = baseline_builder.getObject()
 
     assert baseline.name == "Baseline Of Cloud Instances Launched"
@@ -125,7 +127,7 @@ def test_construct_detections():
 
     baseline_builder = SecurityContentBaselineBuilder()
     director.constructBaseline(baseline_builder, os.path.join(os.path.dirname(__file__), 
-        'test_data/baseline/baseline.yml'), [deployment_baseline])
+        'test_data/baseline/baseline.yml'), ContentIndex.fromObjects({SecurityContentType.deployments: [deployment_baseline]}))
     baseline = baseline_builder.getObject()
 
     unit_test_builder = SecurityContentBasicBuilder()
@@ -140,8 +142,8 @@ def test_construct_detections():
 
     detection_builder = SecurityContentDetectionBuilder()
     director.constructDetection(detection_builder, os.path.join(os.path.dirname(__file__), 
-        'test_data/detection/valid.yml'), [deployment], [playbook], [baseline], [test],
-        AttackEnrichment.get_attack_lookup(), [macro], [lookup])
+        'test_data/detection/valid.yml'),
+        ContentIndex.fromObjects({SecurityContentType.deployments: [deployment], SecurityContentType.playbooks: [playbook], SecurityContentType.baselines: [baseline], SecurityContentType.unit_tests: [test], SecurityContentType.macros: [macro], SecurityContentType.lookups: [lookup]}), AttackEnrichment.get_attack_lookup())
     detection = detection_builder.getObject()
 
     valid_annotations = {'mitre_attack': ['T1003.002', 'T1003'], 
@@ -193,7 +195,7 @@ def test_construct_stories():
 
     baseline_builder = SecurityContentBaselineBuilder()
     director.constructBaseline(baseline_builder, os.path.join(os.path.dirname(__file__), 
-        'test_data/baseline/baseline2.yml'), [deployment_baseline])
+        'test_data/baseline/baseline2.yml'), ContentIndex.fromObjects({SecurityContentType.deployments: [deployment_baseline]}))
     baseline = baseline_builder.getObject()
 
     unit_test_builder = SecurityContentBasicBuilder()
@@ -203,8 +205,8 @@ def test_construct_stories():
 
     detection_builder = SecurityContentDetectionBuilder()
     director.constructDetection(detection_builder, os.path.join(os.path.dirname(__file__), 
-        'test_data/detection/valid.yml'), [deployment], [playbook], [baseline], [test],
-        AttackEnrichment.get_attack_lookup(), [], [])
+        'test_data/detection/valid.yml'),
+        ContentIndex.fromObjects({SecurityContentType.deployments: [deployment], SecurityContentType.playbooks: [playbook], SecurityContentType.baselines: [baseline], SecurityContentType.unit_tests: [test]}), AttackEnrichment.get_attack_lookup())
     detection = detection_builder.getObject()
 
     investigation_builder = SecurityContentInvestigationBuilder()
@@ -215,7 +217,7 @@ def test_construct_stories():
     story_builder = SecurityContentStoryBuilder()
     director.constructStory(story_builder, os.path.join(os.path.dirname(__file__), 
         'test_data/story/ransomware_darkside.yml'),
-        [detection], [baseline], [investigation])
+        ContentIndex.fromObjects({SecurityContentType.detections: [detection], SecurityContentType.baselines: [baseline], SecurityContentType.investigations: [investigation]}))
     story = story_builder.getObject()
 
     assert story.name == "DarkSide Ransomware"
@@ -4,6 +4,7 @@ from bin.contentctl_project.contentctl_infrastructure.builder.security_content_s
 from bin.contentctl_project.contentctl_infrastructure.builder.security_content_detection_builder import SecurityContentDetectionBuilder
 from bin.contentctl_project.contentctl_infrastructure.builder.security_content_basic_builder import SecurityContentBasicBuilder
 from bin.contentctl_project.contentctl_core.domain.entities.enums.enums import SecurityContentType
+from bin.contentctl_project.contentctl_core.application.factory.utils.content_index import ContentIndex
 from bin.contentctl_project.contentctl_infrastructure.builder.security_content_investigation_builder import SecurityContentInvestigationBuilder
 from bin.contentctl_project.contentctl_infrastructure.builder.security_content_baseline_builder import SecurityContentBaselineBuilder
 from bin.contentctl_project.contentctl_infrastructure.builder.attack_enrichment import AttackEnrichment
@@ -29,7 +30,7 @@ def test_add_detections():
     story_builder = SecurityContentStoryBuilder()
     story_builder.setObject(os.path.join(os.path.dirname(__file__), 
         'test_data/story/ransomware_darkside.yml'))
-    story_builder.addDetections([detection])
+    story_builder.addDetections(ContentIndex.fromObjects({SecurityContentType.detections: [detection]}))
     story = story_builder.getObject()
 
     assert story.detection_names == ["ESCU - Attempted Credential Dump From Registry via Reg exe - Rule"]
@@ -46,7 +47,7 @@ def test_add_baselines():
     story_builder = SecurityContentStoryBuilder()
     story_builder.setObject(os.path.join(os.path.dirname(__file__), 
         'test_data/story/ransomware_darkside.yml'))
-    story_builder.addBaselines([baseline])
+    story_builder.addBaselines(ContentIndex.fromObjects({SecurityContentType.baselines: [baseline]}))
     story = story_builder.getObject()
 
     assert story.baseline_names == ["ESCU - Baseline Of Cloud Instances Launched"]
@@ -61,7 +62,7 @@ def test_add_investigations():
     story_builder = SecurityContentStoryBuilder()
     story_builder.setObject(os.path.join(os.path.dirname(__file__), 
         'test_data/story/ransomware_darkside.yml'))
-    story_builder.addInvestigations([investigation])
+    story_builder.addInvestigations(ContentIndex.fromObjects({SecurityContentType.investigations: [investigation]}))
     story = story_builder.getObject()
 
     assert story.investigation_names == ["ESCU - Get Parent Process Info - Response Task"]
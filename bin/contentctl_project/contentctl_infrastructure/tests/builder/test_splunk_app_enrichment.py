@@ -1,9 +1,78 @@
 
 
+import os
+import mock
+import requests
+
+from bin.contentctl_project.contentctl_infrastructure.builder import splunk_app_enrichment
 from bin.contentctl_project.contentctl_infrastructure.builder.splunk_app_enrichment import SplunkAppEnrichment
+from bin.contentctl_project.contentctl_infrastructure.builder.security_content_detection_builder import SecurityContentDetectionBuilder
 
 
 def test_splunk_app_enrichment():
     splunk_app_enriched = SplunkAppEnrichment.enrich_splunk_app('Splunk_TA_microsoft_sysmon')
     assert splunk_app_enriched['name'] == 'Splunk Add-on for Sysmon'
-    assert splunk_app_enriched['url'] == 'https://splunkbase.splunk.com/app/5709'
\ No newline at end of file
+    assert splunk_app_enriched['url'] == 'https://splunkbase.splunk.com/app/5709'
+
+SPLUNKBASE_ENTRY = '''<feed xmlns:s="http://dev.splunk.com/ns/rest"><entry><link href="{0}"/><content><s:dict>
+<s:key name="appName">Splunk Add-on for Sysmon</s:key><s:key name="appID">Splunk_TA_microsoft_sysmon</s:key></s:dict></content></entry></feed>'''
+
+
+def test_splunk_app_batch_enrichment(monkeypatch):
+    requested_urls = []
+
+    def get(url):
+        requested_urls.append(url)
+        if url.endswith('Splunk_TA_microsoft_sysmon'):
+            return mock.Mock(content=SPLUNKBASE_ENTRY.format('https://apps.splunk.com/api/apps/entriesbyid/sysmon/release'))
+        return mock.Mock(content=SPLUNKBASE_ENTRY.format('https://splunkbase.splunk.com/app/5709/release/3.0.0/download/'))
+
+    monkeypatch.setattr(splunk_app_enrichment.session, 'get', get)
+    monkeypatch.setattr(SplunkAppEnrichment, 'enrichments', {})
+
+    SplunkAppEnrichment.enrich_splunk_apps(['Splunk_TA_microsoft_sysmon'] * 100)
+    splunk_app_enriched = SplunkAppEnrichment.enrich_splunk_app('Splunk_TA_microsoft_sysmon')
+
+    assert splunk_app_enriched == {'name': 'Splunk Add-on for Sysmon', 'url': 'https://splunkbase.splunk.com/app/5709'}
+    assert len(requested_urls) == 2
+
+
+def test_splunk_app_enrichment_connection_error(monkeypatch):
+    def get(url):
+        raise requests.exceptions.ConnectionError()
+
+    monkeypatch.setattr(splunk_app_enrichment.session, 'get', get)
+    monkeypatch.setattr(SplunkAppEnrichment, 'enrichments', {})
+
+    SplunkAppEnrichment.enrich_splunk_apps(['Splunk_TA_microsoft_sysmon'])
+    splunk_app_enriched = SplunkAppEnrichment.enrich_splunk_app('Splunk_TA_microsoft_sysmon')
+
+    assert splunk_app_enriched == {'name': 'Splunk_TA_microsoft_sysmon', 'url': ''}
+    # Failed fetches are not stored, the next detection fetches the app again
+    assert SplunkAppEnrichment.enrichments == {}
+
+
+def test_splunk_app_deferred_enrichment(monkeypatch):
+    requested_urls = []
+
+    def get(url):
+        requested_urls.append(url)
+        return mock.Mock(content=SPLUNKBASE_ENTRY.format('https://splunkbase.splunk.com/app/5709/release/3.0.0/download/'))
+
+    monkeypatch.setattr(splunk_app_enrichment.session, 'get', get)
+    monkeypatch.setattr(SplunkAppEnrichment, 'enrichments', {})
+
+    builder = SecurityContentDetectionBuilder()
+    builder.deferEnrichment()
+    detections = []
+    for _ in range(2):
+        builder.reset()
+        builder.setObject(os.path.join(os.path.dirname(__file__), 'test_data/detection/valid.yml'))
+        builder.addSplunkApp()
+        detections.append(builder.getObject())
+    assert requested_urls == []
+
+    builder.enrichObjects(detections)
+    assert len(requested_urls) == 1
+    for detection in detections:
+        assert detection.splunk_app_enrichment == [{'name': 'Splunk Add-on for Sysmon'}]
@@ -7,3 +7,28 @@ from bin.contentctl_project.contentctl_infrastructure.builder.yml_reader import
 def test_read_detection_file():
     yml_obj = YmlReader.load_file(os.path.join(os.path.dirname(__file__), 'test_data/detection/valid.yml'))
     assert yml_obj['name'] == "Attempted Credential Dump From Registry via Reg exe"
+
+
+def test_read_detection_file_cached(tmp_path):
+    file_path = os.path.join(tmp_path, 'valid.yml')
+    with open(os.path.join(os.path.dirname(__file__), 'test_data/detection/valid.yml'), 'r') as f:
+        content = f.read()
+    with open(file_path, 'w') as f:
+        f.write(content)
+
+    YmlReader.initialize_cache(True, os.path.join(tmp_path, 'cache'))
+    try:
+        yml_obj = YmlReader.load_file(file_path)
+        cache_file = YmlReader.get_cache_file(file_path)
+        assert os.path.exists(cache_file)
+
+        yml_obj_cached = YmlReader.load_file(file_path)
+        assert yml_obj_cached == yml_obj
+        assert yml_obj_cached is not yml_obj
+
+        with open(file_path, 'w') as f:
+            f.write(content.replace("Attempted Credential Dump", "Changed Credential Dump"))
+        yml_obj_changed = YmlReader.load_file(file_path)
+        assert yml_obj_changed['name'] == "Changed Credential Dump From Registry via Reg exe"
+    finally:
+        YmlReader.initialize_cache(False, ".contentctl_cache/yml")
@@ -0,0 +1,19 @@
+import pytest
+
+from bin.contentctl_project.contentctl_infrastructure.adapter.output_writer import OutputWriter
+from bin.contentctl_project.contentctl_infrastructure.adapter.template_engine import TemplateEngine
+
+
+@pytest.fixture(autouse=True)
+def output_manifest_directory(tmp_path_factory, monkeypatch):
+    # Keeps the output manifests of the adapters out of the source tree
+    monkeypatch.setattr(OutputWriter, 'manifest_directory', str(tmp_path_factory.mktemp('output_manifests')))
+    monkeypatch.setattr(OutputWriter, 'manifests', {})
+
+
+@pytest.fixture(autouse=True)
+def template_bytecode_cache_directory(tmp_path_factory, monkeypatch):
+    # Keeps the compiled templates out of the working directory.  The environments
+    # are created again, so they use the directory of the test
+    monkeypatch.setattr(TemplateEngine, 'bytecode_cache_directory', str(tmp_path_factory.mktemp('jinja')))
+    monkeypatch.setattr(TemplateEngine, 'environments', {})
@@ -31,7 +31,7 @@ from requests import get
 
 
 
-from modules import (container_manager, new_arguments2,
+from modules import (attack_data_cache, container_manager, new_arguments2,
                      testing_service, validate_args, utils)
 from modules.github_service import GithubService
 from modules.validate_args import validate, validate_and_write, ES_APP_NAME
@@ -532,6 +532,14 @@ def main(args: list[str]):
     #Setup requires a different teardown handler than during execution
     signal.signal(signal.SIGINT, shutdown_signal_handler_setup)
 
+    #Download the attack data into the cache while the containers start up
+    try:
+        attack_data_cache.initialize_cache(settings['attack_data_cache'], settings['attack_data_cache_size_gb'])
+        attack_data_cache.start_prefetch(testing_service.get_attack_data_urls(all_test_files))
+    except Exception as e:
+        print(f"Error setting up the attack data cache at [{settings['attack_data_cache']}]: [{str(e)}]. Attack data will not be cached", file=sys.stderr)
+        attack_data_cache.initialize_cache(None)
+
     try:
         cm = container_manager.ContainerManager(all_test_files,
                                                 FULL_DOCKER_HUB_CONTAINER_NAME,
@@ -551,7 +559,8 @@ def main(args: list[str]):
                                                 splunkbase_password=settings['splunkbase_password'],
                                                 reuse_image=settings['reuse_image'],
                                                 interactive_failure=not settings['no_interactive_failure'],
-                                                interactive=settings['interactive'])
+                                                interactive=settings['interactive'],
+                                                batch_by_attack_data=settings['batch_by_attack_data'])
     except Exception as e:
         print("Error - unrecoverable error trying to set up the containers: [%s].\n\tQuitting..."%(str(e)),file=sys.stderr)
         sys.exit(1)
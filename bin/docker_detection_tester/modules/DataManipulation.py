@@ -1,156 +1,230 @@
-import json
 from datetime import datetime
 from datetime import timedelta
 #import fileinput
 import os
 import re
 import io
+from typing import Callable, Union
 
-class DataManipulation:
+#Size of the pieces of the attack data read at once, so that large files never have to fit in memory
+CHUNK_SIZE = 1024*1024
+#Number of distinct timestamps whose updated value is remembered.  Timestamps repeat a lot (many
+#events per second), so most of them are only parsed and formatted once
+MAX_CACHED_TIMESTAMPS = 100000
+
+
+class TimestampFormat:
+    #A timestamp layout with a fixed position for each field, parsed by slicing instead of strptime
+    def __init__(self, name:str, regex:str, parse:Callable[[str],datetime], format:Callable[[datetime,str],str], max_length:int):
+        self.name = name
+        self.regex = re.compile(regex)
+        #parse returns the datetime of a timestamp, or raises ValueError
+        self.parse = parse
+        #format returns a datetime in the same layout as the original timestamp (e.g. same number of
+        #digits for the fractions of a second)
+        self.format = format
+        self.max_length = max_length
 
-    def manipulate_timestamp(self, file_path, sourcetype, source):
 
+def parse_windows_time(text:str)->datetime:
+    #%m/%d/%Y %I:%M:%S %p
+    hour = int(text[11:13])
+    if not 1 <= hour <= 12:
+        raise ValueError(f"Invalid hour in {text}")
+    hour = hour % 12 + (12 if text[20] == 'P' else 0)
+    return datetime(int(text[6:10]), int(text[0:2]), int(text[3:5]), hour, int(text[14:16]), int(text[17:19]))
 
-        #print('Updating timestamps in attack_data before replaying')
 
-        if sourcetype == 'aws:cloudtrail':
-            self.manipulate_timestamp_cloudtrail(file_path)
+def format_windows_time(time:datetime, original_text:str)->str:
+    return f"{time.month:02d}/{time.day:02d}/{time.year:04d} {(time.hour % 12) or 12:02d}:{time.minute:02d}:{time.second:02d} {'PM' if time.hour >= 12 else 'AM'}"
 
-        if source == 'WinEventLog:System' or source == 'WinEventLog:Security':
-            self.manipulate_timestamp_windows_event_log_raw(file_path)
 
-        if source == 'exchange':
-            self.manipulate_timestamp_exchange_logs(file_path)
+def parse_iso_time(text:str)->datetime:
+    #%Y-%m-%dT%H:%M:%S with optional fractions of a second and Z
+    microseconds = 0
+    if len(text) > 20 and text[19] == '.':
+        fraction = text[20:].rstrip('Z')
+        microseconds = int(fraction[:6].ljust(6, '0'))
+    return datetime(int(text[0:4]), int(text[5:7]), int(text[8:10]), int(text[11:13]), int(text[14:16]), int(text[17:19]), microseconds)
 
 
-    def manipulate_timestamp_exchange_logs(self, file_path):
-        path =  os.path.join(os.path.dirname(__file__), '../' + file_path)
-        path =  path.replace('modules/../','')
+def format_iso_time(time:datetime, original_text:str)->str:
+    formatted = f"{time.year:04d}-{time.month:02d}-{time.day:02d}T{time.hour:02d}:{time.minute:02d}:{time.second:02d}"
+    fraction = original_text[20:].rstrip('Z') if len(original_text) > 20 and original_text[19] == '.' else ''
+    if fraction:
+        formatted += '.' + f"{time.microsecond:06d}"[:len(fraction)].ljust(len(fraction), '0')
+    if original_text.endswith('Z'):
+        formatted += 'Z'
+    return formatted
 
-        f = io.open(path, "r", encoding="utf-8")
 
-        first_line = f.readline()
-        d = json.loads(first_line)
-        latest_event  = datetime.strptime(d["CreationTime"],"%Y-%m-%dT%H:%M:%S")
+WINDOWS_TIME = TimestampFormat("windows", r'\d{2}/\d{2}/\d{4} \d{2}:\d{2}:\d{2} [AP]M', parse_windows_time, format_windows_time, 22)
+ISO_TIME = TimestampFormat("iso", r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?Z?', parse_iso_time, format_iso_time, 40)
 
-        now = datetime.now()
-        now = now.strftime("%Y-%m-%dT%H:%M:%S")
-        now = datetime.strptime(now,"%Y-%m-%dT%H:%M:%S")
 
-        difference = now - latest_event
-        f.close()
+class TimestampRule:
+    #How the timestamps of a sourcetype (or source) are updated.
+    #field: name of the JSON field holding the timestamp of each line (one event per line).  The
+    #   timestamp of the first line is the latest event, and every occurrence of the value of the
+    #   field in its line is updated.  Without a field, every timestamp in the file is updated and
+    #   the last one is the latest event.
+    def __init__(self, name:str, timestamp_format:TimestampFormat, sourcetypes:list[str]=[], sources:list[str]=[], field:Union[str,None]=None):
+        self.name = name
+        self.timestamp_format = timestamp_format
+        self.sourcetypes = sourcetypes
+        self.sources = sources
+        self.field = field
+        if field is not None:
+            self.field_regex = re.compile(r'"%s"\s*:\s*"(%s)"'%(re.escape(field), timestamp_format.regex.pattern))
 
-        #Mimic the behavior of fileinput but in a threadsafe way
-        #Rename the file, which fileinput does for inplace.
-        #Note that path will now be the new file
-        original_backup_file = f"{path}.bak"    
-        os.rename(path, original_backup_file)
-        
-        with open(original_backup_file, "r") as original_file:
-            with open(path, "w") as new_file:
-                for line in original_file:
-                    d = json.loads(line)
-                    original_time = datetime.strptime(d["CreationTime"],"%Y-%m-%dT%H:%M:%S")
-                    new_time = (difference + original_time)
+    def matches(self, sourcetype:str, source:str)->bool:
+        return sourcetype in self.sourcetypes or source in self.sources
 
-                    original_time = original_time.strftime("%Y-%m-%dT%H:%M:%S")
-                    new_time = new_time.strftime("%Y-%m-%dT%H:%M:%S")
-                    #There is no end character appended, no need for end=''
-                    new_file.write(line.replace(original_time, new_time))
 
+#Rules in the order they are checked, the first matching rule is used.  Add the rules of new
+#sourcetypes with register_timestamp_rule
+TIMESTAMP_RULES: list[TimestampRule] = []
 
-        os.remove(original_backup_file)
 
-    def manipulate_timestamp_windows_event_log_raw(self, file_path):
-        path =  os.path.join(os.path.dirname(__file__), '../' + file_path)
-        path =  path.replace('modules/../','')
-
-        f = io.open(path, "r", encoding="utf-8")
-        self.now = datetime.now()
-        self.now = self.now.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
-        self.now = datetime.strptime(self.now,"%Y-%m-%dT%H:%M:%S.%fZ")
-
-        # read raw logs
-        regex = r'\d{2}/\d{2}/\d{4} \d{2}:\d{2}:\d{2} [AP]M'
-        data = f.read()
-        lst_matches = re.findall(regex, data)
-        if len(lst_matches) > 0:
-            latest_event  = datetime.strptime(lst_matches[-1],"%m/%d/%Y %I:%M:%S %p")
-            self.difference = self.now - latest_event
-            f.close()
-
-            result = re.sub(regex, self.replacement_function, data)
-
-            with io.open(path, "w+", encoding='utf8') as f:
-                f.write(result)
-        else:
-            f.close()
-            return
+def register_timestamp_rule(rule:TimestampRule)->None:
+    TIMESTAMP_RULES.append(rule)
 
 
-    def replacement_function(self, match):
-        try:
-            event_time = datetime.strptime(match.group(),"%m/%d/%Y %I:%M:%S %p")
-            new_time = self.difference + event_time
-            return new_time.strftime("%m/%d/%Y %I:%M:%S %p")
-        except Exception as e:
-            self.logger.error("Error in timestamp replacement occured: " + str(e))
-            return match.group()
+register_timestamp_rule(TimestampRule("cloudtrail", ISO_TIME, sourcetypes=['aws:cloudtrail'], field="eventTime"))
+register_timestamp_rule(TimestampRule("windows_event_log_raw", WINDOWS_TIME, sources=['WinEventLog:System', 'WinEventLog:Security']))
+register_timestamp_rule(TimestampRule("exchange", ISO_TIME, sources=['exchange'], field="CreationTime"))
+
+
+class TimestampShifter:
+    #Moves every timestamp by the same difference, remembering the updated value of each timestamp
+    def __init__(self, timestamp_format:TimestampFormat, difference:timedelta):
+        self.timestamp_format = timestamp_format
+        self.difference = difference
+        self.cache = {}
 
+    def shift(self, text:str)->str:
+        new_text = self.cache.get(text)
+        if new_text is None:
+            try:
+                new_text = self.timestamp_format.format(self.timestamp_format.parse(text) + self.difference, text)
+            except (ValueError, OverflowError) as e:
+                #e.g. 13/45/2022, left as it is
+                new_text = text
+            if len(self.cache) >= MAX_CACHED_TIMESTAMPS:
+                self.cache.clear()
+            self.cache[text] = new_text
+        return new_text
+
+    def shift_match(self, match:re.Match)->str:
+        return self.shift(match.group())
 
-    def manipulate_timestamp_cloudtrail(self, file_path):
+
+class DataManipulation:
+
+    def manipulate_timestamp(self, file_path, sourcetype, source, output_file_path):
+        #The file with the updated timestamps is written to output_file_path, file_path is never
+        #modified (it may be a hardlink to the attack data cache).  Returns the file to replay,
+        #file_path itself when there is nothing to update for this sourcetype and source
+
+        #print('Updating timestamps in attack_data before replaying')
+
+        for rule in TIMESTAMP_RULES:
+            if rule.matches(sourcetype, source):
+                if self.manipulate_timestamp_with_rule(file_path, output_file_path, rule):
+                    return output_file_path
+                return file_path
+
+        return file_path
+
+
+    def get_path(self, file_path):
         path =  os.path.join(os.path.dirname(__file__), '../' + file_path)
-        path =  path.replace('modules/../','')
+        return path.replace('modules/../','')
 
-        f = io.open(path, "r", encoding="utf-8")
+
+    def manipulate_timestamp_with_rule(self, file_path:str, output_file_path:str, rule:TimestampRule)->bool:
+        #Streams file_path to output_file_path with the timestamps of rule updated.  Returns False,
+        #without writing anything, when there is no timestamp to update
+        path = self.get_path(file_path)
+        if rule.field is not None:
+            latest_event_text = self.find_first_field_value(path, rule)
+        else:
+            latest_event_text = self.find_last_timestamp(path, rule.timestamp_format)
+        if latest_event_text is None:
+            return False
 
         try:
-            first_line = f.readline()
-            d = json.loads(first_line)
-            latest_event  = datetime.strptime(d["eventTime"],"%Y-%m-%dT%H:%M:%S.%fZ")
-
-            now = datetime.now()
-            now = now.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
-            now = datetime.strptime(now,"%Y-%m-%dT%H:%M:%S.%fZ")
-        except ValueError:
-            first_line = f.readline()
-            d = json.loads(first_line)
-            latest_event  = datetime.strptime(d["eventTime"],"%Y-%m-%dT%H:%M:%SZ")
-
-            now = datetime.now()
-            now = now.strftime("%Y-%m-%dT%H:%M:%SZ")
-            now = datetime.strptime(now,"%Y-%m-%dT%H:%M:%SZ")
-
-        difference = now - latest_event
-        f.close()
-
-
-
-        #Mimic the behavior of fileinput but in a threadsafe way
-        #Rename the file, which fileinput does for inplace.
-        #Note that path will now be the new file
-        original_backup_file = f"{path}.bak"    
-        os.rename(path, original_backup_file)
-        
-        with open(original_backup_file, "r") as original_file:
-            with open(path, "w") as new_file:
-                for line in original_file:
-                    try:
-                        d = json.loads(line)
-                        original_time = datetime.strptime(d["eventTime"],"%Y-%m-%dT%H:%M:%S.%fZ")
-                        new_time = (difference + original_time)
-
-                        original_time = original_time.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
-                        new_time = new_time.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
-                        new_file.write(line.replace(original_time, new_time))
-                    except ValueError:
-                        d = json.loads(line)
-                        original_time = datetime.strptime(d["eventTime"],"%Y-%m-%dT%H:%M:%SZ")
-                        new_time = (difference + original_time)
-
-                        original_time = original_time.strftime("%Y-%m-%dT%H:%M:%SZ")
-                        new_time = new_time.strftime("%Y-%m-%dT%H:%M:%SZ")
-                        new_file.write(line.replace(original_time, new_time))
-
-
-        os.remove(original_backup_file)
\ No newline at end of file
+            latest_event = rule.timestamp_format.parse(latest_event_text)
+        except ValueError as e:
+            print(f"Error parsing the latest timestamp [{latest_event_text}] of {file_path}, timestamps will not be updated: [{str(e)}]")
+            return False
+        #The latest event happens now
+        shifter = TimestampShifter(rule.timestamp_format, datetime.now() - latest_event)
+
+        #newline='' keeps the line endings of the file as they are
+        with io.open(path, "r", encoding="utf-8", newline='') as original_file:
+            with io.open(self.get_path(output_file_path), "w", encoding="utf-8", newline='') as new_file:
+                if rule.field is not None:
+                    self.shift_field_lines(original_file, new_file, rule, shifter)
+                else:
+                    self.shift_chunks(original_file, new_file, rule.timestamp_format, shifter)
+        return True
+
+
+    def shift_field_lines(self, original_file:io.TextIOBase, new_file:io.TextIOBase, rule:TimestampRule, shifter:TimestampShifter)->None:
+        #One event per line, which keeps working even if the line is not valid JSON
+        for line in original_file:
+            match = rule.field_regex.search(line)
+            if match is not None:
+                original_time = match.group(1)
+                line = line.replace(original_time, shifter.shift(original_time))
+            new_file.write(line)
+
+
+    def shift_chunks(self, original_file:io.TextIOBase, new_file:io.TextIOBase, timestamp_format:TimestampFormat, shifter:TimestampShifter)->None:
+        #Each chunk is cut after its last newline (timestamps are never split across lines), or
+        #otherwise before its end so that a timestamp at the end goes to the next chunk whole
+        remainder = ""
+        while True:
+            chunk = original_file.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            data = remainder + chunk
+            cut = data.rfind('\n') + 1
+            if cut == 0:
+                cut = max(len(data) - timestamp_format.max_length, 0)
+                #A timestamp across the cut is complete in data, the cut moves back to its start
+                for match in timestamp_format.regex.finditer(data, max(cut - timestamp_format.max_length, 0)):
+                    if match.start() >= cut:
+                        break
+                    if match.end() > cut:
+                        cut = match.start()
+                        break
+            new_file.write(timestamp_format.regex.sub(shifter.shift_match, data[:cut]))
+            remainder = data[cut:]
+        new_file.write(timestamp_format.regex.sub(shifter.shift_match, remainder))
+
+
+    def find_first_field_value(self, path:str, rule:TimestampRule)->Union[str,None]:
+        with io.open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                match = rule.field_regex.search(line)
+                if match is not None:
+                    return match.group(1)
+        return None
+
+
+    def find_last_timestamp(self, path:str, timestamp_format:TimestampFormat)->Union[str,None]:
+        #Reads the file backwards one chunk at a time, the latest event is usually in the last one.
+        #Chunks overlap so that a timestamp across two chunks is found whole
+        with open(path, "rb") as f:
+            end = f.seek(0, os.SEEK_END)
+            while end > 0:
+                start = max(end - CHUNK_SIZE, 0)
+                f.seek(start)
+                data = f.read(end - start + timestamp_format.max_length).decode("utf-8", errors="ignore")
+                matches = timestamp_format.regex.findall(data)
+                if len(matches) > 0:
+                    return matches[-1]
+                end = start
+        return None
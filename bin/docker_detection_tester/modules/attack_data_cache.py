@@ -0,0 +1,309 @@
+import concurrent.futures
+import hashlib
+import json
+import os
+import shutil
+import stat
+import threading
+import time
+from typing import Union
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+
+import requests
+
+from modules import utils
+
+#Attack data downloaded by earlier tests (and runs), kept in a local folder:
+#   objects/<sha256>    the content of a file, read only, shared by every url with that content
+#   partial/<key>.part  a download in progress, resumed by the next attempt if interrupted
+#   index.json          url -> etag, last-modified, sha256, size and last use of its file
+#Tests get a hardlink (or a copy) of the object, and DataManipulation writes the files with
+#updated timestamps next to it, so the objects are never modified.  The least recently used
+#objects are evicted once the cache is larger than its maximum size.
+#The cache is disabled (files are downloaded for each test) until initialize_cache is called.
+cache_folder: Union[str,None] = None
+max_size_bytes: int = 0
+index: dict = {}
+index_lock = threading.Lock()
+#One lock per url, so a file needed by several containers (or the prefetch) is downloaded once,
+#while different files are downloaded concurrently
+url_locks: dict = {}
+#Urls checked against the server, and objects whose hash was verified, during this run
+validated_urls: set = set()
+verified_objects: set = set()
+
+PREFETCH_WORKERS = 4
+DOWNLOAD_CHUNK_SIZE = 1024*1024
+REQUEST_TIMEOUT_SECONDS = 60
+
+
+def initialize_cache(folder:Union[str,None], max_size_gb:float=10)->None:
+    global cache_folder, max_size_bytes, index
+    if folder is None:
+        cache_folder = None
+        return
+    cache_folder = os.path.abspath(folder)
+    max_size_bytes = int(max_size_gb * 1024 * 1024 * 1024)
+    os.makedirs(os.path.join(cache_folder, "objects"), exist_ok=True)
+    os.makedirs(os.path.join(cache_folder, "partial"), exist_ok=True)
+    with index_lock:
+        index = load_index()
+        #Entries whose object was removed outside of the cache
+        for url in [url for url, entry in index.items() if not os.path.exists(get_object_path(entry['sha256']))]:
+            del index[url]
+        write_index()
+    print(f"Attack data will be cached at [{cache_folder}] (maximum {max_size_gb}GB, {len(index)} files cached)")
+
+
+def load_index()->dict:
+    try:
+        with open(os.path.join(cache_folder, "index.json"), "r") as index_file:
+            return json.load(index_file)
+    except Exception as e:
+        #Missing or corrupted, start over (orphaned objects are evicted with the others)
+        return {}
+
+
+def write_index()->None:
+    #Written to a temporary file then renamed, so that a crash never leaves a partial index
+    index_path = os.path.join(cache_folder, "index.json")
+    with open(index_path + ".tmp", "w") as index_file:
+        json.dump(index, index_file, indent=1)
+    os.replace(index_path + ".tmp", index_path)
+
+
+def get_object_path(sha256:str)->str:
+    return os.path.join(cache_folder, "objects", sha256)
+
+
+def get_url_lock(url:str)->threading.Lock:
+    with index_lock:
+        return url_locks.setdefault(url, threading.Lock())
+
+
+def hash_file(file_path:str)->str:
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def get_attack_data(url:str, destination_file:str)->None:
+    #Puts the file at url at destination_file, from the cache when it has it
+    if cache_folder is None:
+        utils.download_file_from_http(url, destination_file)
+        return
+
+    get_cached_object(url, destination_file)
+
+
+def get_cached_object(url:str, destination_file:Union[str,None]=None, evict:bool=True)->None:
+    #The object cannot be evicted while the lock of its url is held
+    with get_url_lock(url):
+        with index_lock:
+            entry = index.get(url)
+
+        #Check the entry against the server once per run.  The server answers 304 when the
+        #file did not change, and the cached copy is used when the server cannot be reached
+        if entry is not None and url not in validated_urls:
+            try:
+                entry = download(url, entry)
+            except Exception as e:
+                print(f"Could not check [{url}] for changes, using the cached copy: [{str(e)}]")
+            validated_urls.add(url)
+        elif entry is None:
+            entry = download(url, None)
+            validated_urls.add(url)
+
+        object_path = get_object_path(entry['sha256'])
+        if entry['sha256'] not in verified_objects:
+            if not os.path.exists(object_path) or hash_file(object_path) != entry['sha256']:
+                print(f"Cached copy of [{url}] is corrupted, downloading it again")
+                remove_object(entry['sha256'])
+                entry = download(url, None)
+                object_path = get_object_path(entry['sha256'])
+            verified_objects.add(entry['sha256'])
+
+        if destination_file is not None:
+            try:
+                os.link(object_path, destination_file)
+            except OSError:
+                #e.g. the cache is on another filesystem
+                shutil.copyfile(object_path, destination_file)
+
+        with index_lock:
+            entry['last_used'] = time.time()
+            index[url] = entry
+            if evict:
+                evict_objects()
+            write_index()
+
+
+def download(url:str, entry:Union[dict,None], resume:bool=True)->dict:
+    #Downloads url into the cache, resuming an interrupted download of the same version.  Returns
+    #entry unchanged when the server says that the cached version is current.  A download that
+    #cannot be resumed, or whose size is wrong, is started over once with a full GET
+    parsed_url = urlparse(url)
+    if parsed_url.scheme in ("", "file"):
+        #A local folder standing in for the attack data repository
+        return add_object(url, url2pathname(parsed_url.path), None, None, copy_file=True)
+
+    partial_path = os.path.join(cache_folder, "partial", hashlib.sha256(url.encode("utf-8")).hexdigest() + ".part")
+    headers = {}
+    if entry is not None:
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+    elif resume:
+        partial_state = load_partial_state(partial_path)
+        if partial_state is not None and os.path.exists(partial_path):
+            #Only resume if the file on the server is still the same version
+            headers['Range'] = f"bytes={os.path.getsize(partial_path)}-"
+            headers['If-Range'] = partial_state['etag'] or partial_state['last_modified']
+
+    with requests.get(url, stream=True, headers=headers, timeout=REQUEST_TIMEOUT_SECONDS) as response:
+        if response.status_code == 304 and entry is not None:
+            return entry
+        if response.status_code == 416 and 'Range' in headers:
+            #The partial file is already complete, or longer than the file on the server
+            remove_partial_download(partial_path)
+            return download(url, entry, resume=False)
+        if response.status_code not in (200, 206):
+            raise(Exception(f"Error downloading the file {url}: Status Code {response.status_code}"))
+
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if response.status_code == 200:
+            #Whole file, drop anything downloaded before
+            mode = "wb"
+            expected_size = response.headers.get('Content-Length')
+        else:
+            mode = "ab"
+            expected_size = response.headers.get('Content-Range', '').rpartition('/')[2]
+            etag, last_modified = etag or partial_state['etag'], last_modified or partial_state['last_modified']
+        if response.headers.get('Content-Encoding'):
+            #requests decompresses the content, so its size is not the Content-Length
+            expected_size = None
+
+        write_partial_state(partial_path, etag, last_modified)
+        with open(partial_path, mode) as output:
+            for piece in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                output.write(piece)
+
+    if expected_size and expected_size.isdigit() and os.path.getsize(partial_path) != int(expected_size):
+        error = f"Error downloading the file {url}: got {os.path.getsize(partial_path)} of {expected_size} bytes"
+        remove_partial_download(partial_path)
+        if resume:
+            print(f"{error}, downloading it again")
+            return download(url, entry, resume=False)
+        raise(Exception(error))
+
+    new_entry = add_object(url, partial_path, etag, last_modified)
+    os.remove(partial_path + ".json")
+    return new_entry
+
+
+def load_partial_state(partial_path:str)->Union[dict,None]:
+    try:
+        with open(partial_path + ".json", "r") as state_file:
+            state = json.load(state_file)
+        if state['etag'] or state['last_modified']:
+            return state
+    except Exception as e:
+        pass
+    return None
+
+
+def remove_partial_download(partial_path:str)->None:
+    for path in (partial_path, partial_path + ".json"):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def write_partial_state(partial_path:str, etag:Union[str,None], last_modified:Union[str,None])->None:
+    #The version being downloaded, needed to resume the download
+    with open(partial_path + ".json", "w") as state_file:
+        json.dump({"etag": etag, "last_modified": last_modified}, state_file)
+
+
+def add_object(url:str, file_path:str, etag:Union[str,None], last_modified:Union[str,None], copy_file:bool=False)->dict:
+    sha256 = hash_file(file_path)
+    object_path = get_object_path(sha256)
+    if os.path.exists(object_path):
+        #Same content as another url
+        if not copy_file:
+            os.remove(file_path)
+    elif copy_file:
+        shutil.copyfile(file_path, object_path + ".tmp")
+        os.replace(object_path + ".tmp", object_path)
+    else:
+        os.replace(file_path, object_path)
+    os.chmod(object_path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+    verified_objects.add(sha256)
+    return {"etag": etag, "last_modified": last_modified, "sha256": sha256,
+            "size": os.path.getsize(object_path), "last_used": time.time()}
+
+
+def remove_object(sha256:str)->None:
+    #Files linked into test folders keep their content
+    try:
+        os.remove(get_object_path(sha256))
+    except FileNotFoundError:
+        pass
+
+
+def get_cache_size()->int:
+    #Objects shared by several urls are only counted once.  Requires index_lock
+    return sum({entry['sha256']: entry['size'] for entry in index.values()}.values())
+
+
+def evict_objects()->None:
+    #Removes the least recently used objects until the cache fits, except for the ones of the
+    #urls being downloaded or linked.  Requires index_lock
+    referenced = {entry['sha256'] for entry in index.values()}
+    for object_name in os.listdir(os.path.join(cache_folder, "objects")):
+        if object_name not in referenced and not object_name.endswith(".tmp"):
+            #Not in the index, e.g. from a run that crashed before writing it
+            remove_object(object_name)
+
+    size = get_cache_size()
+    for url, entry in sorted(index.items(), key=lambda item: item[1]['last_used']):
+        if size <= max_size_bytes:
+            break
+        if url in url_locks and url_locks[url].locked():
+            continue
+        del index[url]
+        if entry['sha256'] not in {other['sha256'] for other in index.values()}:
+            remove_object(entry['sha256'])
+            verified_objects.discard(entry['sha256'])
+            size -= entry['size']
+
+
+def prefetch(urls:list[str])->None:
+    #Downloads the attack data of the tests ahead of them, in order.  Stops once the cache is full,
+    #so that the prefetch never evicts the files it just downloaded
+    def prefetch_url(url:str)->None:
+        with index_lock:
+            if get_cache_size() >= max_size_bytes:
+                return
+        try:
+            get_cached_object(url, evict=False)
+        except Exception as e:
+            #The test downloading it will report the error
+            print(f"Could not prefetch [{url}]: [{str(e)}]")
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=PREFETCH_WORKERS) as executor:
+        list(executor.map(prefetch_url, list(dict.fromkeys(urls))))
+
+
+def start_prefetch(urls:list[str])->Union[threading.Thread,None]:
+    if cache_folder is None:
+        return None
+    prefetch_thread = threading.Thread(target=prefetch, args=(urls,), daemon=True)
+    prefetch_thread.start()
+    return prefetch_thread
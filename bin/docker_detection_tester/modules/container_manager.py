@@ -40,14 +40,15 @@ class ContainerManager:
         splunkbase_password: Union[str, None] = None,
         reuse_image:bool = True,
         interactive_failure:bool=False,
-        interactive:bool=False
+        interactive:bool=False,
+        batch_by_attack_data:bool=False
 
     ):
         #Used to determine whether or not we should wait for container threads to finish when summarizing
         self.all_tests_completed = False
 
         self.synchronization_object = test_driver.TestDriver(
-            test_list, num_containers, summarization_reproduce_failure_config)
+            test_list, num_containers, summarization_reproduce_failure_config, batch_by_attack_data)
 
         self.mounts = self.create_mounts(mounts)
         self.apps = apps
@@ -199,6 +199,19 @@ def parse(args) -> tuple[str, dict]:
                             "the Splunk server to debug the detection.  Wait for the user "\
                             "to hit enter before removing the test data and moving on to the next test.")
 
+    run_parser.add_argument("-batch", "--batch_by_attack_data", required=False,
+                            action="store_true",
+                            help="Test the detections using the same attack data together: replay the "\
+                            "data once, run the search of each of the detections and then remove the data.")
+
+    run_parser.add_argument("-adc", "--attack_data_cache", required=False, type=str,
+                            help="Folder to keep the attack data in between tests and runs, so that every "\
+                            "file is only downloaded once.  By default, attack data is downloaded for each test.")
+
+    run_parser.add_argument("-adc_size", "--attack_data_cache_size_gb", required=False, type=float,
+                            help="Maximum size of the attack data cache in GB.  The least recently used "\
+                            "files are removed beyond it.")
+
     args = parser.parse_args()
 
 
@@ -214,12 +227,12 @@ def parse(args) -> tuple[str, dict]:
             # set their value to something else, like None
 
             # Don't overwite booleans
-            if args.__dict__[key] is False and key in ["show_splunk_app_password", "mock", "no_interactive_failure", "interactive"]:
+            if args.__dict__[key] is False and key in ["show_splunk_app_password", "mock", "no_interactive_failure", "interactive", "batch_by_attack_data"]:
                 del args.__dict__[key]
             # Don't overwrite other values
             elif args.__dict__[key] is None and key in ["splunkbase_username", "branch", "commit_hash",
                                                         "pr_number", "mode", "splunkbase_password",
-                                                        "num_containers"]:
+                                                        "num_containers", "attack_data_cache", "attack_data_cache_size_gb"]:
                 del args.__dict__[key]
 
         action, settings = args.func(args)
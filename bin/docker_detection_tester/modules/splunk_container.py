@@ -210,6 +210,7 @@ class SplunkContainer:
         return successful_copy
 
     def stopContainer(self,timeout=10) -> bool:
+        splunk_sdk.close_service(self.splunk_ip, self.management_port)
         try:        
             container = self.client.containers.get(self.container_name)
             #Note that stopping does not remove any of the volumes or logs,
@@ -227,6 +228,7 @@ class SplunkContainer:
     def removeContainer(
         self, removeVolumes: bool = True, forceRemove: bool = True
     ) -> bool:
+        splunk_sdk.close_service(self.splunk_ip, self.management_port)
         try:
             container = self.client.containers.get(self.container_name)
         except Exception as e:
@@ -422,32 +424,51 @@ class SplunkContainer:
             #time.sleep(random.randint(1, 30))
             
              
-            # There is a detection to test
+            # There is a detection to test, or a group of detections sharing the same attack data
+            if isinstance(detection_to_test, list):
+                detections_to_test = detection_to_test
+            else:
+                detections_to_test = [detection_to_test]
             
             print("Container [%s]--->[%s]" %
-                  (self.container_name, detection_to_test))
+                  (self.container_name, ", ".join(detections_to_test)))
             try:
-                result = testing_service.test_detection_wrapper(
-                    self.container_name,
-                    self.splunk_ip,
-                    self.container_password,
-                    self.management_port,
-                    detection_to_test,
-                    self.synchronization_object.attack_data_root_folder,
-                    wait_on_failure=self.interactive_failure,
-                    wait_on_completion = self.interactive
-                )
-                
+                if isinstance(detection_to_test, list):
+                    results = testing_service.test_detection_group_wrapper(
+                        self.container_name,
+                        self.splunk_ip,
+                        self.container_password,
+                        self.management_port,
+                        detections_to_test,
+                        self.synchronization_object.attack_data_root_folder,
+                        wait_on_failure=self.interactive_failure,
+                        wait_on_completion = self.interactive
+                    )
+                else:
+                    results = [testing_service.test_detection_wrapper(
+                        self.container_name,
+                        self.splunk_ip,
+                        self.container_password,
+                        self.management_port,
+                        detection_to_test,
+                        self.synchronization_object.attack_data_root_folder,
+                        wait_on_failure=self.interactive_failure,
+                        wait_on_completion = self.interactive
+                    )]
                 
-                self.synchronization_object.addResult(result, duration_string =  datetime.timedelta(seconds=round(timeit.default_timer() - current_test_start_time)))
+                #The tests of a group share the ingestion, so split the time evenly between them
+                duration_string = datetime.timedelta(seconds=round((timeit.default_timer() - current_test_start_time)/len(results)))
+                for result in results:
+                    self.synchronization_object.addResult(result, duration_string = duration_string)
 
                 # Remove the data from the test that we just ran.  We MUST do this when running on CI because otherwise, we will download
                 # a massive amount of data over the course of a long path and will run out of space on the relatively small CI runner drive
-                shutil.rmtree(result["attack_data_directory"],ignore_errors=True)
+                for result in results:
+                    shutil.rmtree(result["attack_data_directory"],ignore_errors=True)
             except Exception as e:
                 print(
                     "Warning - uncaught error in detection test for [%s] - this should not happen: [%s]"
-                    % (detection_to_test, str(e))
+                    % (", ".join(detections_to_test), str(e))
                 )
                 
                 #traceback.print_exc()
@@ -455,23 +476,25 @@ class SplunkContainer:
                 #pdb.set_trace()
                 # Fill in all the "Empty" fields with default values. Otherwise, we will not be able to 
                 # process the result correctly.  
-                detection_to_test.replace("security_content/tests", "security_content/detections")
-                try:
-                    test_file_obj = testing_service.load_file(os.path.join("security_content/", detection_to_test))
-                    if 'file' not in test_file_obj:
-                        raise Exception(f"'file' field not found in {detection_to_test}")
-                except:
-                    test_file_obj['file'] = detection_to_test.replace("tests/", "").replace(".test.yml", ".yml")
-                    print(f"Error getting the detection file associated with the test file. We will try our best to convert it: {detection_to_test}-->{test_file_obj['file']}")
-                    
-
-                self.synchronization_object.addError(
-                    {"detection_file": test_file_obj['file'],
-                        "detection_error": str(e)}, duration_string = datetime.timedelta(seconds=round(timeit.default_timer() - current_test_start_time))
+                duration_string = datetime.timedelta(seconds=round((timeit.default_timer() - current_test_start_time)/len(detections_to_test)))
+                for detection_to_test in detections_to_test:
+                    test_file_obj = {}
+                    try:
+                        test_file_obj = testing_service.load_file(os.path.join("security_content/", detection_to_test))
+                        if 'file' not in test_file_obj:
+                            raise Exception(f"'file' field not found in {detection_to_test}")
+                    except:
+                        test_file_obj['file'] = detection_to_test.replace("tests/", "").replace(".test.yml", ".yml")
+                        print(f"Error getting the detection file associated with the test file. We will try our best to convert it: {detection_to_test}-->{test_file_obj['file']}")
+                        
+
+                    self.synchronization_object.addError(
+                        {"detection_file": test_file_obj['file'],
+                            "detection_error": str(e)}, duration_string = duration_string
 
 
-                )
-            self.num_tests_completed += 1
+                    )
+            self.num_tests_completed += len(detections_to_test)
 
             # Try to get something from the queue
             detection_to_test = self.synchronization_object.getTest()
@@ -1,27 +1,93 @@
 from os import error
 import sys
 from time import sleep
+import splunklib.binding as binding
 import splunklib.client as client
 import splunklib.results as results
 import requests
 import time
 import timeit
 import datetime
+import io
+import threading
+import urllib3
 from typing import Union
 
 DEFAULT_EVENT_HOST = "ATTACK_DATA_HOST"
 DEFAULT_DATA_INDEX = "main"
 
-def enable_delete_for_admin(splunk_host:str, splunk_port:int, splunk_password:str)->bool:
+#Delays between two counts while waiting for indexing to complete
+MIN_INDEXING_POLL_SECONDS = 0.25
+MAX_INDEXING_POLL_SECONDS = 5
+#Parts of the names (lowercase) of the sourcetypes whose events may span several lines: XML
+#events (e.g. XmlWinEventLog) and classic WinEventLog events, which have one line per field
+MULTILINE_SOURCETYPES = ['xml', 'wineventlog']
+
+#One authenticated service per Splunk instance (host, port), shared by all of the
+#helpers below.  See get_service
+services: dict = {}
+services_lock = threading.Lock()
+
+
+def keep_alive_handler(session: requests.Session):
+    #HTTP handler for splunklib sending every request through one keep-alive
+    #requests.Session, instead of opening a new connection for each request
+    def request(url: str, message: dict, **kwargs) -> dict:
+        response = session.request(message.get('method', 'GET'), url,
+                                   headers=dict(message.get('headers', [])),
+                                   data=message.get('body', None),
+                                   timeout=kwargs.get('timeout', None),
+                                   verify=False)
+        #The body is read at once, so that the connection goes back to the pool
+        return {
+            'status': response.status_code,
+            'reason': response.reason,
+            'headers': list(response.headers.items()),
+            'body': binding.ResponseReader(io.BytesIO(response.content))
+        }
+    return request
+
+
+def get_service(splunk_host:str, splunk_port:int, splunk_password:str)->client.Service:
+    #Logs in once per Splunk instance.  The session key is reused by every later
+    #call, and splunklib logs in again by itself (autologin) when the session
+    #expires or the instance restarts and a request fails with 401
+    key = (splunk_host, int(splunk_port))
+    with services_lock:
+        service = services.get(key)
+        if service is not None and service.password == splunk_password:
+            return service
+
+        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        try:
+            service = client.connect(
+                host=splunk_host,
+                port=splunk_port,
+                username='admin',
+                password=splunk_password,
+                autologin=True,
+                handler=keep_alive_handler(requests.Session())
+            )
+        except Exception as e:
+            raise(Exception("Unable to connect to Splunk instance: " + str(e)))
+        services[key] = service
+        return service
+
+
+def close_service(splunk_host:str, splunk_port:int)->None:
+    #Called when the container is removed, the next get_service logs in again
+    with services_lock:
+        service = services.pop((splunk_host, int(splunk_port)), None)
+    if service is None:
+        return
     try:
-        service = client.connect(
-            host=splunk_host,
-            port=splunk_port,
-            username='admin',
-            password=splunk_password
-        )
+        service.logout()
     except Exception as e:
-        raise(Exception("Unable to connect to Splunk instance: " + str(e)))
+        #The container may already be gone
+        pass
+
+def enable_delete_for_admin(splunk_host:str, splunk_port:int, splunk_password:str)->bool:
+    service = get_service(splunk_host, splunk_port, splunk_password)
         
 
     #write the following contents to /opt/splunk/etc/system/local/authorize.conf
@@ -63,15 +129,7 @@ def enable_delete_for_admin(splunk_host:str, splunk_port:int, splunk_password:st
 
 def get_number_of_indexed_events(splunk_host, splunk_port, splunk_password, index:str, event_host:str=DEFAULT_EVENT_HOST, sourcetype:Union[str,None]=None )->int:
 
-    try:
-        service = client.connect(
-            host=splunk_host,
-            port=splunk_port,
-            username='admin',
-            password=splunk_password
-        )
-    except Exception as e:
-        raise(Exception("Unable to connect to Splunk instance: " + str(e)))
+    service = get_service(splunk_host, splunk_port, splunk_password)
 
     if sourcetype is not None:
         search = f'''search index="{index}" sourcetype="{sourcetype}" host="{event_host}" | stats count'''
@@ -96,30 +154,66 @@ def get_number_of_indexed_events(splunk_host, splunk_port, splunk_password, inde
     
 
 
-def wait_for_indexing_to_complete(splunk_host, splunk_port, splunk_password, sourcetype:str, index:str, check_interval_seconds:int=10)->bool:
-    startTime = timeit.default_timer()
+def get_indexed_event_count(splunk_host, splunk_port, splunk_password, index:str, sourcetype:str, event_host:str=DEFAULT_EVENT_HOST)->int:
+    #Cheap count of the events written to the index, from the index time fields only.
+    #Unlike get_number_of_indexed_events it also counts events hidden by | delete, so
+    #only compare it to counts made by this function
+    service = get_service(splunk_host, splunk_port, splunk_password)
+
+    search = f'''| tstats count where index="{index}" sourcetype="{sourcetype}" host="{event_host}"'''
+    try:
+        search_results = list(results.ResultsReader(service.jobs.oneshot(search)))
+        if len(search_results) != 1:
+            raise Exception(f"Expected the get_indexed_event_count search to only return 1 count, but got {len(search_results)} instead.")
+        return int(search_results[0]['count'])
+
+    except Exception as e:
+        raise Exception("Error trying to get the count while waiting for indexing to complete: %s"%(str(e)))
+
+
+def count_events_in_file(file_path:str, sourcetype:str)->Union[int,None]:
+    #Number of events Splunk will index from the file, or None when it cannot be known
+    #up front because the events of the sourcetype span several lines
+    if any(multiline in sourcetype.lower() for multiline in MULTILINE_SOURCETYPES):
+        return None
+    count = 0
+    with open(file_path, 'rb') as data_file:
+        for line in data_file:
+            if line.strip():
+                count += 1
+    return count
+
+
+def wait_for_indexing_to_complete(splunk_host, splunk_port, splunk_password, sourcetype:str, index:str, check_interval_seconds:int=10, expected_count:Union[int,None]=None, initial_count:int=0)->bool:
+    #initial_count is the get_indexed_event_count of the index and sourcetype before the
+    #file was submitted and expected_count the number of events of the file (see
+    #count_events_in_file).  Returns as soon as all of the expected events are indexed.
+    #The count is polled with a short delay that grows while the count does not change.
+    #When expected_count is None, or the count stops short of it (e.g. events merged by
+    #line breaking), indexing is complete once events of the file were indexed and the
+    #count did not change for check_interval_seconds
+    delay = MIN_INDEXING_POLL_SECONDS
     previous_count = -1
-    time.sleep(check_interval_seconds)
+    unchanged_since = timeit.default_timer()
     while True:
-        new_count = get_number_of_indexed_events(splunk_host, splunk_port, splunk_password, index=index, sourcetype=sourcetype)
-        #print(f"Previous Count [{previous_count}] New Count [{new_count}]")
-        if previous_count == -1:
+        new_count = get_indexed_event_count(splunk_host, splunk_port, splunk_password, index=index, sourcetype=sourcetype) - initial_count
+        now = timeit.default_timer()
+        if expected_count is not None and new_count >= expected_count:
+            return True
+
+        if new_count != previous_count:
             previous_count = new_count
+            unchanged_since = now
+            delay = MIN_INDEXING_POLL_SECONDS
         else:
-            if new_count == previous_count:
-                stopTime = timeit.default_timer()
+            if new_count > 0 and now - unchanged_since >= check_interval_seconds:
+                if expected_count is not None:
+                    print(f"Indexed {new_count} of the {expected_count} events expected in index [{index}] for sourcetype [{sourcetype}], the count did not change for {check_interval_seconds} seconds")
                 return True
-            else:
-                previous_count = new_count
-        
-        #If new_count is really low, then the server is taking some extra time to index the data.
-        # So sleep for longer to make sure that we give time to complete (or at least process more
-        # events so we don't return from this function prematurely) 
-        if new_count < 2:
-            time.sleep(check_interval_seconds*3)
-        else:
-            time.sleep(check_interval_seconds)
-        
+            delay = min(delay*2, MAX_INDEXING_POLL_SECONDS)
+
+        time.sleep(delay)
+
 
 '''
 def wait_for_indexing_to_complete(splunk_host, splunk_port, splunk_password, sourcetype:str, index:str, check_interval_seconds:int=10):
@@ -175,15 +269,7 @@ def wait_for_indexing_to_complete(splunk_host, splunk_port, splunk_password, sou
 
 
 def test_baseline_search(splunk_host, splunk_port, splunk_password, search, pass_condition, baseline_name, baseline_file, earliest_time, latest_time)->dict:
-    try:
-        service = client.connect(
-            host=splunk_host,
-            port=splunk_port,
-            username='admin',
-            password=splunk_password
-        )
-    except Exception as e:
-        raise(Exception("Unable to connect to Splunk instance: " + str(e)))
+    service = get_service(splunk_host, splunk_port, splunk_password)
         
 
 
@@ -249,13 +335,7 @@ def test_detection_search(splunk_host:str, splunk_port:int, splunk_password:str,
 
     
     try:
-        service = client.connect(
-            host=splunk_host,
-            port=splunk_port,
-
-            username='admin',
-            password=splunk_password
-        )
+        service = get_service(splunk_host, splunk_port, splunk_password)
     except Exception as e:
         error_message = "Unable to connect to Splunk instance: %s"%(str(e))
         print(error_message,file=sys.stderr)
@@ -304,17 +384,7 @@ def test_detection_search(splunk_host:str, splunk_port:int, splunk_password:str,
 
 def delete_attack_data(splunk_host:str, splunk_password:str, splunk_port:int, wait_on_delete:Union[dict,None], search_string:str, detection_filename:str, indices:list[str]=[DEFAULT_DATA_INDEX], host:str=DEFAULT_EVENT_HOST)->bool:
     
-    try:
-        service = client.connect(
-            host=splunk_host,
-            port=splunk_port,
-
-            username='admin',
-            password=splunk_password
-        )
-    except Exception as e:
-
-        raise(Exception("Unable to connect to Splunk instance: " + str(e)))
+    service = get_service(splunk_host, splunk_port, splunk_password)
 
     #splunk_search = 'search index=test* | delete'
     if wait_on_delete:
@@ -15,16 +15,26 @@ from typing import Union
 
 import psutil
 import summarize_json
+from modules import testing_service
 
 
 class TestDriver:
-    def __init__(self, tests:list[str], num_containers:int, summarization_reproduce_failure_config:dict):
-        #Create the queue and enque all of the tests
+    def __init__(self, tests:list[str], num_containers:int, summarization_reproduce_failure_config:dict, batch_by_attack_data:bool=False):
+        #Create the queue and enque all of the tests.  When batching by attack data, each
+        #entry is instead the list of the tests sharing the same attack data
         self.testing_queue = queue.Queue()
-        for test in tests:
-            self.testing_queue.put(test)
+        if batch_by_attack_data:
+            groups = self.group_tests_by_attack_data(tests)
+            print("Batching [%d] tests into [%d] groups sharing the same attack data"%(len(tests), len(groups)))
+            for group in groups:
+                self.testing_queue.put(group)
+        else:
+            for test in tests:
+                self.testing_queue.put(test)
         
-        self.total_number_of_tests = self.testing_queue.qsize()
+        self.total_number_of_tests = len(tests)
+        #Number of tests handed out by getTest so far
+        self.number_of_tests_started = 0
         #Creates a lock that will be used to synchronize access to this object
         self.lock = threading.Lock()
         self.start_time = timeit.default_timer()
@@ -90,8 +100,8 @@ class TestDriver:
             return True
         
 
-    def getTest(self)-> Union[str,None]:
-        
+    def getTest(self)-> Union[str,list[str],None]:
+        #A test, or a list of the tests sharing the same attack data when batching
         failure = self.checkContainerFailure()
         
         
@@ -101,9 +111,28 @@ class TestDriver:
             return None
 
         try:
-            return self.testing_queue.get(block=False)
+            test = self.testing_queue.get(block=False)
         except Exception as e:
             return None
+
+        self.lock.acquire()
+        try:
+            self.number_of_tests_started += len(test) if isinstance(test, list) else 1
+        finally:
+            self.lock.release()
+        return test
+
+    @staticmethod
+    def group_tests_by_attack_data(tests:list[str])->list[list[str]]:
+        #Groups are in the order of their first test
+        groups = OrderedDict()
+        for test in tests:
+            key = testing_service.get_attack_data_key(test)
+            if key is None:
+                #Could not be loaded, so it runs (and reports its error) on its own
+                key = test
+            groups.setdefault(key, []).append(test)
+        return list(groups.values())
         
     def addSuccess(self, result:dict, duration_string:str)->None:
         print("Test PASSED: [%s --> %s] in %s"%(result['detection_name'], result['detection_file'], duration_string))
@@ -294,7 +323,7 @@ class TestDriver:
                     self.container_ready_time = current_time
 
                 numberOfCompletedTests = len(self.successes) + len(self.failures) + len(self.errors)
-                remaining_tests = self.testing_queue.qsize()         
+                remaining_tests = self.total_number_of_tests - self.number_of_tests_started
                 testsCurrentlyRunning = self.total_number_of_tests - remaining_tests - numberOfCompletedTests
                 total_execution_time_seconds = round(current_time - self.start_time)
 
@@ -1,4 +1,5 @@
 
+import json
 import re
 
 #import ansible_runner
@@ -11,6 +12,7 @@ import requests
 from modules.DataManipulation import DataManipulation
 from modules import utils
 from modules import splunk_sdk
+from modules import attack_data_cache
 import timeit
 from typing import Union, Tuple
 from os.path import relpath
@@ -56,19 +58,74 @@ def test_detection_wrapper(container_name:str, splunk_ip:str, splunk_password:st
     return result_test    
 
 
-import splunklib.client as client
-def get_service(splunk_ip:str, splunk_port:int, splunk_password:str):
+def test_detection_group_wrapper(container_name:str, splunk_ip:str, splunk_password:str, splunk_port:int, 
+                                 test_files:list[str], attack_data_root_folder, wait_on_failure:bool=False, wait_on_completion:bool=False)->list[dict]:
+    #Tests of a group share the same attack data (see get_attack_data_key), so the data is
+    #downloaded and indexed once, every test of the group runs against it, and then it is
+    #deleted once
+    test_file_objs = []
+    for test_file in test_files:
+        test_file_obj = load_file(os.path.join("security_content/", test_file))
+        if not test_file_obj:
+            raise(Exception("No test file object found for [%s]"%(test_file)))
+        test_file_objs.append(test_file_obj)
+
+    abs_folder_path, indices_to_delete = ingest_attack_data(splunk_ip, splunk_port, splunk_password, test_files[0], test_file_objs[0]['tests'][0]['attack_data'], attack_data_root_folder)
+
+    results = []
+    for test_file, test_file_obj in zip(test_files, test_file_objs):
+        test = test_file_obj['tests'][0]
+        try:
+            result_test = run_test_searches(splunk_ip, splunk_port, splunk_password, test)
+        except Exception as e:
+            #Only this test is an error, the other tests of the group still run
+            result_test = {'detection_result': {'detection_name': test.get('name', test_file), 'detection_file': test.get('file', test_file),
+                                                'search_string': '', 'error': True, 'success': False, 'detection_error': str(e)}}
+        result_test['attack_data_directory'] = abs_folder_path
+        results.append(result_test)
+
+    failed_results = [result_test for result_test in results if result_test['detection_result']['error'] or not result_test['detection_result']['success']]
+    if (wait_on_failure or wait_on_completion) and len(failed_results) > 0:
+        wait_on_delete = {'message':"\n\n\n****SEARCH FAILURE : Allowing time to debug search/data****"}
+        search_string = "\n".join(result_test['detection_result']['search_string'] for result_test in failed_results)
+    elif wait_on_completion:
+        wait_on_delete = {'message':"\n\n\n****SEARCH SUCCESS : Allowing time to examine search/data****"}
+        search_string = "\n".join(result_test['detection_result']['search_string'] for result_test in results)
+    else:
+        wait_on_delete = None
+        search_string = ""
+
+    splunk_sdk.delete_attack_data(splunk_ip, splunk_password, splunk_port, wait_on_delete, search_string, ", ".join(test_files), indices = indices_to_delete)
+
+    return results
 
+
+def get_attack_data_key(test_file:str)->Union[str,None]:
+    #Tests with the same attack data (same files, sourcetypes, sources, indices and timestamp
+    #updates) have the same key.  None when the test cannot be loaded, so that it runs on its own
     try:
-        service = client.connect(
-            host=splunk_ip,
-            port=splunk_port,
-            username='admin',
-            password=splunk_password
-        )
+        test_file_obj = load_file(os.path.join("security_content/", test_file))
+        return json.dumps(test_file_obj['tests'][0]['attack_data'], sort_keys=True)
     except Exception as e:
-        raise(Exception("Unable to connect to Splunk instance: " + str(e)))
-    return service
+        return None
+
+
+def get_attack_data_urls(test_files:list[str])->list[str]:
+    #Urls of the attack data of the tests, in the order of the tests, for the prefetch of the cache
+    urls = []
+    for test_file in test_files:
+        try:
+            test_file_obj = load_file(os.path.join("security_content/", test_file))
+            urls.extend(attack_data['data'] for attack_data in test_file_obj['tests'][0]['attack_data'])
+        except Exception as e:
+            #The test will report the error
+            pass
+    return urls
+
+
+def get_service(splunk_ip:str, splunk_port:int, splunk_password:str):
+    #The session of the container, shared with the helpers of splunk_sdk
+    return splunk_sdk.get_service(splunk_ip, splunk_port, splunk_password)
 
 def test_detection(splunk_ip:str, splunk_port:int, container_name:str, splunk_password:str, test_file:str, uuid_var, attack_data_root_folder)->Tuple[Union[dict,None], set[str]]:
     
@@ -85,7 +142,18 @@ def test_detection(splunk_ip:str, splunk_port:int, container_name:str, splunk_pa
 
     #epoch_time = str(int(time.time()))
     
+    abs_folder_path, indices_to_delete = ingest_attack_data(splunk_ip, splunk_port, splunk_password, test_file, test_file_obj['tests'][0]['attack_data'], attack_data_root_folder)
+    
+    result_test = run_test_searches(splunk_ip, splunk_port, splunk_password, test_file_obj['tests'][0])
+    result_test['attack_data_directory'] = abs_folder_path
+
 
+    return result_test, indices_to_delete
+
+
+def ingest_attack_data(splunk_ip:str, splunk_port:int, splunk_password:str, test_file:str, attack_data_list:list[dict], attack_data_root_folder)->Tuple[str, set[str]]:
+    #Downloads and indexes the attack data of a test.  Returns the folder the data was
+    #downloaded to and the indices to delete the data from once the test is done
     abs_folder_path = mkdtemp(prefix="DATA_", dir=attack_data_root_folder)
     #We want the relative path, so we convert it as required
     folder_name = relpath(abs_folder_path, os.getcwd())
@@ -94,7 +162,7 @@ def test_detection(splunk_ip:str, splunk_port:int, container_name:str, splunk_pa
     
 
     indices_to_delete = set()
-    for attack_data in test_file_obj['tests'][0]['attack_data']:
+    for attack_data in attack_data_list:
         url = attack_data['data']
         
         if 'custom_index' in attack_data:
@@ -106,17 +174,23 @@ def test_detection(splunk_ip:str, splunk_port:int, container_name:str, splunk_pa
         indices_to_delete.add(data_upload_index)
         
         target_file = os.path.join(folder_name, attack_data['file_name'])
-        utils.download_file_from_http(url, target_file)
+        attack_data_cache.get_attack_data(url, target_file)
         
 
 
-        # Update timestamps before replay
+        # Update timestamps before replay.  The downloaded file may be shared with the cache, so the
+        # updated data is written to a new file which is replayed instead
         if 'update_timestamp' in attack_data:
             if attack_data['update_timestamp'] == True:
                 data_manipulation = DataManipulation()
-                data_manipulation.manipulate_timestamp(target_file, attack_data['sourcetype'], attack_data['source'])
+                target_file = data_manipulation.manipulate_timestamp(target_file, attack_data['sourcetype'], attack_data['source'], f"{target_file}.updated_timestamps")
         #replay_attack_dataset(container_name, splunk_password, folder_name, "test0", attack_data['sourcetype'], attack_data['source'], attack_data['file_name'])
         
+        #Only the events added by the file are waited for.  The count includes the events of
+        #earlier tests removed with | delete, so it is taken before the file is submitted
+        expected_count = splunk_sdk.count_events_in_file(target_file, attack_data['sourcetype'])
+        initial_count = splunk_sdk.get_indexed_event_count(splunk_ip, splunk_port, splunk_password, data_upload_index, attack_data['sourcetype'])
+
         try:
             service = get_service(splunk_ip, splunk_port, splunk_password)
             test_index = service.indexes[data_upload_index]
@@ -133,18 +207,15 @@ def test_detection(splunk_ip:str, splunk_port:int, container_name:str, splunk_pa
             
 
 
-        if not splunk_sdk.wait_for_indexing_to_complete(splunk_ip, splunk_port, splunk_password, attack_data['sourcetype'], data_upload_index):
+        if not splunk_sdk.wait_for_indexing_to_complete(splunk_ip, splunk_port, splunk_password, attack_data['sourcetype'], data_upload_index, expected_count=expected_count, initial_count=initial_count):
             raise Exception("There was an error waiting for indexing to complete.")
-        
-    #Allow some time for the data to be ingested and processed
-    #print("begin sleep 30")
-    #time.sleep(60)
 
-    
-    #print("end sleep 30")
-    
+    return abs_folder_path, indices_to_delete
+
+
+def run_test_searches(splunk_ip:str, splunk_port:int, splunk_password:str, test:dict)->dict:
+    #Runs the baselines and the detection of a test against the data already indexed
     result_test = {}
-    test = test_file_obj['tests'][0]
     
 
     if 'baselines' in test:
@@ -177,10 +248,8 @@ def test_detection(splunk_ip:str, splunk_port:int, container_name:str, splunk_pa
     result_detection['detection_name'] = test['name']
     result_detection['detection_file'] = test['file']
     result_test['detection_result'] = result_detection
-    result_test['attack_data_directory'] = abs_folder_path
 
-
-    return result_test, indices_to_delete
+    return result_test
 
 
 def load_file(file_path):
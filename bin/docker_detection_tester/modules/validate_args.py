@@ -36,6 +36,22 @@ setup_schema = {
             "default": False
         },
 
+        "batch_by_attack_data": {
+            "type": "boolean",
+            "default": False
+        },
+
+        "attack_data_cache": {
+            "type": ["string", "null"],
+            "default": None
+        },
+
+        "attack_data_cache_size_gb": {
+            "type": "number",
+            "minimum": 1,
+            "default": 10
+        },
+
         "detections_list": {
             "type": ["array", "null"],
             "items": {
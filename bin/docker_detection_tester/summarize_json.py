@@ -68,7 +68,7 @@ def outputResultsJSON(output_filename:str, data:list[dict], baseline:OrderedDict
                 print(f"\t{failed_test}")
             failures_test_override = copy.deepcopy(summarization_reproduce_failure_config)
             #Force all tests to be interactive, even if they don't fail (because they failed on this test)
-            failures_test_override.update({"detections_list": fail_list, "no_interactive_failure":False, "interactive": True,
+            failures_test_override.update({"detections_list": fail_list, "no_interactive_failure":False, "interactive": True, "batch_by_attack_data": False,
                                     "num_containers":1, "branch": baseline["branch"], "commit_hash":baseline["commit_hash"], 
                                     "mode":"selected", "show_splunk_app_password": True})
             with open(os.path.join(output_folder,failure_manifest_filename),"w") as failures:
@@ -0,0 +1,187 @@
+import hashlib
+import os
+import stat
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+#The modules of the tester are imported as "modules", from the folder of detection_testing_execution.py
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from modules import attack_data_cache
+
+
+class AttackDataHandler(BaseHTTPRequestHandler):
+    #Serves the files of a local folder standing in for the attack data repository, with
+    #ETag, If-None-Match, Range and If-Range like the real one
+    def do_GET(self):
+        self.server.requests.append(dict(self.headers))
+        with open(os.path.join(self.server.directory, self.path.lstrip('/')), 'rb') as f:
+            data = f.read()
+        etag = '"%s"' % hashlib.sha256(data).hexdigest()
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        byte_range = self.headers.get('Range')
+        if byte_range is not None and self.headers.get('If-Range', etag) == etag:
+            start = int(byte_range[len('bytes='):-1])
+            if start >= len(data):
+                self.send_response(416)
+                self.send_header('Content-Range', f"bytes */{len(data)}")
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {start}-{len(data) - 1}/{len(data)}")
+            data = data[start:]
+        else:
+            self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server(tmp_path):
+    directory = tmp_path / 'attack_data'
+    directory.mkdir()
+    http_server = ThreadingHTTPServer(('127.0.0.1', 0), AttackDataHandler)
+    http_server.directory = str(directory)
+    http_server.requests = []
+    thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+    thread.start()
+    yield http_server
+    http_server.shutdown()
+    http_server.server_close()
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(attack_data_cache, 'url_locks', {})
+    monkeypatch.setattr(attack_data_cache, 'validated_urls', set())
+    monkeypatch.setattr(attack_data_cache, 'verified_objects', set())
+    attack_data_cache.initialize_cache(str(tmp_path / 'cache'))
+    yield str(tmp_path / 'cache')
+    attack_data_cache.initialize_cache(None)
+
+
+def add_attack_data(server, name:str, content:bytes)->str:
+    with open(os.path.join(server.directory, name), 'wb') as f:
+        f.write(content)
+    return f"http://127.0.0.1:{server.server_port}/{name}"
+
+
+def new_run(monkeypatch, cache_folder:str, max_size_gb:float=10)->None:
+    #Forget what was checked during the previous run
+    monkeypatch.setattr(attack_data_cache, 'validated_urls', set())
+    monkeypatch.setattr(attack_data_cache, 'verified_objects', set())
+    attack_data_cache.initialize_cache(cache_folder, max_size_gb)
+
+
+def read(path:str)->bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_cache_hit_and_miss(server, cache, tmp_path, monkeypatch):
+    url = add_attack_data(server, 'windows-sysmon.log', b'event\n' * 1000)
+
+    attack_data_cache.get_attack_data(url, str(tmp_path / 'first.log'))
+    assert read(tmp_path / 'first.log') == b'event\n' * 1000
+    assert len(server.requests) == 1
+    object_path = attack_data_cache.get_object_path(attack_data_cache.index[url]['sha256'])
+    assert not os.stat(object_path).st_mode & stat.S_IWUSR
+
+    #Same run, the server is not asked again and the test gets a hardlink to the object
+    attack_data_cache.get_attack_data(url, str(tmp_path / 'second.log'))
+    assert len(server.requests) == 1
+    assert os.stat(tmp_path / 'second.log').st_ino == os.stat(object_path).st_ino
+
+    #Next run, the cached copy is checked against the server which answers 304
+    new_run(monkeypatch, cache)
+    attack_data_cache.get_attack_data(url, str(tmp_path / 'third.log'))
+    assert server.requests[-1]['If-None-Match'] == attack_data_cache.index[url]['etag']
+    assert read(tmp_path / 'third.log') == b'event\n' * 1000
+
+    #The file changed on the server
+    add_attack_data(server, 'windows-sysmon.log', b'new event\n')
+    new_run(monkeypatch, cache)
+    attack_data_cache.get_attack_data(url, str(tmp_path / 'fourth.log'))
+    assert read(tmp_path / 'fourth.log') == b'new event\n'
+
+
+def test_cache_file_url(cache, tmp_path):
+    source = tmp_path / 'local.log'
+    source.write_bytes(b'local event\n')
+
+    attack_data_cache.get_attack_data(source.as_uri(), str(tmp_path / 'copy.log'))
+    assert read(tmp_path / 'copy.log') == b'local event\n'
+    assert read(source) == b'local event\n'
+
+
+def test_cache_resumes_download(server, cache, tmp_path):
+    content = os.urandom(100000)
+    url = add_attack_data(server, 'cloudtrail.json', content)
+    etag = '"%s"' % hashlib.sha256(content).hexdigest()
+    partial_path = os.path.join(cache, 'partial', hashlib.sha256(url.encode('utf-8')).hexdigest() + '.part')
+    with open(partial_path, 'wb') as f:
+        f.write(content[:30000])
+    attack_data_cache.write_partial_state(partial_path, etag, None)
+
+    attack_data_cache.get_attack_data(url, str(tmp_path / 'cloudtrail.json'))
+    assert server.requests[0]['Range'] == 'bytes=30000-'
+    assert read(tmp_path / 'cloudtrail.json') == content
+    assert os.listdir(os.path.join(cache, 'partial')) == []
+
+
+@pytest.mark.parametrize('partial_size', [100000, 150000])
+def test_cache_restarts_complete_or_too_long_download(server, cache, tmp_path, partial_size):
+    #The server answers 416 to the resume, the partial download is removed and the file
+    #downloaded again
+    content = os.urandom(100000)
+    url = add_attack_data(server, 'cloudtrail.json', content)
+    etag = '"%s"' % hashlib.sha256(content).hexdigest()
+    partial_path = os.path.join(cache, 'partial', hashlib.sha256(url.encode('utf-8')).hexdigest() + '.part')
+    with open(partial_path, 'wb') as f:
+        f.write((content * 2)[:partial_size])
+    attack_data_cache.write_partial_state(partial_path, etag, None)
+
+    attack_data_cache.get_attack_data(url, str(tmp_path / 'cloudtrail.json'))
+    assert [request.get('Range') for request in server.requests] == [f'bytes={partial_size}-', None]
+    assert read(tmp_path / 'cloudtrail.json') == content
+    assert os.listdir(os.path.join(cache, 'partial')) == []
+
+
+def test_cache_evicts_least_recently_used(server, cache, tmp_path, monkeypatch):
+    #Room for two of the three files
+    new_run(monkeypatch, cache, max_size_gb=2500 / (1024 * 1024 * 1024))
+    urls = [add_attack_data(server, f'{name}.log', name.encode('utf-8') * 1000) for name in ['a', 'b', 'c']]
+
+    for number, url in enumerate(urls):
+        attack_data_cache.get_attack_data(url, str(tmp_path / f'{number}.log'))
+
+    assert sorted(attack_data_cache.index) == urls[1:]
+    assert len(os.listdir(os.path.join(cache, 'objects'))) == 2
+    #Files linked into test folders keep their content
+    assert read(tmp_path / '0.log') == b'a' * 1000
+
+
+def test_cache_downloads_corrupted_object_again(server, cache, tmp_path, monkeypatch):
+    url = add_attack_data(server, 'linux.log', b'event\n' * 100)
+    attack_data_cache.get_attack_data(url, str(tmp_path / 'first.log'))
+    object_path = attack_data_cache.get_object_path(attack_data_cache.index[url]['sha256'])
+    os.remove(tmp_path / 'first.log')
+    os.chmod(object_path, stat.S_IRUSR | stat.S_IWUSR)
+    with open(object_path, 'wb') as f:
+        f.write(b'corrupted\n')
+
+    new_run(monkeypatch, cache)
+    attack_data_cache.get_attack_data(url, str(tmp_path / 'second.log'))
+    assert read(tmp_path / 'second.log') == b'event\n' * 100
+    assert server.requests[-1].get('If-None-Match') is None
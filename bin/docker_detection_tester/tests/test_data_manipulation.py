@@ -0,0 +1,76 @@
+import io
+import os
+import sys
+from datetime import datetime
+from datetime import timedelta
+
+import pytest
+
+#The modules of the tester are imported as "modules", from the folder of detection_testing_execution.py
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from modules import DataManipulation
+from modules.DataManipulation import ISO_TIME, WINDOWS_TIME, TimestampShifter
+
+
+def test_parse_windows_time():
+    assert DataManipulation.parse_windows_time('01/02/2022 12:05:06 AM') == datetime(2022, 1, 2, 0, 5, 6)
+    assert DataManipulation.parse_windows_time('01/02/2022 12:05:06 PM') == datetime(2022, 1, 2, 12, 5, 6)
+    assert DataManipulation.parse_windows_time('01/02/2022 01:05:06 AM') == datetime(2022, 1, 2, 1, 5, 6)
+    assert DataManipulation.parse_windows_time('01/02/2022 11:05:06 PM') == datetime(2022, 1, 2, 23, 5, 6)
+    with pytest.raises(ValueError):
+        DataManipulation.parse_windows_time('01/02/2022 00:05:06 AM')
+    with pytest.raises(ValueError):
+        DataManipulation.parse_windows_time('01/02/2022 13:05:06 PM')
+
+
+@pytest.mark.parametrize('text', ['01/02/2022 12:05:06 AM', '01/02/2022 12:05:06 PM', '12/31/2021 09:59:59 PM'])
+def test_format_windows_time(text):
+    assert DataManipulation.format_windows_time(DataManipulation.parse_windows_time(text), text) == text
+
+
+def test_parse_iso_time():
+    assert DataManipulation.parse_iso_time('2022-01-02T03:04:05Z') == datetime(2022, 1, 2, 3, 4, 5)
+    assert DataManipulation.parse_iso_time('2022-01-02T03:04:05.1Z') == datetime(2022, 1, 2, 3, 4, 5, 100000)
+    assert DataManipulation.parse_iso_time('2022-01-02T03:04:05.123') == datetime(2022, 1, 2, 3, 4, 5, 123000)
+    assert DataManipulation.parse_iso_time('2022-01-02T03:04:05.123456Z') == datetime(2022, 1, 2, 3, 4, 5, 123456)
+    #Digits beyond microseconds are dropped
+    assert DataManipulation.parse_iso_time('2022-01-02T03:04:05.1234567Z') == datetime(2022, 1, 2, 3, 4, 5, 123456)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('2022-01-02T03:04:05Z', '2022-01-02T04:04:05Z'),
+    ('2022-01-02T03:04:05', '2022-01-02T04:04:05'),
+    ('2022-01-02T03:04:05.1Z', '2022-01-02T04:04:05.1Z'),
+    ('2022-01-02T03:04:05.123', '2022-01-02T04:04:05.123'),
+    ('2022-01-02T03:04:05.123456Z', '2022-01-02T04:04:05.123456Z'),
+    ('2022-01-02T03:04:05.1234567Z', '2022-01-02T04:04:05.1234560Z'),
+])
+def test_format_iso_time(text, expected):
+    #The shifted timestamp keeps the number of digits of the fractions of a second and the Z
+    time = DataManipulation.parse_iso_time(text) + timedelta(hours=1)
+    assert DataManipulation.format_iso_time(time, text) == expected
+
+
+def shift_text(text, timestamp_format, difference):
+    new_file = io.StringIO()
+    DataManipulation.DataManipulation().shift_chunks(io.StringIO(text), new_file, timestamp_format,
+        TimestampShifter(timestamp_format, difference))
+    return new_file.getvalue()
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 10, 25, 64])
+def test_shift_chunks_timestamp_across_chunks(monkeypatch, chunk_size):
+    monkeypatch.setattr(DataManipulation, 'CHUNK_SIZE', chunk_size)
+    #Lines, then a long run without any newline
+    text = ('LogName=Security\r\n01/02/2022 11:59:59 PM\r\nEventCode=4624\r\n'
+            'a 01/02/2022 12:00:00 PM b 01/02/2022 12:30:00 AM c')
+    expected = ('LogName=Security\r\n01/03/2022 12:59:59 AM\r\nEventCode=4624\r\n'
+                'a 01/02/2022 01:00:00 PM b 01/02/2022 01:30:00 AM c')
+    assert shift_text(text, WINDOWS_TIME, timedelta(hours=1)) == expected
+
+
+def test_shift_chunks_iso_time(monkeypatch):
+    monkeypatch.setattr(DataManipulation, 'CHUNK_SIZE', 16)
+    text = '{"time": "2022-01-02T03:04:05.123Z"}\n{"time": "2022-01-02T03:04:06Z"}'
+    expected = '{"time": "2022-01-01T03:04:05.123Z"}\n{"time": "2022-01-01T03:04:06Z"}'
+    assert shift_text(text, ISO_TIME, timedelta(days=-1)) == expected
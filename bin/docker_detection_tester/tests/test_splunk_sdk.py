@@ -0,0 +1,79 @@
+import os
+import sys
+
+import pytest
+
+#splunk_sdk needs the Splunk SDK for Python (splunk-sdk in requirements.txt)
+pytest.importorskip('splunklib')
+
+#The modules of the tester are imported as "modules", from the folder of detection_testing_execution.py
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from modules import splunk_sdk
+
+
+class FakeClock():
+    #Stands in for timeit.default_timer and time.sleep, so that the polling loop runs
+    #without waiting
+    def __init__(self):
+        self.now = 0.0
+
+    def default_timer(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def indexed_counts(monkeypatch):
+    #Replaces get_indexed_event_count by the counts of the list, one per call, the last
+    #one being repeated.  Returns the clock and the list of the times of the calls
+    clock = FakeClock()
+    monkeypatch.setattr(splunk_sdk.timeit, 'default_timer', clock.default_timer)
+    monkeypatch.setattr(splunk_sdk.time, 'sleep', clock.sleep)
+    calls = []
+
+    def set_counts(counts):
+        def get_indexed_event_count(splunk_host, splunk_port, splunk_password, index, sourcetype):
+            calls.append(clock.now)
+            return counts[min(len(calls), len(counts)) - 1]
+        monkeypatch.setattr(splunk_sdk, 'get_indexed_event_count', get_indexed_event_count)
+        return clock, calls
+    return set_counts
+
+
+def test_count_events_in_file(tmp_path):
+    data_file = tmp_path / 'data.log'
+    data_file.write_bytes(b'first event\r\n\r\nsecond event\n  \nthird event')
+    assert splunk_sdk.count_events_in_file(str(data_file), 'aws:cloudtrail') == 3
+    #Events of these sourcetypes span several lines
+    assert splunk_sdk.count_events_in_file(str(data_file), 'XmlWinEventLog:Microsoft-Windows-Sysmon/Operational') is None
+    assert splunk_sdk.count_events_in_file(str(data_file), 'WinEventLog:Security') is None
+
+
+def test_wait_for_indexing_expected_count(indexed_counts):
+    clock, calls = indexed_counts([100, 100, 104, 110, 110])
+    assert splunk_sdk.wait_for_indexing_to_complete('localhost', 8089, 'password', 'aws:cloudtrail', 'main',
+        expected_count=10, initial_count=100)
+    #Done as soon as the 10 events of the file are indexed
+    assert len(calls) == 4
+    assert clock.now <= 1
+
+
+def test_wait_for_indexing_unknown_count(indexed_counts):
+    #The index holds 50 events removed by earlier tests, the new events arrive after 30 seconds
+    clock, calls = indexed_counts([50] * 10 + [52, 55])
+    assert splunk_sdk.wait_for_indexing_to_complete('localhost', 8089, 'password', 'xmlwineventlog', 'main',
+        check_interval_seconds=10, initial_count=50)
+    assert len(calls) > 11
+    last_change = calls[11]
+    assert last_change > 30
+    assert 10 <= clock.now - last_change < 10 + splunk_sdk.MAX_INDEXING_POLL_SECONDS
+
+
+def test_wait_for_indexing_expected_count_missed(indexed_counts):
+    #Only 8 of the 10 events are indexed, e.g. events merged by line breaking
+    clock, calls = indexed_counts([0, 3, 8])
+    assert splunk_sdk.wait_for_indexing_to_complete('localhost', 8089, 'password', 'aws:cloudtrail', 'main',
+        check_interval_seconds=10, expected_count=10)
+    assert 10 <= clock.now - calls[2] < 10 + splunk_sdk.MAX_INDEXING_POLL_SECONDS
@@ -3,6 +3,8 @@ import argparse
 import os
 
 from bin.contentctl_project.contentctl_core.domain.entities.link_validator import LinkValidator
+from bin.contentctl_project.contentctl_core.application.factory.utils.validation_cache import ValidationCache
+from bin.contentctl_project.contentctl_core.domain.utils.profiler import Profiler
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'bin/contentctl_project')))
 
@@ -32,6 +34,8 @@ from bin.contentctl_project.contentctl_infrastructure.adapter.obj_to_md_adapter
 from bin.contentctl_project.contentctl_infrastructure.adapter.obj_to_svg_adapter import ObjToSvgAdapter
 from bin.contentctl_project.contentctl_infrastructure.adapter.obj_to_attack_nav_adapter import ObjToAttackNavAdapter
 from bin.contentctl_project.contentctl_infrastructure.builder.attack_enrichment import AttackEnrichment
+from bin.contentctl_project.contentctl_infrastructure.builder.yml_reader import YmlReader
+from bin.contentctl_project.contentctl_infrastructure.builder.cve_enrichment import CveEnrichment
 from bin.contentctl_project.contentctl_core.domain.entities.enums.enums import SecurityContentType
 
 
@@ -68,6 +72,12 @@ starting program loaded for TIE Fighter...
     """)
 
 
+def get_build_state_file(args) -> str:
+    if args.incremental:
+        return os.path.join(".contentctl_cache", "build_state.pickle")
+    return None
+
+
 def content_changer(args) -> None:
     factory_input_dto = ObjectFactoryInputDto(
         os.path.abspath(args.path),
@@ -111,7 +121,9 @@ def generate(args) -> None:
             SecurityContentInvestigationBuilder(),
             SecurityContentPlaybookBuilder(),
             SecurityContentDirector(),
-            AttackEnrichment.get_attack_lookup(force_cached_or_offline=args.cached_and_offline, skip_enrichment=args.skip_enrichment)
+            AttackEnrichment.get_attack_lookup(force_cached_or_offline=args.cached_and_offline, skip_enrichment=args.skip_enrichment, stix_bundle=args.attack_stix_bundle),
+            jobs=args.jobs,
+            build_state_file=get_build_state_file(args)
         )
     if args.product in ["SSA", "API"]:
         ba_factory_input_dto = BAFactoryInputDto(
@@ -127,7 +139,7 @@ def generate(args) -> None:
             os.path.abspath(args.output),
             factory_input_dto,
             ba_factory_input_dto,
-            ObjToConfAdapter(),
+            Profiler.instrument(ObjToConfAdapter()),
             SecurityContentProduct.ESCU
         )
     elif args.product == "API":
@@ -135,7 +147,7 @@ def generate(args) -> None:
             os.path.abspath(args.output),
             factory_input_dto,
             ba_factory_input_dto,
-            ObjToJsonAdapter(),
+            Profiler.instrument(ObjToJsonAdapter(format=args.api_format)),
             SecurityContentProduct.API
         )
     else:
@@ -144,7 +156,7 @@ def generate(args) -> None:
             os.path.abspath(args.output),
             factory_input_dto,
             ba_factory_input_dto,
-            ObjToYmlAdapter(),
+            Profiler.instrument(ObjToYmlAdapter()),
             SecurityContentProduct.SSA
         ) 
     generate = Generate()
@@ -162,6 +174,8 @@ def validate(args) -> None:
         print("ERROR: invalid product. valid products are all, ESCU or SSA.")
         sys.exit(1)
 
+    LinkValidator.max_concurrent_checks = args.reference_threads
+
     if args.cached_and_offline:
         LinkValidator.initialize_cache(args.cached_and_offline)
 
@@ -178,7 +192,9 @@ def validate(args) -> None:
             SecurityContentInvestigationBuilder(check_references=args.check_references),
             SecurityContentPlaybookBuilder(check_references=args.check_references),
             SecurityContentDirector(),
-            AttackEnrichment.get_attack_lookup(force_cached_or_offline=args.cached_and_offline, skip_enrichment=args.skip_enrichment)
+            AttackEnrichment.get_attack_lookup(force_cached_or_offline=args.cached_and_offline, skip_enrichment=args.skip_enrichment, stix_bundle=args.attack_stix_bundle),
+            jobs=args.jobs,
+            build_state_file=get_build_state_file(args)
         )
     if args.product in ["SSA", "all"]:
         ba_factory_input_dto = BAFactoryInputDto(
@@ -220,13 +236,15 @@ def doc_gen(args) -> None:
         SecurityContentInvestigationBuilder(),
         SecurityContentPlaybookBuilder(),
         SecurityContentDirector(),
-        AttackEnrichment.get_attack_lookup(force_cached_or_offline=args.cached_and_offline, skip_enrichment=args.skip_enrichment)
+        AttackEnrichment.get_attack_lookup(force_cached_or_offline=args.cached_and_offline, skip_enrichment=args.skip_enrichment, stix_bundle=args.attack_stix_bundle),
+        jobs=args.jobs,
+        build_state_file=get_build_state_file(args)
     )
 
     doc_gen_input_dto = DocGenInputDto(
         os.path.abspath(args.output),
         factory_input_dto,
-        ObjToMdAdapter()
+        Profiler.instrument(ObjToMdAdapter(jobs=args.jobs))
     )
 
     doc_gen = DocGen()
@@ -258,13 +276,15 @@ def reporting(args) -> None:
         SecurityContentInvestigationBuilder(),
         SecurityContentPlaybookBuilder(),
         SecurityContentDirector(),
-        AttackEnrichment.get_attack_lookup(force_cached_or_offline=args.cached_and_offline, skip_enrichment=args.skip_enrichment)
+        AttackEnrichment.get_attack_lookup(force_cached_or_offline=args.cached_and_offline, skip_enrichment=args.skip_enrichment, stix_bundle=args.attack_stix_bundle),
+        jobs=args.jobs,
+        build_state_file=get_build_state_file(args)
     )
 
     reporting_input_dto = ReportingInputDto(
         factory_input_dto,
-        ObjToSvgAdapter(),
-        ObjToAttackNavAdapter()
+        Profiler.instrument(ObjToSvgAdapter()),
+        Profiler.instrument(ObjToAttackNavAdapter())
     )
 
     reporting = Reporting()
@@ -285,7 +305,31 @@ def main(args):
     parser.add_argument("--skip_enrichment", action=argparse.BooleanOptionalAction,
         help="Skip enrichment of CVEs.  This can significantly decrease the amount of time needed to run content_ctl.")
 
-    parser.set_defaults(cached_and_offline=False, func=lambda _: parser.print_help())
+    parser.add_argument("-j", "--jobs", required=False, type=int, default=1,
+        help="Number of processes used to build the security content. Defaults to 1 (no parallelism). Values larger than 1 spread the parsing, validation and enrichment of the content, and the rendering of the docgen pages, across a pool of worker processes. The workers are forked, on platforms without fork (Windows) the content is built by a single process.")
+
+    parser.add_argument("--yml_cache", action=argparse.BooleanOptionalAction,
+        help="Cache parsed YAML files in .contentctl_cache/yml and validated objects in .contentctl_cache/validated. Entries are keyed by the content hash of each file, so unchanged files are not parsed or validated again on the next run. Enabled by default.")
+
+    parser.add_argument("--incremental", action=argparse.BooleanOptionalAction,
+        help="Persist the built content in .contentctl_cache/build_state.pickle and only rebuild the objects whose files changed since the last run, together with the objects depending on them.")
+
+    parser.add_argument("--attack_stix_bundle", required=False, type=str, default=None,
+        help="Local MITRE ATT&CK Enterprise STIX bundle (e.g. enterprise-attack.json) used for the MITRE Attack Enrichment instead of the TAXII server. The enrichment built from the bundle is stored in .contentctl_cache/mitre_enrichment.json and only rebuilt when the bundle changes. Without a bundle, offline runs use lookups/mitre_enrichment.csv.")
+
+    parser.add_argument("--cve_dump", required=False, type=str, default=None,
+        help="Local CVE JSON feed dump (NVD JSON feed, NVD API 2.0 or cve-search export, optionally gzipped) used for CVE enrichment instead of the network. It is imported once into lookups/CVE_STORE.sqlite and imported again only when the dump changes.")
+
+    parser.add_argument("--profile", required=False, action="store_true",
+        help="Time every stage of the run (YAML loading, validation, each step of building the content, reference checks and the writing of the output) and count the hits and misses of the caches. Prints a summary at the end of the run and writes a trace in Chrome trace event format to --profile_output, which can be opened in chrome://tracing or https://ui.perfetto.dev.")
+
+    parser.add_argument("--profile_output", required=False, type=str, default="contentctl_profile.json", metavar="FILE",
+        help="File the --profile trace is written to. Defaults to contentctl_profile.json.")
+
+    parser.add_argument("--profile_slowest", required=False, type=int, default=10,
+        help="Number of the slowest files listed in the --profile summary. Defaults to 10.")
+
+    parser.set_defaults(cached_and_offline=False, yml_cache=True, func=lambda _: parser.print_help())
 
     actions_parser = parser.add_subparsers(title="Splunk Security Content actions", dest="action")
     #new_parser = actions_parser.add_parser("new", help="Create new content (detection, story, baseline)")
@@ -307,7 +351,10 @@ def main(args):
 
     validate_parser.add_argument("-pr", "--product", required=True, type=str, default='all', 
         help="Type of package to create, choose between all, `ESCU` or `SSA`.")
-    validate_parser.add_argument('--check_references', action=argparse.BooleanOptionalAction, help="The number of threads to use to resolve references.  "
+    validate_parser.add_argument('--check_references', action=argparse.BooleanOptionalAction, help="Resolve the references of all content and "
+                                   "report the ones that cannot be reached.")
+    validate_parser.add_argument('--reference_threads', type=int, default=LinkValidator.max_concurrent_checks, help="The number of threads to use to resolve references.  "
+                                   f"At most {LinkValidator.max_concurrent_checks_per_host} of them query the same host at a time.  "
                                    "Larger numbers will result in faster resolution, but will be more likely to hit rate limits or use a large amount of "
                                    "bandwidth.  A larger number of threads is particularly useful on high-bandwidth connections, but does not improve "
                                    "performance on slow connections.")
@@ -319,6 +366,8 @@ def main(args):
         help="Path where to store the deployment package")
     generate_parser.add_argument("-pr", "--product", required=True, type=str,
         help="Type of package to create, choose between `ESCU`, `SSA` or `API`.")
+    generate_parser.add_argument("--api_format", required=False, type=str, default='json', choices=['json', 'compact', 'ndjson'],
+        help="Format of the files of the API product. `json` (default) writes one JSON object per type of content, `compact` the same without whitespace (encoded with orjson when it is installed) and `ndjson` one object per line in .ndjson files.")
     generate_parser.set_defaults(func=generate)
     
     content_changer_choices = ContentChanger.enumerate_content_changer_functions()
@@ -343,7 +392,20 @@ def main(args):
 
     # # parse them
     args = parser.parse_args()
-    return args.func(args)
+    YmlReader.initialize_cache(args.yml_cache)
+    ValidationCache.initialize_cache(args.yml_cache)
+    if args.cve_dump:
+        CveEnrichment.initialize_store(args.cve_dump)
+    if not args.profile:
+        return args.func(args)
+
+    Profiler.initialize_profiler(True)
+    try:
+        return args.func(args)
+    finally:
+        # Also reported when the run stops on a validation error
+        Profiler.print_summary(args.profile_slowest)
+        Profiler.write_trace(args.profile_output)
 
 
 if __name__ == "__main__":